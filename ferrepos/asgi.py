@@ -5,6 +5,13 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/dev/howto/deployment/asgi/
+
+Las vistas de alta frecuencia de las cajas (escaneo, total del carrito,
+búsqueda de clientes) son async; servidas por un servidor ASGI, por ejemplo
+
+    uvicorn ferrepos.asgi:application --workers 4
+
+esperan a la base de datos sin ocupar un worker (ver manage.py bench_asgi).
 """
 
 import os
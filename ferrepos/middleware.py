@@ -1,16 +1,76 @@
 # ferrepos/middleware.py
+import time
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.shortcuts import redirect
 from django.urls import reverse
-from pos.models import CashDrawerSession
+from django.utils.functional import SimpleLazyObject
+from pos.cache import aget_active_session, get_active_session
+from pos.metrics import finish_request, observe_request, server_timing, start_request, view_name
+
+
+class ServerTimingMiddleware:
+    """
+    Mide consultas SQL, render de plantillas y tiempo total de cada request
+    (ver pos.metrics): los devuelve en la cabecera Server-Timing y los suma a
+    los histogramas por nombre de URL que expone /pos/metrics/.
+    """
+    sync_capable = True
+    async_capable = True
 
-class CashDrawerMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token, timings = start_request()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            finish_request(token)
+        return self._record(request, response, timings, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        token, timings = start_request()
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            finish_request(token)
+        return self._record(request, response, timings, time.perf_counter() - start)
+
+    def _record(self, request, response, timings, total):
+        observe_request(view_name(request), timings, total)
+        response['Server-Timing'] = server_timing(timings, total)
+        return response
+
+
+async def _resolved_user(user):
+    return user
+
+
+class CashDrawerMiddleware:
+    # Sirve a WSGI y a ASGI: bajo ASGI, un middleware solo-sync obligaría a
+    # Django a correr también las vistas async en un hilo.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def _requires_session(self, request, user):
         # 1. No aplicar si no está autenticado o es superusuario (Admin)
-        if not request.user.is_authenticated or request.user.is_superuser:
-            return self.get_response(request)
+        if not user.is_authenticated or user.is_superuser:
+            return False
 
         # 2. Solo aplicar a las rutas del POS (asumimos que 'pos_main' es la base)
         if request.path.startswith(reverse('pos_main').strip('/')):
@@ -22,17 +82,39 @@ class CashDrawerMiddleware:
             ]
 
             # Si el usuario está en una ruta permitida (ej: open-session), permite el paso
-            if request.path in allowed_paths:
-                return self.get_response(request)
+            return request.path not in allowed_paths
+        return False
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        # 0. La sesión de caja activa se resuelve como mucho una vez por request
+        #    (y se cachea por usuario). Las vistas la reutilizan vía request.cash_session.
+        user = request.user
+        request.cash_session = SimpleLazyObject(lambda: get_active_session(user))
+        # Las vistas async corren igual bajo WSGI: su auser() devuelve el mismo
+        # usuario en lugar de leer auth_user otra vez (auser() cachea aparte).
+        request.auser = partial(_resolved_user, user)
 
+        if self._requires_session(request, user):
             # 3. Buscar sesión activa (end_time es NULL)
-            active_session = CashDrawerSession.objects.filter(
-                user=request.user,
-                end_time__isnull=True
-            ).first()
+            active_session = request.cash_session
 
             # 4. Si NO existe sesión activa, redirige a la apertura
             if not active_session:
                 return redirect('open_session')
 
-        return self.get_response(request)
\ No newline at end of file
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        # Bajo ASGI el usuario se resuelve con auser(): request.user no puede
+        # tocar la base desde el event loop. Las vistas sync (que Django corre en
+        # un hilo) siguen usando request.cash_session; las async, aget_active_session().
+        user = await request.auser()
+        request.cash_session = SimpleLazyObject(lambda: get_active_session(user))
+
+        if self._requires_session(request, user) and not await aget_active_session(user):
+            return redirect('open_session')
+
+        return await self.get_response(request)
@@ -48,6 +48,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'ferrepos.middleware.ServerTimingMiddleware',
     'ferrepos.middleware.CashDrawerMiddleware',
 ]
 
@@ -55,7 +56,9 @@ ROOT_URLCONF = 'ferrepos.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates que además mide el render (Server-Timing, ver pos.metrics).
+        'BACKEND': 'pos.metrics.TimedDjangoTemplates',
+        'NAME': 'django',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -86,6 +89,20 @@ DATABASES = {
 }
 
 
+# Caché compartida por todos los procesos (workers de gunicorn/uvicorn y
+# comandos de manage.py): la sesión de caja activa, los snapshots por SKU y el
+# panel se invalidan en un proceso y tienen que dejar de servirse en todos, algo
+# que la LocMemCache por defecto (una por proceso) no garantiza. Es Redis (en
+# memoria) y no una tabla de MySQL: cada escaneo lee de aquí y un acierto no
+# puede costar lo mismo que la consulta que evita. Requiere el paquete `redis`.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:6379/1',
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/dev/ref/settings/#auth-password-validators
 
@@ -121,6 +138,9 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/dev/howto/static-files/
 
 STATIC_URL = 'static/'
+
+# Archivos generados por el worker de reportes (manage.py run_report_worker)
+REPORTS_ROOT = BASE_DIR / 'reports'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/accounts/login/'
 
@@ -1,39 +1,67 @@
 # pos/admin.py
 from django.contrib import admin
-from django.db.models import Sum
+from django.utils.html import format_html
 from decimal import Decimal
-from .models import Product, Category, Supplier, Sale, SaleItem, CashDrawerSession, Client, SaleReturn, SaleReturnItem
+from .models import Product, Category, Supplier, Sale, SaleItem, CashDrawerSession, Client, SaleReturn, SaleReturnItem, StockMovement, LowStockChange
+from .pagination import EstimatedCountPaginator
+from .stock import with_available_stock
 
 
 # Registro de Productos (Sprint 2)
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ('name', 'sku', 'price', 'stock', 'category')
-    list_filter = ('category', 'supplier')
+    list_display = ('name', 'sku', 'price', 'get_available_stock', 'is_low_stock', 'category')
+    list_filter = ('is_low_stock', 'category', 'supplier')
     search_fields = ('name', 'sku')
 
+    def get_queryset(self, request):
+        return with_available_stock(super().get_queryset(request))
+
+    # El stock de un producto existente se cambia por product_edit_view
+    # (pos.stock.set_stock): escribir la foto directo ignoraría los movimientos
+    # pendientes del modo 'ledger'. Aquí solo se muestra el disponible.
+    def get_exclude(self, request, obj=None):
+        return ('stock',) if obj is not None else ()
+
+    def get_readonly_fields(self, request, obj=None):
+        return ('get_available_stock',) if obj is not None else ()
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            return super().save_model(request, obj, form, change)
+        # Sin 'stock' en el UPDATE: no se pisa lo que la compactación sumó a la foto.
+        obj.save(update_fields=[field.name for field in obj._meta.concrete_fields
+                                if not field.primary_key and field.name != 'stock'])
+
+    def get_available_stock(self, obj):
+        return obj.available_stock
+
+    get_available_stock.short_description = 'Stock Disponible'
+    get_available_stock.admin_order_field = 'available_stock'
+
 
 # Registro de Sesiones de Caja (Sprint 3: Auditoría HU #12)
 @admin.register(CashDrawerSession)
 class CashDrawerSessionAdmin(admin.ModelAdmin):
+    # Los totales se leen de las columnas acumuladas de la sesión: el listado
+    # hace la misma cantidad de consultas sin importar cuántos turnos muestre.
     list_display = ('user', 'start_time', 'end_time',
-                    'starting_balance', 'get_total_cash_sales',
+                    'starting_balance', 'get_total_cash_sales', 'card_sales_total',
+                    'returns_total', 'num_transactions',
                     'ending_balance', 'get_expected_balance', 'get_difference')
-    readonly_fields = ('start_time',)
+    list_select_related = ('user',)
+    readonly_fields = ('start_time', 'cash_sales_total', 'card_sales_total', 'returns_total', 'num_transactions')
     list_filter = ('user', 'start_time')
 
     def get_total_cash_sales(self, obj):
-        # Calcula ventas en efectivo para el turno
-        total = obj.sales.filter(payment_method='cash').aggregate(total_sum=Sum('total_amount'))[
-                    'total_sum'] or Decimal('0.00')
-        return total
+        # Ventas en efectivo del turno
+        return obj.cash_sales_total
 
     get_total_cash_sales.short_description = 'Ventas Efectivo'
 
     def get_expected_balance(self, obj):
         # Fondo Inicial + Ventas en Efectivo
-        cash_sales = self.get_total_cash_sales(obj)
-        return obj.starting_balance + cash_sales
+        return obj.starting_balance + obj.cash_sales_total
 
     get_expected_balance.short_description = 'Total Esperado'
 
@@ -44,17 +72,97 @@ class CashDrawerSessionAdmin(admin.ModelAdmin):
         difference = obj.ending_balance - expected
 
         style = "color: red;" if difference != Decimal('0.00') else "color: green;"
-        return f'<span style="{style}">{difference.quantize(Decimal("0.01"))}</span>'
+        return format_html('<span style="{}">{}</span>', style, difference.quantize(Decimal("0.01")))
 
     get_difference.short_description = 'Diferencia'
-    get_difference.allow_tags = True
+
+
+# Ventas y devoluciones: tablas de millones de filas. Cada listado trae sus FKs
+# en la misma consulta (list_select_related), no hace COUNT(*) completo
+# (EstimatedCountPaginator, sin show_full_result_count) y los selectores de FK
+# son raw_id para no cargar todos los clientes/productos/ventas en un <select>.
+@admin.register(Sale)
+class SaleAdmin(admin.ModelAdmin):
+    list_display = ('id', 'sale_date', 'total_amount', 'payment_method', 'seller', 'client', 'cash_drawer_session')
+    list_select_related = ('seller', 'client', 'cash_drawer_session__user')
+    # Filtro por rangos (hoy, 7 días, mes, año) sobre el índice sale_date_method.
+    # No se usa date_hierarchy: para armar los años/meses recorre toda la tabla.
+    list_filter = ('sale_date', 'payment_method')
+    raw_id_fields = ('seller', 'client', 'cash_drawer_session')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(SaleItem)
+class SaleItemAdmin(admin.ModelAdmin):
+    list_display = ('id', 'sale', 'product', 'quantity', 'unit_price', 'subtotal')
+    list_select_related = ('sale', 'product')
+    raw_id_fields = ('sale', 'product')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(SaleReturn)
+class SaleReturnAdmin(admin.ModelAdmin):
+    list_display = ('id', 'original_sale', 'returned_at', 'returned_by', 'total_refund_amount')
+    list_select_related = ('original_sale', 'returned_by')
+    # Índice salereturn_returned_at.
+    list_filter = ('returned_at',)
+    raw_id_fields = ('original_sale', 'returned_by')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(SaleReturnItem)
+class SaleReturnItemAdmin(admin.ModelAdmin):
+    list_display = ('id', 'return_request', 'product', 'quantity', 'refund_amount')
+    list_select_related = ('return_request', 'product')
+    raw_id_fields = ('return_request', 'product')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    # Libro de solo agregado: se consulta, no se edita (los ajustes se hacen desde product_edit_view).
+    list_display = ('id', 'created_at', 'product', 'quantity', 'reason', 'applied')
+    list_select_related = ('product',)
+    list_filter = ('created_at', 'reason', 'applied')
+    raw_id_fields = ('product',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(LowStockChange)
+class LowStockChangeAdmin(admin.ModelAdmin):
+    # Bitácora que consume low_stock_changes_view; la escribe pos.stock.
+    list_display = ('id', 'created_at', 'product', 'is_low_stock', 'stock')
+    list_select_related = ('product',)
+    list_filter = ('created_at', 'is_low_stock')
+    raw_id_fields = ('product',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 
 # Registro de Modelos Simples
 admin.site.register(Category)
 admin.site.register(Supplier)
-admin.site.register(Sale)
-admin.site.register(SaleItem)
-admin.site.register(Client)
-admin.site.register(SaleReturn)
-admin.site.register(SaleReturnItem)
\ No newline at end of file
+admin.site.register(Client)
\ No newline at end of file
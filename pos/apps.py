@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class PosConfig(AppConfig):
     name = 'pos'
+
+    def ready(self):
+        from . import signals  # noqa: F401  (registra los receivers)
+        from . import metrics  # noqa: F401  (cronómetro SQL en cada conexión nueva)
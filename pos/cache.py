@@ -0,0 +1,187 @@
+# pos/cache.py
+"""
+Cachés de lectura de la caja. Todas viven en la caché de Django, que tiene que
+ser compartida entre procesos (settings.CACHES): las invalidaciones las hace el
+proceso que escribe y deben verlas todos los workers.
+"""
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import CashDrawerSession, Product
+
+# =================================================================
+# Sesión de caja activa por usuario
+# =================================================================
+
+ACTIVE_SESSION_TIMEOUT = 300  # segundos; red de seguridad si se escapa alguna invalidación
+_NO_SESSION = 'none'  # Se cachea también la ausencia de sesión (None no se distingue de un miss)
+# Solo la identidad de la sesión. El balance y los totales cambian con cada venta
+# (UPDATE con F(), sin invalidar) y se cargan de la fila al usarlos: son campos diferidos.
+ACTIVE_SESSION_FIELDS = ('user', 'start_time', 'end_time')
+
+
+def _active_session_key(user_id):
+    return f'pos:cash_session:{user_id}'
+
+
+def _active_session_query(user):
+    return CashDrawerSession.objects.filter(user=user, end_time__isnull=True).only(*ACTIVE_SESSION_FIELDS)
+
+
+def get_active_session(user):
+    """
+    Devuelve la sesión de caja abierta (end_time NULL) del usuario o None.
+    En estado estable no toca la tabla de sesiones: el resultado vive en la caché
+    hasta que la sesión se guarda o se borra (ver signals.py); una venta no la invalida.
+    """
+    if not user.is_authenticated:
+        return None
+
+    key = _active_session_key(user.pk)
+    cached = cache.get(key)
+    if cached is not None:
+        return None if cached == _NO_SESSION else cached
+
+    session = _active_session_query(user).first()
+    cache.set(key, session if session is not None else _NO_SESSION, ACTIVE_SESSION_TIMEOUT)
+    return session
+
+
+async def aget_active_session(user):
+    """get_active_session() para las vistas async (misma clave y misma invalidación)."""
+    if not user.is_authenticated:
+        return None
+
+    key = _active_session_key(user.pk)
+    cached = await cache.aget(key)
+    if cached is not None:
+        return None if cached == _NO_SESSION else cached
+
+    session = await _active_session_query(user).afirst()
+    await cache.aset(key, session if session is not None else _NO_SESSION, ACTIVE_SESSION_TIMEOUT)
+    return session
+
+
+def invalidate_active_session(user_id):
+    """Borra la entrada del usuario cuando la transacción actual confirma."""
+    transaction.on_commit(lambda: cache.delete(_active_session_key(user_id)))
+
+
+# =================================================================
+# Snapshot de producto por SKU (escaneo en caja)
+# =================================================================
+# Un solo nivel, la caché compartida: un LRU por proceso delante de ella
+# seguiría sirviendo precios viejos en los demás workers después de un cambio.
+# El stock del snapshot es orientativo: checkout_view vuelve a validarlo con
+# las filas bloqueadas.
+#
+# Cada entrada guarda (versión del catálogo, snapshot). Los cambios de un
+# producto borran su clave; los masivos (importación, reprecio) solo suben la
+# versión, y toda entrada de una versión anterior cuenta como fallo. Eso evita
+# borrar decenas de miles de claves y también que un request que leyó la fila
+# antes del COMMIT vuelva a dejar el precio viejo en la caché.
+
+PRODUCT_SNAPSHOT_FIELDS = ('id', 'sku', 'name', 'price', 'stock')
+PRODUCT_CACHE_TIMEOUT = 600
+_UNKNOWN_SKU = 'unknown'
+_CATALOG_VERSION_KEY = 'pos:sku:version'
+_sku_stats = {'hits': 0, 'misses': 0}
+
+
+def _product_key(sku):
+    return f'pos:sku:{sku}'
+
+
+def _snapshot_query(sku):
+    # El stock del snapshot es el disponible (foto + movimientos pendientes, ver
+    # pos.stock); stock importa este módulo, de ahí el import diferido.
+    from .stock import with_available_stock
+
+    fields = [field for field in PRODUCT_SNAPSHOT_FIELDS if field != 'stock']
+    return with_available_stock(Product.objects.filter(sku=sku)).values(*fields, 'available_stock')
+
+
+def _snapshot_from_row(row):
+    if row is None:
+        return _UNKNOWN_SKU
+    row['stock'] = row.pop('available_stock')
+    return row
+
+
+def _new_catalog_version():
+    # Sin versión (caché vacía o desalojada): arranca en un valor que no pueda
+    # coincidir con entradas anteriores. add(): si otro worker ya la creó, vale esa.
+    cache.add(_CATALOG_VERSION_KEY, time.time_ns(), None)
+    return cache.get(_CATALOG_VERSION_KEY)
+
+
+def _current_snapshot(entry, version):
+    """El snapshot de la entrada (versión, snapshot) si es de la versión vigente; si no, None."""
+    if entry is not None and entry[0] == version:
+        _sku_stats['hits'] += 1
+        return entry[1]
+    _sku_stats['misses'] += 1
+    return None
+
+
+def get_product_snapshot(sku):
+    """
+    Devuelve {'id', 'sku', 'name', 'price', 'stock'} del producto con ese SKU,
+    o None si no existe. Los SKU inexistentes también se cachean.
+    """
+    key = _product_key(sku)
+    found = cache.get_many([_CATALOG_VERSION_KEY, key])
+    version = found.get(_CATALOG_VERSION_KEY) or _new_catalog_version()
+    snapshot = _current_snapshot(found.get(key), version)
+    if snapshot is None:
+        snapshot = _snapshot_from_row(_snapshot_query(sku).first())
+        cache.set(key, (version, snapshot), PRODUCT_CACHE_TIMEOUT)
+    return None if snapshot == _UNKNOWN_SKU else snapshot
+
+
+async def aget_product_snapshot(sku):
+    """
+    get_product_snapshot() para add_product_view (async); mismas claves e
+    invalidación. Corre entera en un solo salto a hilo: el aget_many de Django
+    pide clave por clave, y así la versión y el SKU siguen saliendo en un único
+    get_many (un MGET en Redis).
+    """
+    return await sync_to_async(get_product_snapshot)(sku)
+
+
+def invalidate_product_skus(skus):
+    """Invalida los snapshots de esos SKU cuando la transacción actual confirma."""
+    keys = [_product_key(sku) for sku in set(skus) if sku]
+    if not keys:
+        return
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_all_product_skus():
+    """
+    Deja viejos todos los snapshots cuando la transacción actual confirma
+    (cambios masivos del catálogo: importación, reprecio).
+    """
+    def _bump():
+        try:
+            cache.incr(_CATALOG_VERSION_KEY)
+        except ValueError:
+            cache.set(_CATALOG_VERSION_KEY, time.time_ns(), None)
+
+    transaction.on_commit(_bump)
+
+
+def sku_cache_stats():
+    """Contadores de aciertos/fallos de este proceso."""
+    stats = dict(_sku_stats)
+    lookups = sum(stats.values())
+    stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+    return stats
+
+
+def reset_sku_cache_stats():
+    for counter in _sku_stats:
+        _sku_stats[counter] = 0
@@ -0,0 +1,125 @@
+# pos/cart.py
+from decimal import ROUND_HALF_UP, Decimal
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+
+from .models import Cart, CartLine
+
+
+class StockLimitReached(Exception):
+    """El carrito ya tiene todas las unidades en stock de ese producto."""
+
+    def __init__(self, stock):
+        self.stock = stock
+        super().__init__(f"Stock máximo alcanzado ({stock}).")
+
+
+def to_cents(amount):
+    """Decimal('3.10') → 310, redondeando al centavo."""
+    return int(Decimal(amount).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP).scaleb(2))
+
+
+def from_cents(cents):
+    """310 → Decimal('3.10')."""
+    return Decimal(cents).scaleb(-2)
+
+
+def add_to_cart(session, product):
+    """
+    Suma una unidad de `product` (snapshot de get_product_snapshot) al carrito
+    de la sesión de caja y devuelve (línea, total en centavos).
+    Cuesta dos sentencias: una lectura de (id, producto, precio, cantidad) de
+    las líneas, de la que salen la línea del producto y el total, y un UPDATE
+    (producto repetido) o un INSERT (producto nuevo). El Cart ya existe desde
+    la apertura de la sesión (ver signals.py) y el total no se guarda aparte.
+    """
+    price_cents = to_cents(product['price'])
+    total_cents = 0
+    current = None
+    for line_id, product_id, unit_price_cents, quantity in (
+        CartLine.objects.filter(cart_id=session.pk).values_list('pk', 'product_id', 'unit_price_cents', 'quantity')
+    ):
+        total_cents += unit_price_cents * quantity
+        if product_id == product['id']:
+            current = {'line_id': line_id, 'unit_price_cents': unit_price_cents, 'quantity': quantity}
+
+    if current is None:
+        try:
+            with transaction.atomic():
+                line = CartLine.objects.create(
+                    cart_id=session.pk,
+                    product_id=product['id'],
+                    sku=product['sku'],
+                    name=product['name'],
+                    unit_price_cents=price_cents,
+                    quantity=1,
+                )
+            return line, total_cents + price_cents
+        except IntegrityError:
+            # Doble escaneo simultáneo: la otra petición ya creó la línea, así que
+            # esta suma su unidad como incremento (con el precio que quedó en la fila).
+            line = CartLine.objects.filter(cart_id=session.pk, product_id=product['id']).first()
+            current = {'line_id': line.pk, 'unit_price_cents': line.unit_price_cents, 'quantity': line.quantity}
+            total_cents += line.subtotal_cents
+
+    # El tope de stock va en el WHERE: dos escaneos simultáneos no lo pasan.
+    updated = CartLine.objects.filter(pk=current['line_id'], quantity__lt=product['stock']).update(
+        quantity=F('quantity') + 1
+    )
+    if not updated:
+        raise StockLimitReached(product['stock'])
+    line = CartLine(
+        pk=current['line_id'],
+        cart_id=session.pk,
+        product_id=product['id'],
+        sku=product['sku'],
+        name=product['name'],
+        unit_price_cents=current['unit_price_cents'],
+        quantity=current['quantity'] + 1,
+    )
+    return line, total_cents + line.unit_price_cents
+
+
+async def aadd_to_cart(session, product):
+    """
+    add_to_cart() para add_product_view (async): corre de una vez en el hilo
+    de la base de datos, un solo salto en lugar de uno por consulta.
+    """
+    return await sync_to_async(add_to_cart)(session, product)
+
+
+def get_cart_lines(session, lock=False):
+    """Líneas del carrito en orden de escaneo. lock=True bloquea el carrito (checkout)."""
+    if session is None:
+        return []
+    if lock:
+        # Dos checkouts simultáneos del mismo carrito (doble clic) se serializan aquí.
+        list(Cart.objects.select_for_update().filter(pk=session.pk))
+    return list(CartLine.objects.filter(cart_id=session.pk).order_by('pk'))
+
+
+def _cart_total_cents(session):
+    return CartLine.objects.filter(cart_id=session.pk).aggregate(
+        total=Sum(F('unit_price_cents') * F('quantity'))
+    )['total'] or 0
+
+
+def get_cart_total(session):
+    """Total del carrito: la suma de sus líneas, en una sola consulta agregada."""
+    if session is None:
+        return Decimal('0.00')
+    return from_cents(_cart_total_cents(session))
+
+
+async def aget_cart_total(session):
+    """get_cart_total() para get_cart_total_view (async)."""
+    if session is None:
+        return Decimal('0.00')
+    return from_cents(await sync_to_async(_cart_total_cents)(session))
+
+
+def clear_cart(session):
+    # Solo las líneas: el Cart es de la sesión y vive lo que ella.
+    CartLine.objects.filter(cart_id=session.pk).delete()
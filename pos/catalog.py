@@ -0,0 +1,73 @@
+# pos/catalog.py
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Category, Product, Supplier
+from .pagination import KeysetPaginator
+from .search import filter_products
+
+CATALOG_PAGE_SIZE = 50
+CATALOG_COUNTS_CACHE_KEY = 'pos:catalog_counts'
+CATALOG_COUNTS_TIMEOUT = 3600  # red de seguridad si se escapa alguna invalidación
+
+# Orden del catálogo → columnas del keyset (la última es única). Por nombre,
+# cada filtro tiene su índice (category|supplier|is_low_stock, name, id); por
+# SKU se usa el índice único, y con un filtro se ordena solo ese subconjunto.
+SORTS = {
+    'name': ('name', 'pk'),
+    'sku': ('sku',),
+}
+DEFAULT_SORT = 'name'
+
+
+def catalog_queryset(query='', category_id=None, supplier_id=None, low_stock=False):
+    """Productos del catálogo con los filtros aplicados (sin orden) y su available_stock."""
+    # stock importa este módulo, de ahí el import diferido.
+    from .stock import with_available_stock
+
+    products = with_available_stock(Product.objects.select_related('category', 'supplier'))
+    if category_id:
+        products = products.filter(category_id=category_id)
+    if supplier_id:
+        products = products.filter(supplier_id=supplier_id)
+    if low_stock:
+        products = products.filter(is_low_stock=True)
+    if query:
+        products = filter_products(products, query)
+    return products
+
+
+def catalog_page(sort=DEFAULT_SORT, after=None, before=None, per_page=CATALOG_PAGE_SIZE, **filters):
+    """Una página (KeysetPage) del catálogo filtrado, en el orden `sort`."""
+    paginator = KeysetPaginator(catalog_queryset(**filters), SORTS.get(sort, SORTS[DEFAULT_SORT]), per_page)
+    return paginator.page(after=after, before=before)
+
+
+def compute_catalog_counts():
+    """
+    Cantidades que muestran los filtros del catálogo: total, stock bajo y
+    productos por categoría y por proveedor (dos GROUP BY sobre tablas chicas).
+    """
+    return {
+        'total': Product.objects.count(),
+        'low_stock': Product.objects.filter(is_low_stock=True).count(),
+        'categories': list(Category.objects.annotate(products=Count('product'))
+                           .order_by('name', 'pk').values('id', 'name', 'products')),
+        'suppliers': list(Supplier.objects.annotate(products=Count('product'))
+                          .order_by('name', 'pk').values('id', 'name', 'products')),
+    }
+
+
+def catalog_counts():
+    """compute_catalog_counts() cacheada hasta el próximo alta, baja o cambio de grupo o de stock bajo."""
+    counts = cache.get(CATALOG_COUNTS_CACHE_KEY)
+    if counts is None:
+        counts = compute_catalog_counts()
+        cache.set(CATALOG_COUNTS_CACHE_KEY, counts, CATALOG_COUNTS_TIMEOUT)
+    return counts
+
+
+def invalidate_catalog_counts():
+    """Borra las cantidades cacheadas cuando la transacción actual confirma."""
+    transaction.on_commit(lambda: cache.delete(CATALOG_COUNTS_CACHE_KEY))
@@ -0,0 +1,397 @@
+# pos/catalog_io.py
+"""
+Importación y exportación masiva del catálogo (listas de precios de
+proveedores, cargas iniciales).
+
+Los archivos (CSV o XLSX) se leen fila a fila y se aplican por lotes: una
+consulta trae los productos del lote por SKU, los nuevos entran con un
+bulk_create y los que cambian con un bulk_update de solo las columnas que
+trae el archivo. Categorías y proveedores se resuelven por nombre con un
+mapa en memoria (los que no existen se crean).
+
+bulk_create/bulk_update no disparan señales: lo que hacen los receivers de
+Product (índice de búsqueda, stock bajo) se hace aquí por lote; las cachés
+del catálogo y de caja se invalidan una vez por importación.
+"""
+import csv
+import io
+import itertools
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from django.db import transaction
+from openpyxl import Workbook, load_workbook
+
+from .cache import invalidate_all_product_skus
+from .catalog import invalidate_catalog_counts
+from .inventory import invalidate_inventory_valuation
+from .models import Category, Product, Supplier
+from .search import index_products
+from .stock import refresh_low_stock, with_available_stock
+
+IMPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_SIZE = 2000
+PREVIEW_LIMIT = 20  # filas de ejemplo por tipo de cambio en el informe
+
+EXPORT_HEADER = ['SKU', 'Producto', 'Categoría', 'Proveedor', 'Precio', 'Costo', 'Stock', 'Umbral de Stock Bajo']
+
+# Encabezado del archivo (en minúsculas) -> campo de Product. Se aceptan los de
+# la exportación, los del formulario y los nombres de campo.
+COLUMNS = {
+    'sku': 'sku', 'sku / código': 'sku', 'código': 'sku', 'codigo': 'sku',
+    'producto': 'name', 'nombre': 'name', 'nombre del producto': 'name', 'name': 'name',
+    'precio': 'price', 'precio de venta': 'price', 'price': 'price',
+    'costo': 'cost', 'precio de costo': 'cost', 'cost': 'cost',
+    'stock': 'stock', 'cantidad en stock': 'stock',
+    'categoría': 'category', 'categoria': 'category', 'category': 'category',
+    'proveedor': 'supplier', 'supplier': 'supplier',
+    'umbral de stock bajo': 'low_stock_threshold', 'umbral': 'low_stock_threshold',
+    'low_stock_threshold': 'low_stock_threshold',
+}
+# Columnas que se comparan y actualizan en productos existentes. El stock solo
+# se toma para altas: en los existentes se ajusta desde el inventario
+# (pos.stock.set_stock), que respeta los movimientos pendientes.
+UPDATE_FIELDS = ('name', 'price', 'cost', 'category', 'supplier', 'low_stock_threshold')
+MAX_PRICE = Decimal('99999999.99')  # max_digits=10, decimal_places=2
+CENT = Decimal('0.01')
+
+
+class CatalogImportError(Exception):
+    """El archivo no se puede importar (formato o encabezado)."""
+
+
+class ImportResult:
+    """Lo que hizo (o haría, con dry_run) una importación."""
+
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.price_changes = 0
+        self.new_categories = []
+        self.new_suppliers = []
+        self.errors = []  # (línea, mensaje)
+        # Ejemplos para el informe (los primeros PREVIEW_LIMIT de cada tipo).
+        self.inserts_preview = []  # (línea, sku, nombre, precio)
+        self.updates_preview = []  # (línea, sku, {campo: (antes, después)})
+        self.prices_preview = []  # (línea, sku, antes, después)
+
+    @property
+    def ok(self):
+        return not self.errors
+
+
+# =================================================================
+# Lectura de archivos
+# =================================================================
+
+def read_rows(file, file_name):
+    """
+    Filas del archivo (listas de celdas, el encabezado primero) sin cargarlo
+    entero: CSV (coma o punto y coma, UTF-8 con o sin BOM) o XLSX (openpyxl en
+    modo read-only).
+    """
+    name = file_name.lower()
+    if name.endswith('.xlsx'):
+        return _read_xlsx(file)
+    if name.endswith(('.csv', '.txt')):
+        return _read_csv(file)
+    raise CatalogImportError("Formato no soportado: use un archivo .csv o .xlsx.")
+
+
+def _read_csv(file):
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    first = text.readline()
+    # Excel en español guarda los CSV con punto y coma.
+    delimiter = ';' if first.count(';') > first.count(',') else ','
+    yield from csv.reader(itertools.chain([first], text), delimiter=delimiter)
+
+
+def _read_xlsx(file):
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            yield list(row)
+    finally:
+        workbook.close()
+
+
+# =================================================================
+# Conversión de celdas
+# =================================================================
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # SKUs numéricos en Excel llegan como 7791234.0
+    return str(value).strip()
+
+
+def _money(value):
+    text = _text(value).replace('$', '').replace(' ', '')
+    # 1.234,50 (Excel en español) o 1,234.50: el último separador es el decimal.
+    if ',' in text and '.' in text:
+        thousands = '.' if text.rfind(',') > text.rfind('.') else ','
+        text = text.replace(thousands, '')
+    text = text.replace(',', '.')
+    try:
+        amount = Decimal(text).quantize(CENT, ROUND_HALF_UP)
+    except InvalidOperation:
+        raise ValueError(f"monto inválido: {value!r}")
+    if not 0 <= amount <= MAX_PRICE:
+        raise ValueError(f"monto fuera de rango: {value!r}")
+    return amount
+
+
+def _quantity(value):
+    try:
+        number = Decimal(_text(value))
+    except InvalidOperation:
+        raise ValueError(f"cantidad inválida: {value!r}")
+    if number != number.to_integral_value() or number < 0:
+        raise ValueError(f"cantidad inválida: {value!r}")
+    return int(number)
+
+
+PARSERS = {
+    'sku': _text, 'name': _text, 'category': _text, 'supplier': _text,
+    'price': _money, 'cost': _money, 'stock': _quantity, 'low_stock_threshold': _quantity,
+}
+MAX_LENGTHS = {'sku': 100, 'name': 200, 'category': 100, 'supplier': 150}
+
+
+def _header_fields(header):
+    """Posición de cada columna conocida en el encabezado."""
+    positions = {}
+    for index, cell in enumerate(header):
+        field = COLUMNS.get(_text(cell).lower())
+        if field and field not in positions:
+            positions[field] = index
+    if 'sku' not in positions:
+        raise CatalogImportError("El archivo no tiene columna SKU.")
+    return positions
+
+
+def _parse_row(cells, positions):
+    """{campo: valor} de las celdas no vacías. Una celda vacía deja el valor actual."""
+    values = {}
+    for field, index in positions.items():
+        cell = cells[index] if index < len(cells) else None
+        if _text(cell) == '':
+            continue
+        value = PARSERS[field](cell)
+        if field in MAX_LENGTHS and len(value) > MAX_LENGTHS[field]:
+            raise ValueError(f"{field} supera {MAX_LENGTHS[field]} caracteres")
+        values[field] = value
+    return values
+
+
+# =================================================================
+# Importación
+# =================================================================
+
+class _GroupMap:
+    """Categorías o proveedores por nombre (sin distinguir mayúsculas), creados a demanda."""
+
+    def __init__(self, model, created, dry_run):
+        self.model = model
+        self.created = created
+        self.dry_run = dry_run
+        self.ids = {}
+        self.names = {}  # para mostrar los cambios con nombres y no con ids
+        for pk, name in model.objects.order_by('pk').values_list('pk', 'name'):
+            self.ids.setdefault(name.casefold(), pk)
+            self.names[pk] = name
+
+    def resolve(self, name):
+        key = name.casefold()
+        if key not in self.ids:
+            self.created.append(name)
+            # En la simulación no se crea: un id que no coincide con ninguno.
+            self.ids[key] = -len(self.created) if self.dry_run else self.model.objects.create(name=name).pk
+            self.names[self.ids[key]] = name
+        return self.ids[key]
+
+
+def import_catalog(rows, dry_run=False, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Aplica las filas (encabezado primero, ver read_rows) al catálogo en una sola
+    transacción, por lotes de `batch_size`. Con dry_run no escribe nada y el
+    resultado cuenta lo que haría. Devuelve un ImportResult.
+    """
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        raise CatalogImportError("El archivo está vacío.")
+    positions = _header_fields(header)
+    result = ImportResult(dry_run)
+
+    with transaction.atomic():
+        groups = {
+            'category': _GroupMap(Category, result.new_categories, dry_run),
+            'supplier': _GroupMap(Supplier, result.new_suppliers, dry_run),
+        }
+        seen = set()
+        batch = []
+        for line, cells in enumerate(rows, start=2):
+            if not any(_text(cell) for cell in cells):
+                continue
+            result.rows += 1
+            try:
+                values = _parse_row(cells, positions)
+            except ValueError as e:
+                result.errors.append((line, str(e)))
+                continue
+            sku = values.get('sku')
+            if not sku:
+                result.errors.append((line, "falta el SKU"))
+                continue
+            if sku in seen:
+                result.errors.append((line, f"SKU {sku} repetido en el archivo (vale la primera fila)"))
+                continue
+            seen.add(sku)
+            for field, group_map in groups.items():
+                if field in values:
+                    values[field] = group_map.resolve(values[field])
+            batch.append((line, values))
+            if len(batch) >= batch_size:
+                _apply_batch(batch, result, groups, batch_size)
+                batch = []
+        if batch:
+            _apply_batch(batch, result, groups, batch_size)
+
+        if dry_run:
+            transaction.set_rollback(True)
+        elif result.inserted or result.updated:
+            # Una sola invalidación para todo el archivo; incluye los SKU nuevos
+            # que la caja ya tenía cacheados como inexistentes.
+            invalidate_all_product_skus()
+            invalidate_inventory_valuation()
+            invalidate_catalog_counts()
+    return result
+
+
+def _field_value(product, field):
+    return getattr(product, f'{field}_id') if field in ('category', 'supplier') else getattr(product, field)
+
+
+def _apply_batch(batch, result, groups, batch_size):
+    fields = [field for field in UPDATE_FIELDS if any(field in values for _, values in batch)]
+    existing = {
+        product.sku: product
+        for product in Product.objects.filter(sku__in=[values['sku'] for _, values in batch])
+        .only('pk', 'sku', *fields)
+    }
+
+    to_create, to_update, updated_fields = [], [], set()
+    renamed, threshold_changed = [], []
+    for line, values in batch:
+        product = existing.get(values['sku'])
+        if product is None:
+            missing = [label for field, label in (('name', 'nombre'), ('price', 'precio')) if field not in values]
+            if missing:
+                result.errors.append((line, f"SKU {values['sku']} es nuevo y le falta: {', '.join(missing)}"))
+                continue
+            to_create.append(Product(**{
+                f'{field}_id' if field in ('category', 'supplier') else field: value
+                for field, value in values.items()
+            }))
+            if len(result.inserts_preview) < PREVIEW_LIMIT:
+                result.inserts_preview.append((line, values['sku'], values['name'], values['price']))
+            continue
+
+        changes = {}
+        for field in fields:
+            if field in values and _field_value(product, field) != values[field]:
+                changes[field] = (_field_value(product, field), values[field])
+        if not changes:
+            result.unchanged += 1
+            continue
+        for field, (_, new) in changes.items():
+            setattr(product, f'{field}_id' if field in ('category', 'supplier') else field, new)
+        to_update.append(product)
+        updated_fields.update(changes)
+        if 'name' in changes:
+            renamed.append(product)
+        if 'low_stock_threshold' in changes:
+            threshold_changed.append(product.pk)
+        if 'price' in changes:
+            result.price_changes += 1
+            if len(result.prices_preview) < PREVIEW_LIMIT:
+                result.prices_preview.append((line, product.sku, *changes['price']))
+        if len(result.updates_preview) < PREVIEW_LIMIT:
+            result.updates_preview.append((line, product.sku, {
+                field: tuple(groups[field].names.get(value) for value in change) if field in groups else change
+                for field, change in changes.items()
+            }))
+
+    result.inserted += len(to_create)
+    result.updated += len(to_update)
+    if result.dry_run:
+        return
+
+    if to_create:
+        to_create = Product.objects.bulk_create(to_create, batch_size=batch_size)
+        if to_create[0].pk is None:  # MySQL no devuelve los pks de bulk_create: se releen por SKU
+            to_create = list(Product.objects.filter(sku__in=[product.sku for product in to_create])
+                             .only('pk', 'sku', 'name'))
+    if to_update:
+        Product.objects.bulk_update(
+            to_update,
+            [f'{field}_id' if field in ('category', 'supplier') else field for field in sorted(updated_fields)],
+            batch_size=batch_size,
+        )
+
+    # Lo que harían las señales de Product (ver pos.signals) con cada save().
+    index_products(to_create + renamed)
+    refresh_low_stock([product.pk for product in to_create] + threshold_changed)
+
+
+# =================================================================
+# Exportación
+# =================================================================
+
+def iter_catalog_rows(chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Filas de EXPORT_HEADER en lotes por keyset sobre el pk (ver
+    inventory.iter_valuation_rows). El stock es el disponible.
+    """
+    queryset = with_available_stock(Product.objects).order_by('pk').values_list(
+        'pk', 'sku', 'name', 'category__name', 'supplier__name', 'price', 'cost', 'available_stock',
+        'low_stock_threshold',
+    )
+    last_pk = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+        for pk, sku, name, category, supplier, price, cost, stock, threshold in rows:
+            yield [sku, name, category or '', supplier or '', price, '' if cost is None else cost, stock, threshold]
+        if len(rows) < chunk_size:
+            return
+        last_pk = rows[-1][0]
+
+
+class _Echo:
+    """Pseudo-archivo para csv.writer: devuelve la línea en lugar de guardarla."""
+
+    def write(self, value):
+        return value
+
+
+def stream_catalog_csv(chunk_size=EXPORT_CHUNK_SIZE):
+    """Líneas CSV del catálogo (re-importable con import_catalog), para un StreamingHttpResponse."""
+    writer = csv.writer(_Echo())
+    yield '\ufeff' + writer.writerow(EXPORT_HEADER)  # BOM: Excel abre el UTF-8 con tildes
+    for row in iter_catalog_rows(chunk_size):
+        yield writer.writerow(row)
+
+
+def write_catalog_excel(fileobj, chunk_size=EXPORT_CHUNK_SIZE):
+    """El catálogo en XLSX, en modo write-only (las filas no se acumulan en memoria)."""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Catálogo")
+    sheet.append(EXPORT_HEADER)
+    for row in iter_catalog_rows(chunk_size):
+        sheet.append(row)
+    workbook.save(fileobj)
@@ -0,0 +1,183 @@
+# pos/dashboard.py
+"""
+Widgets del dashboard como fragmentos HTML cacheados por separado.
+
+Cada widget depende de uno o más grupos de datos ('sales', 'sessions',
+'stock'). Cada grupo tiene un número de versión en la caché que las
+escrituras incrementan al confirmar (bump_dashboard); la clave del fragmento
+lleva las versiones de sus grupos, así que una venta deja viejas solo las
+claves de los widgets de ventas y el resto sigue sirviéndose de la caché.
+El TTL de cada widget es la red de seguridad si se escapa alguna invalidación.
+
+Contra la estampida (muchos dashboards refrescando justo después de una
+venta), solo un request recalcula cada widget: el que toma el candado. Los
+demás sirven la última versión calculada mientras tanto o, si no hay ninguna,
+esperan un momento a que aparezca la nueva. Las versiones, el candado y los
+fragmentos viven en la caché compartida (settings.CACHES), así que valen
+entre todos los workers.
+"""
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from .models import CashDrawerSession, DailyProductSales, DailySalesSummary, Product
+
+DASHBOARD_REFRESH_SECONDS = getattr(settings, 'POS_DASHBOARD_REFRESH', 15)  # polling de HTMX
+TOP_PRODUCTS_DAYS = getattr(settings, 'POS_DASHBOARD_TOP_DAYS', 30)
+LOCK_TIMEOUT = 10  # un cálculo que se cuelgue no bloquea el widget más que esto
+STALE_TIMEOUT = 24 * 3600
+WAIT_SECONDS = 2.0
+WAIT_STEP = 0.05
+
+
+# =================================================================
+# Datos de cada widget
+# =================================================================
+
+def _sales_today():
+    # Todo sale de los rollups diarios (ver pos/rollups.py), nunca de Sale/SaleItem.
+    today_metrics = DailySalesSummary.objects.filter(date=timezone.localdate()).aggregate(
+        total_sales=Sum('total_amount'),
+        num_transactions=Sum('num_transactions')
+    )
+    total_sales = today_metrics.get('total_sales') or Decimal('0.00')
+    num_transactions = today_metrics.get('num_transactions') or 0
+    return {
+        'ventas_hoy': total_sales,
+        'transacciones_hoy': num_transactions,
+        'ticket_promedio': (total_sales / num_transactions) if num_transactions else Decimal('0.00'),
+    }
+
+
+def _active_sessions():
+    return {'sesiones_activas': CashDrawerSession.objects.filter(end_time__isnull=True).count()}
+
+
+def _top_products():
+    # Ventana fija de días: el costo no crece con el historial (rango sobre el
+    # índice único date+product) y la clave del fragmento ya cambia con la fecha.
+    since = timezone.localdate() - timedelta(days=TOP_PRODUCTS_DAYS - 1)
+    top_products = DailyProductSales.objects.filter(date__gte=since).values('product__name') \
+                       .annotate(total_sold=Sum('units')) \
+                       .order_by('-total_sold')[:5]
+    return {'top_products': list(top_products)}
+
+
+def _low_stock():
+    return {'low_stock_count': Product.objects.filter(is_low_stock=True).count()}
+
+
+class Widget:
+    def __init__(self, name, groups, ttl, compute):
+        self.name = name
+        self.groups = groups
+        self.ttl = ttl
+        self.compute = compute
+        self.template = f'pos/dashboard_{name}.html'
+
+
+# Orden = orden en la página. TTL en segundos.
+WIDGETS = {widget.name: widget for widget in (
+    Widget('low_stock', groups=('stock',), ttl=600, compute=_low_stock),
+    Widget('sales_today', groups=('sales',), ttl=300, compute=_sales_today),
+    Widget('active_sessions', groups=('sessions',), ttl=300, compute=_active_sessions),
+    Widget('top_products', groups=('sales',), ttl=900, compute=_top_products),
+)}
+
+
+# =================================================================
+# Versiones por grupo
+# =================================================================
+
+def _version_key(group):
+    return f'pos:dashboard:version:{group}'
+
+
+def _versions(groups):
+    keys = {group: _version_key(group) for group in groups}
+    found = cache.get_many(keys.values())
+    versions = []
+    for group, key in keys.items():
+        version = found.get(key)
+        if version is None:
+            # Sin versión (caché vacía o desalojada): arranca en un valor que no
+            # pueda repetir una clave de fragmento anterior.
+            cache.add(key, time.time_ns(), None)
+            version = cache.get(key)
+        versions.append(version)
+    return versions
+
+
+def bump_dashboard(*groups):
+    """Deja viejos los widgets que dependen de esos grupos cuando la transacción actual confirma."""
+    def _bump():
+        for group in groups:
+            try:
+                cache.incr(_version_key(group))
+            except ValueError:
+                cache.set(_version_key(group), time.time_ns(), None)
+
+    transaction.on_commit(_bump)
+
+
+# =================================================================
+# Fragmentos
+# =================================================================
+
+def _fragment_key(widget):
+    # La fecha en la clave: "hoy" cambia a medianoche aunque no cambie ninguna versión.
+    versions = '.'.join(str(version) for version in _versions(widget.groups))
+    return f'pos:dashboard:{widget.name}:{timezone.localdate().isoformat()}:{versions}'
+
+
+def _stale_key(widget):
+    return f'pos:dashboard:{widget.name}:stale'
+
+
+def _lock_key(widget):
+    return f'pos:dashboard:{widget.name}:lock'
+
+
+def _render(widget, key):
+    html = render_to_string(widget.template, widget.compute())
+    cache.set(key, html, widget.ttl)
+    cache.set(_stale_key(widget), html, STALE_TIMEOUT)
+    return html
+
+
+def render_widget(name):
+    """HTML del widget `name`, desde la caché mientras sus datos no cambien."""
+    widget = WIDGETS[name]
+    key = _fragment_key(widget)
+    html = cache.get(key)
+    if html is not None:
+        return mark_safe(html)
+
+    lock = _lock_key(widget)
+    if cache.add(lock, 1, LOCK_TIMEOUT):
+        try:
+            return mark_safe(_render(widget, key))
+        finally:
+            cache.delete(lock)
+
+    # Otro request lo está recalculando.
+    html = cache.get(_stale_key(widget))
+    deadline = time.monotonic() + WAIT_SECONDS
+    while html is None and time.monotonic() < deadline:
+        time.sleep(WAIT_STEP)
+        html = cache.get(key)
+    # Si el que tenía el candado no terminó a tiempo, se calcula aquí.
+    return mark_safe(html if html is not None else _render(widget, key))
+
+
+def render_widgets():
+    """{nombre: HTML} de todos los widgets, en el orden de la página."""
+    return {name: render_widget(name) for name in WIDGETS}
@@ -0,0 +1,28 @@
+# pos/dates.py
+import datetime
+
+from django.db.models import Q
+from django.utils import timezone
+
+
+def day_start(day):
+    """Medianoche (hora local, aware) del día `day`."""
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def local_date_range(start_date, end_date):
+    """
+    Rango de fechas locales [start_date, end_date] (ambas incluidas) como
+    intervalo semiabierto de datetimes aware: (desde, hasta), con hasta excluido.
+    """
+    return day_start(start_date), day_start(end_date + datetime.timedelta(days=1))
+
+
+def date_range_q(field, start_date, end_date):
+    """
+    Filtro `field >= desde AND field < hasta` para un rango de fechas locales.
+    A diferencia de field__date__gte/lte, no envuelve la columna en un CAST /
+    CONVERT_TZ, así que la base de datos puede usar los índices sobre `field`.
+    """
+    since, until = local_date_range(start_date, end_date)
+    return Q(**{f'{field}__gte': since, f'{field}__lt': until})
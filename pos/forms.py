@@ -1,5 +1,6 @@
 from django import forms
 from .models import Product, Category, Supplier, Client
+from .pricing import PREVIEW_ROWS, ROUNDINGS, RULES
 
 
 # Asume que Category y Supplier están en el mismo archivo models.py
@@ -93,4 +94,38 @@ class ClientForm(forms.ModelForm):
             'email': 'Email',
             'address': 'Dirección',
             'is_professional': 'Cliente Empresarial/Requiere Factura Completa',
-        }
\ No newline at end of file
+        }
+
+class CatalogImportForm(forms.Form):
+    """Archivo de catálogo o lista de precios para pos.catalog_io.import_catalog."""
+    file = forms.FileField(label="Archivo (.csv o .xlsx)")
+    dry_run = forms.BooleanField(required=False, initial=True, label="Solo simular (no guarda cambios)")
+
+
+class RepriceForm(forms.Form):
+    """Selección y regla de pos.pricing para el reprecio masivo por categoría y/o proveedor."""
+    category = forms.ModelChoiceField(queryset=Category.objects.order_by('name'), required=False, label="Categoría")
+    supplier = forms.ModelChoiceField(queryset=Supplier.objects.order_by('name'), required=False, label="Proveedor")
+    rule = forms.ChoiceField(choices=RULES, label="Regla")
+    value = forms.DecimalField(max_digits=10, decimal_places=2, label="Valor (% o $)",
+                               widget=forms.NumberInput(attrs={'step': '0.01'}))
+    rounding = forms.ChoiceField(choices=ROUNDINGS, initial='cent', label="Redondeo")
+    preview_rows = forms.IntegerField(min_value=1, max_value=500, initial=PREVIEW_ROWS, label="Filas de vista previa")
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not cleaned_data.get('category') and not cleaned_data.get('supplier'):
+            raise forms.ValidationError("Elija una categoría, un proveedor o ambos.")
+        value = cleaned_data.get('value')
+        if cleaned_data.get('rule') in ('percent', 'margin') and value is not None and value <= -100:
+            self.add_error('value', "El porcentaje debe ser mayor que -100.")
+        return cleaned_data
+
+    def pricing_args(self):
+        """Argumentos para repricing_preview/apply_repricing."""
+        data = self.cleaned_data
+        return {
+            'rule': data['rule'], 'value': data['value'], 'rounding': data['rounding'],
+            'category_id': data['category'].pk if data['category'] else None,
+            'supplier_id': data['supplier'].pk if data['supplier'] else None,
+        }
@@ -0,0 +1,188 @@
+# pos/inventory.py
+import csv
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Product, StockMovement
+
+VALUATION_CACHE_KEY = 'pos:inventory_valuation'
+VALUATION_CACHE_TIMEOUT = 3600  # red de seguridad si se escapa alguna invalidación
+EXPORT_CHUNK_SIZE = 2000
+NO_SUPPLIER = "Sin proveedor"
+NO_CATEGORY = "Sin categoría"
+
+_MONEY = DecimalField(max_digits=14, decimal_places=2)
+# Con POS_STOCK_MODE='ledger' Product.stock es la foto compactada: los totales
+# suman aparte los movimientos sin aplicar (_pending_by_group) y el detalle por
+# producto usa el disponible, así que la valorización no espera a la compactación.
+
+
+def _value_expressions(units='stock', prefix=''):
+    # Un costo NULL no vale 0: esos productos quedan fuera del valor a costo y del
+    # margen (y se cuentan aparte en missing_cost) en lugar de romper la suma.
+    cost, price = F(f'{prefix}cost'), F(f'{prefix}price')
+    return (
+        ExpressionWrapper(cost * F(units), output_field=_MONEY),
+        ExpressionWrapper(price * F(units), output_field=_MONEY),
+        ExpressionWrapper((price - cost) * F(units), output_field=_MONEY),
+    )
+
+
+COST_VALUE, RETAIL_VALUE, MARGIN_VALUE = _value_expressions()
+ZERO = Decimal('0.00')
+
+VALUATION_TOTALS = ('products', 'units', 'cost_value', 'retail_value', 'margin', 'missing_cost')
+EXPORT_HEADER = ['SKU', 'Producto', 'Proveedor', 'Categoría', 'Stock', 'Costo', 'Precio',
+                 'Valor a Costo', 'Valor a Precio', 'Margen Potencial']
+
+
+def _unit_totals(units, cost_value, retail_value, margin):
+    return {
+        'units': Coalesce(Sum(units), 0),
+        'cost_value': Coalesce(Sum(cost_value), ZERO, output_field=_MONEY),
+        'retail_value': Coalesce(Sum(retail_value), ZERO, output_field=_MONEY),
+        'margin': Coalesce(Sum(margin), ZERO, output_field=_MONEY),
+    }
+
+
+def _pending_totals():
+    """Unidades y valores de los movimientos sin aplicar (índice stockmove_pending)."""
+    return _unit_totals('quantity', *_value_expressions('quantity', prefix='product__'))
+
+
+def _pending_by_group():
+    """{(supplier_id, category_id): totales} de los movimientos que la foto todavía no incluye."""
+    rows = StockMovement.objects.filter(applied=False).values(
+        'product__supplier_id', 'product__category_id',
+    ).annotate(**_pending_totals()).order_by()
+    return {(row.pop('product__supplier_id'), row.pop('product__category_id')): row for row in rows}
+
+
+def _valuation_groups():
+    """
+    Una consulta GROUP BY (proveedor, categoría) con los totales calculados en
+    la base de datos (las filas son pocas: proveedores × categorías), más los
+    movimientos sin aplicar de cada grupo.
+    """
+    rows = list(Product.objects.values(
+        'supplier_id', 'supplier__name', 'category_id', 'category__name',
+    ).annotate(
+        products=Count('id'),
+        **_unit_totals('stock', COST_VALUE, RETAIL_VALUE, MARGIN_VALUE),
+        missing_cost=Count('id', filter=Q(cost__isnull=True)),
+    ).order_by())
+    pending = _pending_by_group()
+    for row in rows:
+        for field, value in pending.get((row['supplier_id'], row['category_id']), {}).items():
+            row[field] += value
+    return rows
+
+
+def _empty_totals(**extra):
+    totals = dict.fromkeys(VALUATION_TOTALS, 0)
+    totals.update(cost_value=ZERO, retail_value=ZERO, margin=ZERO, **extra)
+    return totals
+
+
+def _add(totals, row):
+    for field in VALUATION_TOTALS:
+        totals[field] += row[field]
+
+
+def compute_inventory_valuation():
+    """
+    Valorización de todo el catálogo: {'suppliers': [...], 'categories': [...],
+    'total': {...}}. Cada fila trae products, units, cost_value, retail_value,
+    margin y missing_cost (productos sin costo cargado).
+    """
+    suppliers, categories = {}, {}
+    total = _empty_totals()
+    for row in _valuation_groups():
+        supplier = suppliers.setdefault(row['supplier_id'], _empty_totals(
+            id=row['supplier_id'], name=row['supplier__name'] or NO_SUPPLIER))
+        category = categories.setdefault(row['category_id'], _empty_totals(
+            id=row['category_id'], name=row['category__name'] or NO_CATEGORY))
+        for totals in (supplier, category, total):
+            _add(totals, row)
+
+    def by_value(rows):
+        return sorted(rows.values(), key=lambda row: (-row['cost_value'], row['name']))
+
+    return {'suppliers': by_value(suppliers), 'categories': by_value(categories), 'total': total}
+
+
+def inventory_valuation():
+    """compute_inventory_valuation() cacheada hasta el próximo cambio de stock o costo."""
+    valuation = cache.get(VALUATION_CACHE_KEY)
+    if valuation is None:
+        valuation = compute_inventory_valuation()
+        cache.set(VALUATION_CACHE_KEY, valuation, VALUATION_CACHE_TIMEOUT)
+    return valuation
+
+
+def invalidate_inventory_valuation():
+    """Borra la valorización cacheada cuando la transacción actual confirma."""
+    transaction.on_commit(lambda: cache.delete(VALUATION_CACHE_KEY))
+
+
+def supplier_valuation(supplier):
+    """Totales de un proveedor (supplier_inventory_view): foto + movimientos sin aplicar."""
+    totals = Product.objects.filter(supplier=supplier).aggregate(
+        **_unit_totals('stock', COST_VALUE, RETAIL_VALUE, MARGIN_VALUE),
+        missing_cost=Count('id', filter=Q(cost__isnull=True)),
+    )
+    pending = StockMovement.objects.filter(applied=False, product__supplier=supplier).aggregate(
+        **_pending_totals())
+    for field, value in pending.items():
+        totals[field] += value
+    return totals
+
+
+def iter_valuation_rows(chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Detalle por producto con los valores calculados en SQL, en lotes por keyset
+    sobre el pk (cada lote es un LIMIT independiente, ver reports.iter_sale_rows).
+    El stock es el disponible (foto + movimientos sin aplicar).
+    """
+    # stock importa este módulo, de ahí el import diferido.
+    from .stock import with_available_stock
+
+    cost_value, retail_value, margin = _value_expressions('available_stock')
+    queryset = with_available_stock(Product.objects).annotate(
+        cost_value=cost_value, retail_value=retail_value, margin=margin,
+    ).order_by('pk').values_list(
+        'pk', 'sku', 'name', 'supplier__name', 'category__name', 'available_stock', 'cost', 'price',
+        'cost_value', 'retail_value', 'margin',
+    )
+    last_pk = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+        for pk, sku, name, supplier, category, stock, *amounts in rows:
+            yield [sku, name, supplier or NO_SUPPLIER, category or NO_CATEGORY, stock, *map(_money, amounts)]
+        if len(rows) < chunk_size:
+            return
+        last_pk = rows[-1][0]
+
+
+def _money(value):
+    # Vacío si falta el costo; dos decimales fijos (SQLite devuelve 22.5 en vez de 22.50).
+    return '' if value is None else Decimal(value).quantize(ZERO)
+
+
+class _Echo:
+    """Pseudo-archivo para csv.writer: devuelve la línea en lugar de guardarla."""
+
+    def write(self, value):
+        return value
+
+
+def stream_valuation_csv(chunk_size=EXPORT_CHUNK_SIZE):
+    """Líneas CSV del detalle por producto, para un StreamingHttpResponse."""
+    writer = csv.writer(_Echo())
+    yield '\ufeff' + writer.writerow(EXPORT_HEADER)  # BOM: Excel abre el UTF-8 con tildes
+    for row in iter_valuation_rows(chunk_size):
+        yield writer.writerow(row)
@@ -0,0 +1,138 @@
+# pos/jobs.py
+import functools
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ReportJob
+from .reports import sales_in_range, write_sales_excel, write_sales_pdf
+
+REPORT_EXTENSIONS = {'excel': 'xlsx', 'pdf': 'pdf', 'pdf_summary': 'pdf'}
+REPORT_WRITERS = {
+    'excel': write_sales_excel,
+    'pdf': write_sales_pdf,
+    'pdf_summary': functools.partial(write_sales_pdf, summary=True),
+}
+
+
+def reports_root():
+    """Carpeta donde el worker deja los archivos generados (settings.REPORTS_ROOT)."""
+    return Path(getattr(settings, 'REPORTS_ROOT', Path(settings.BASE_DIR) / 'reports'))
+
+
+def report_path(job):
+    return reports_root() / job.file_name
+
+
+def _reusable(job):
+    """
+    Un reporte terminado solo sirve para otra solicitud idéntica si su rango ya
+    estaba cerrado cuando se generó (si incluía el día en curso, faltarían ventas).
+    """
+    return (
+        job.status == ReportJob.STATUS_DONE
+        and job.end_date < timezone.localdate(job.finished_at)
+        and report_path(job).exists()
+    )
+
+
+def enqueue_report(report_format, start_date, end_date, user=None):
+    """
+    Devuelve el trabajo que atenderá la solicitud: uno idéntico en cola/en curso,
+    uno ya generado y reutilizable, o uno nuevo en cola.
+    """
+    candidates = ReportJob.objects.filter(
+        report_format=report_format,
+        start_date=start_date,
+        end_date=end_date,
+        status__in=[ReportJob.STATUS_PENDING, ReportJob.STATUS_RUNNING, ReportJob.STATUS_DONE],
+    ).order_by('-created_at')
+
+    for job in candidates:
+        if job.status != ReportJob.STATUS_DONE or _reusable(job):
+            return job
+
+    return ReportJob.objects.create(
+        report_format=report_format,
+        start_date=start_date,
+        end_date=end_date,
+        requested_by=user,
+    )
+
+
+def claim_jobs(limit):
+    """
+    Toma hasta `limit` trabajos en cola y los marca como 'running'.
+    SKIP LOCKED permite varios workers sin que dos tomen el mismo trabajo.
+    """
+    if limit <= 0:
+        return []
+    with transaction.atomic():
+        jobs = list(
+            ReportJob.objects.select_for_update(skip_locked=True)
+            .filter(status=ReportJob.STATUS_PENDING)
+            .order_by('created_at')[:limit]
+        )
+        ReportJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=ReportJob.STATUS_RUNNING, started_at=timezone.now(), progress=0
+        )
+    return [job.pk for job in jobs]
+
+
+def requeue_stale_jobs(older_than):
+    """Devuelve a la cola los trabajos 'running' de un worker que murió."""
+    return ReportJob.objects.filter(
+        status=ReportJob.STATUS_RUNNING,
+        started_at__lt=timezone.now() - older_than,
+    ).update(status=ReportJob.STATUS_PENDING, progress=0)
+
+
+def requeue_job(job_id):
+    ReportJob.objects.filter(pk=job_id, status=ReportJob.STATUS_RUNNING).update(
+        status=ReportJob.STATUS_PENDING, progress=0
+    )
+
+
+def fail_job(job_id, error):
+    """Marca como fallido un trabajo cuyo proceso murió sin llegar a registrar el error."""
+    ReportJob.objects.filter(pk=job_id, status=ReportJob.STATUS_RUNNING).update(
+        status=ReportJob.STATUS_FAILED, error=str(error), finished_at=timezone.now()
+    )
+
+
+def run_report_job(job_id):
+    """Genera el archivo de un trabajo ya reclamado. Se ejecuta en un proceso del pool."""
+    job = ReportJob.objects.get(pk=job_id)
+    sales = sales_in_range(job.start_date, job.end_date)
+    total = sales.count() or 1
+
+    def progress(done):
+        ReportJob.objects.filter(pk=job.pk).update(progress=min(99, done * 100 // total))
+
+    file_name = f"ventas_{job.report_format}_{job.start_date:%Y%m%d}_{job.end_date:%Y%m%d}_{job.pk}" \
+                f".{REPORT_EXTENSIONS[job.report_format]}"
+    path = reports_root() / file_name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + '.part')
+
+    try:
+        writer = REPORT_WRITERS[job.report_format]
+        with open(tmp_path, 'wb') as output:
+            if job.report_format == 'excel':
+                writer(sales, output, progress=progress)
+            else:
+                writer(sales, output, f"{job.start_date} a {job.end_date}", progress=progress)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        tmp_path.unlink(missing_ok=True)
+        ReportJob.objects.filter(pk=job.pk).update(
+            status=ReportJob.STATUS_FAILED, error=str(e), finished_at=timezone.now()
+        )
+        raise
+
+    ReportJob.objects.filter(pk=job.pk).update(
+        status=ReportJob.STATUS_DONE, progress=100, file_name=file_name, finished_at=timezone.now()
+    )
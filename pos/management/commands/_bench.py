@@ -0,0 +1,99 @@
+# pos/management/commands/_bench.py
+"""Utilidades compartidas por los comandos de benchmark (bench_*)."""
+import datetime
+import json
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import connection, reset_queries
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment,
+)
+from django.utils import timezone
+
+BENCHMARK_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pos-bench'},
+}
+
+
+@contextmanager
+def benchmark_database(keepdb=False, verbosity=0):
+    """
+    Crea la base de datos de pruebas (test_<NAME>) y la destruye al terminar,
+    para que los datos sintéticos nunca toquen la base real. Por lo mismo usa
+    una caché en memoria propia en lugar de la compartida (Redis): los ids de
+    los usuarios y productos sintéticos pisarían las claves de los reales.
+    """
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, keepdb=keepdb)
+    try:
+        with override_settings(CACHES=BENCHMARK_CACHES):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity, keepdb=keepdb)
+        teardown_test_environment()
+
+
+@contextmanager
+def measure():
+    """Mide tiempo (ms) y número de consultas SQL del bloque."""
+    result = {}
+    reset_queries()  # el log de consultas se trunca en 9000 y las cuentas darían 0
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        yield result
+        result['ms'] = (time.perf_counter() - start) * 1000
+    result['queries'] = len(queries)
+
+
+def spread_sale_dates(sales, days, slots_per_day=1):
+    """
+    auto_now_add ignora el sale_date de bulk_create: reparte las ventas del
+    queryset a lo largo de los últimos `days` días, en `slots_per_day` franjas
+    por día, por bloques contiguos de pk (pk creciente = fecha creciente).
+    """
+    from pos.models import Sale
+
+    ids = list(sales.order_by('pk').values_list('pk', flat=True))
+    slots = max(1, days * slots_per_day)
+    block = max(1, -(-len(ids) // slots))
+    origin = timezone.now() - datetime.timedelta(days=days)
+    step = datetime.timedelta(days=days) / slots
+    for slot, start in enumerate(range(0, len(ids), block)):
+        chunk = ids[start:start + block]
+        Sale.objects.filter(pk__gte=chunk[0], pk__lte=chunk[-1]).update(sale_date=origin + slot * step)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    """Resume una lista de mediciones de measure(). Sin mediciones solo informa runs=0."""
+    if not samples:
+        return {'runs': 0}
+    times = [s['ms'] for s in samples]
+    return {
+        'runs': len(samples),
+        'p50_ms': round(statistics.median(times), 3),
+        'p95_ms': round(percentile(times, 95), 3),
+        'p99_ms': round(percentile(times, 99), 3),
+        'max_ms': round(max(times), 3),
+        'queries': max(s['queries'] for s in samples),
+    }
+
+
+def write_results(command, rows, columns, as_json=False):
+    """Imprime los resultados como tabla o como JSON (para comparar corridas)."""
+    if as_json:
+        command.stdout.write(json.dumps(rows, indent=2, default=str))
+        return
+    widths = [max(len(str(c)), *(len(str(r.get(c, ''))) for r in rows)) for c in columns]
+    command.stdout.write('  '.join(str(c).rjust(w) for c, w in zip(columns, widths)))
+    for row in rows:
+        command.stdout.write('  '.join(str(row.get(c, '')).rjust(w) for c, w in zip(columns, widths)))
@@ -0,0 +1,120 @@
+# pos/management/commands/bench_admin.py
+import datetime
+import random
+from decimal import Decimal
+from urllib.parse import urlencode
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import Client as TestClient
+from django.utils import timezone
+
+from pos.dates import local_date_range
+from pos.models import CashDrawerSession, Client, Product, Sale, SaleItem, SaleReturn, SaleReturnItem
+from pos.rollups import next_month
+from ._bench import benchmark_database, measure, spread_sale_dates, summarize, write_results
+
+
+class Command(BaseCommand):
+    help = "Mide los listados del admin de ventas, líneas y devoluciones sobre tablas grandes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=5000000, help="Líneas de venta (SaleItem) sintéticas.")
+        parser.add_argument('--items-per-sale', type=int, default=3, help="Líneas por venta.")
+        parser.add_argument('--products', type=int, default=5000, help="Productos sintéticos.")
+        parser.add_argument('--days', type=int, default=730, help="Días hacia atrás en que se reparten las ventas.")
+        parser.add_argument('--repeat', type=int, default=10, help="Cargas por listado.")
+        parser.add_argument('--json', action='store_true', help="Salida en JSON.")
+        parser.add_argument('--keepdb', action='store_true', help="Reutiliza la base de pruebas.")
+
+    def handle(self, *args, **options):
+        with benchmark_database(keepdb=options['keepdb']):
+            self._seed(options)
+            admin_user = User.objects.create_superuser('bench_admin', password='bench')
+            client = TestClient()
+            client.force_login(admin_user)
+
+            today = timezone.localdate()
+            this_month = local_date_range(today.replace(day=1), next_month(today) - datetime.timedelta(days=1))
+            day = local_date_range(today, today)
+            sale = Sale.objects.order_by('pk')[Sale.objects.count() // 2]
+            pages = {
+                'sale_list': '/admin/pos/sale/',
+                'sale_list_page_200': '/admin/pos/sale/?p=200',
+                # Mismos parámetros que arma el filtro de fecha del admin.
+                'sale_list_month': '/admin/pos/sale/?' + urlencode({
+                    'sale_date__gte': this_month[0], 'sale_date__lt': this_month[1]}),
+                'sale_list_day_card': '/admin/pos/sale/?' + urlencode({
+                    'sale_date__gte': day[0], 'sale_date__lt': day[1], 'payment_method__exact': 'card'}),
+                'sale_list_month_card_page_10': '/admin/pos/sale/?' + urlencode({
+                    'sale_date__gte': this_month[0], 'sale_date__lt': this_month[1],
+                    'payment_method__exact': 'card', 'p': 10}),
+                'saleitem_list': '/admin/pos/saleitem/',
+                'saleitem_list_page_500': '/admin/pos/saleitem/?p=500',
+                'saleitem_list_by_sale': f'/admin/pos/saleitem/?sale__id__exact={sale.pk}',
+                'salereturn_list': '/admin/pos/salereturn/',
+                'salereturnitem_list': '/admin/pos/salereturnitem/',
+                'sale_change': f'/admin/pos/sale/{sale.pk}/change/',
+            }
+
+            rows = []
+            for label, url in pages.items():
+                samples = []
+                for _ in range(max(1, options['repeat'])):
+                    with measure() as sample:
+                        response = client.get(url)
+                    assert response.status_code == 200, (label, response.status_code)
+                    samples.append(sample)
+                rows.append({'page': label, **summarize(samples)})
+
+        write_results(self, rows, ['page', 'runs', 'p50_ms', 'p95_ms', 'max_ms', 'queries'], options['json'])
+
+    def _seed(self, options):
+        rng = random.Random(13)
+        per_sale = max(1, options['items_per_sale'])
+        n_sales = max(1, options['items'] // per_sale)
+
+        users = [User.objects.create_user(f'bench_cajero_{i}', password='bench') for i in range(5)]
+        sessions = CashDrawerSession.objects.bulk_create(
+            CashDrawerSession(user=users[i % 5], starting_balance=Decimal('0.00')) for i in range(options['days'])
+        )
+        clients = Client.objects.bulk_create(
+            Client(first_name=f"Cliente {i}", last_name="Bench", tax_id=f"BENCH{i:08d}") for i in range(1000)
+        )
+        products = Product.objects.bulk_create(
+            (Product(name=f"Producto {i}", sku=f"SKU-{i:07d}", price=Decimal('3.10') + i % 50, stock=10 ** 6)
+             for i in range(options['products'])),
+            batch_size=5000,
+        )
+
+        Sale.objects.bulk_create(
+            (Sale(total_amount=Decimal(rng.randrange(100, 50000)) / 100, seller=users[i % 5],
+                  cash_drawer_session=sessions[i * len(sessions) // n_sales],
+                  payment_method=rng.choice(['cash', 'card']),
+                  client=rng.choice(clients) if i % 3 == 0 else None)
+             for i in range(n_sales)),
+            batch_size=5000,
+        )
+        spread_sale_dates(Sale.objects.all(), days=options['days'])
+
+        sale_ids = Sale.objects.order_by('pk').values_list('pk', flat=True)
+        SaleItem.objects.bulk_create(
+            (SaleItem(sale_id=sale_id, product=product, quantity=1, unit_price=product.price,
+                      subtotal=product.price, product_name=product.name)
+             for sale_id in sale_ids.iterator(chunk_size=5000)
+             for product in rng.sample(products, per_sale)),
+            batch_size=5000,
+        )
+
+        # Una devolución cada 50 ventas.
+        return_requests = SaleReturn.objects.bulk_create(
+            (SaleReturn(original_sale_id=sale_id, returned_by=users[0], total_refund_amount=Decimal('3.10'))
+             for index, sale_id in enumerate(sale_ids.iterator(chunk_size=5000)) if index % 50 == 0),
+            batch_size=5000,
+        )
+        SaleReturnItem.objects.bulk_create(
+            (SaleReturnItem(return_request=request, product=products[0], quantity=1, refund_amount=Decimal('3.10'))
+             for request in return_requests),
+            batch_size=5000,
+        )
+        self.stdout.write(f"{n_sales} ventas, {n_sales * per_sale} líneas, {len(return_requests)} devoluciones.")
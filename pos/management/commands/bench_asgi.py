@@ -0,0 +1,215 @@
+# pos/management/commands/bench_asgi.py
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client as TestClient
+from django.urls import reverse
+
+from pos.models import CashDrawerSession, Client, Product
+from pos.search import rebuild_client_index
+from ._bench import benchmark_database, summarize, write_results
+from .bench_client_search import FIRST_NAMES, LAST_NAMES, _tax_id
+
+MODES = ('wsgi', 'asgi')
+KINDS = ('scan', 'total', 'search')
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara throughput y latencia (p50/p99) de las vistas de alta frecuencia (escaneo, total del "
+        "carrito, búsqueda de clientes) con muchas cajas a la vez, despachadas como WSGI (N hilos) y como "
+        "ASGI (N event loops) con la misma cantidad de workers. Todo corre dentro de este proceso con el "
+        "test client (Client / AsyncClient): mide cómo el handler y el ORM reparten el trabajo entre hilos "
+        "y event loops, no un servidor real (gunicorn/uvicorn) con sockets, parseo HTTP ni procesos "
+        "separados. --db-latency-ms simula la ida y vuelta a un MySQL en red. Las peticiones que fallan "
+        "se cuentan en 'errors' y no entran en las latencias. Requiere una base con escrituras "
+        "concurrentes (MySQL, o SQLite en archivo)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--terminals', type=int, default=32, help="Cajas simultáneas.")
+        parser.add_argument('--workers', type=int, default=4, help="Hilos WSGI / event loops ASGI.")
+        parser.add_argument('--requests', type=int, default=30, help="Peticiones por caja.")
+        parser.add_argument('--db-latency-ms', type=float, default=2.0,
+                            help="Demora agregada a cada consulta SQL (0 = base local).")
+        parser.add_argument('--modes', default=','.join(MODES), help="Modos a comparar, separados por coma.")
+        parser.add_argument('--json', action='store_true', help="Salida en JSON.")
+        parser.add_argument('--keepdb', action='store_true', help="Reutiliza la base de pruebas.")
+
+    def handle(self, *args, **options):
+        rows = []
+        with benchmark_database(keepdb=options['keepdb']):
+            skus, users = self._seed(options)
+            with _db_latency(options['db_latency_ms'] / 1000):
+                for mode in options['modes'].split(','):
+                    run = self._run_wsgi if mode == 'wsgi' else self._run_asgi
+                    samples, elapsed = run(users, skus, options)
+                    ok = [s for s in samples if not s['error']]
+                    rows.append({'mode': mode, 'endpoint': 'all', 'per_second': round(len(ok) / elapsed, 1),
+                                 'errors': len(samples) - len(ok), **summarize(ok)})
+                    for kind in KINDS:
+                        of_kind = [s for s in samples if s['kind'] == kind]
+                        rows.append({'mode': mode, 'endpoint': kind,
+                                     'errors': sum(s['error'] is not None for s in of_kind),
+                                     **summarize([s for s in of_kind if not s['error']])})
+                    for error in sorted({s['error'] for s in samples if s['error']}):
+                        self.stderr.write(f"{mode}: {error}")
+        write_results(self, rows, ['mode', 'endpoint', 'per_second', 'runs', 'errors', 'p50_ms', 'p99_ms',
+                                   'max_ms'], options['json'])
+
+    def _seed(self, options):
+        rng = random.Random(20)
+        products = Product.objects.bulk_create(
+            Product(name=f"Producto {i}", sku=f"ASGI-{i:05d}", price=Decimal('3.10'), stock=10 ** 6)
+            for i in range(200)
+        )
+        Client.objects.bulk_create(
+            (Client(first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES), tax_id=_tax_id(i))
+             for i in range(5000)),
+            batch_size=5000,
+        )
+        rebuild_client_index()
+        users = []
+        for i in range(options['terminals']):
+            user = User.objects.create_user(f'bench_caja_{i}', password='bench')
+            CashDrawerSession.objects.create(user=user, starting_balance=Decimal('0.00'))
+            users.append(user)
+        return [product.sku for product in products], users
+
+    def _requests(self, index, skus, count):
+        """Secuencia de peticiones de una caja: escaneos, consultas del total y búsquedas de cliente."""
+        rng = random.Random(index)
+        urls = {'scan': reverse('add_product'), 'total': reverse('update_total'),
+                'search': reverse('client_search_ajax')}
+        for i in range(count):
+            kind = KINDS[i % len(KINDS)]
+            if kind == 'scan':
+                yield kind, 'post', urls[kind], {'sku': rng.choice(skus)}
+            elif kind == 'total':
+                yield kind, 'get', urls[kind], {}
+            else:
+                yield kind, 'get', urls[kind], {'q': rng.choice(LAST_NAMES)[:4]}
+
+    def _run_wsgi(self, users, skus, options):
+        """N hilos atienden a todas las cajas: una petición ocupa un hilo hasta que responde."""
+        samples = []
+        pool = ThreadPoolExecutor(max_workers=options['workers'])
+
+        def call(client, method, url, data):
+            try:
+                response = getattr(client, method)(url, data)
+            except Exception as e:
+                return _error(url, e)
+            return _error(url, response)
+
+        clients = []
+        for user in users:
+            clients.append(TestClient(raise_request_exception=False))
+            clients[-1].force_login(user)
+
+        async def terminal(index, client):
+            loop = asyncio.get_running_loop()
+            for kind, method, url, data in self._requests(index, skus, options['requests']):
+                start = time.perf_counter()
+                error = await loop.run_in_executor(pool, call, client, method, url, data)
+                samples.append({'kind': kind, 'ms': (time.perf_counter() - start) * 1000, 'queries': 0,
+                                'error': error})
+
+        async def main():
+            await asyncio.gather(*(terminal(i, client) for i, client in enumerate(clients)))
+
+        start = time.perf_counter()
+        asyncio.run(main())
+        elapsed = time.perf_counter() - start
+        pool.shutdown()
+        return samples, elapsed
+
+    def _run_asgi(self, users, skus, options):
+        """N event loops (uno por worker) con las cajas repartidas: cada loop atiende muchas a la vez."""
+        samples = []
+        lock = threading.Lock()
+
+        clients = []
+        for user in users:
+            clients.append(AsyncClient(raise_request_exception=False))
+            clients[-1].force_login(user)
+
+        async def terminal(index, client):
+            local = []
+            for kind, method, url, data in self._requests(index, skus, options['requests']):
+                start = time.perf_counter()
+                # Lo que hace ASGIHandler por petición (AsyncClient lo omite): un
+                # contexto propio para el ORM y el cierre de la conexión al final.
+                try:
+                    async with ThreadSensitiveContext():
+                        response = await getattr(client, method)(url, data)
+                        await sync_to_async(close_old_connections)()
+                    error = _error(url, response)
+                except Exception as e:
+                    error = _error(url, e)
+                local.append({'kind': kind, 'ms': (time.perf_counter() - start) * 1000, 'queries': 0,
+                              'error': error})
+            with lock:
+                samples.extend(local)
+
+        def worker(assigned):
+            async def main():
+                await asyncio.gather(*(terminal(i, client) for i, client in assigned))
+            asyncio.run(main())
+
+        workers = [
+            threading.Thread(target=worker, args=([(i, client) for i, client in enumerate(clients)
+                                                    if i % options['workers'] == w],))
+            for w in range(options['workers'])
+        ]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        return samples, elapsed
+
+
+def _error(url, outcome):
+    """None si la petición respondió 200; si no, una descripción corta del fallo."""
+    if isinstance(outcome, Exception):
+        return f"{url}: {type(outcome).__name__}: {outcome}"
+    if outcome.status_code != 200:
+        return f"{url}: HTTP {outcome.status_code}"
+    return None
+
+
+class _db_latency:
+    """Agrega `seconds` a cada consulta de todas las conexiones (simula la red hasta la base)."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def _delay(self, execute, sql, params, many, context):
+        time.sleep(self.seconds)
+        return execute(sql, params, many, context)
+
+    def _install(self, sender, connection, **kwargs):
+        connection.execute_wrappers.append(self._delay)
+
+    def __enter__(self):
+        if self.seconds:
+            connection.execute_wrappers.append(self._delay)
+            connection_created.connect(self._install)
+        return self
+
+    def __exit__(self, *exc):
+        if self.seconds:
+            connection_created.disconnect(self._install)
+            if self._delay in connection.execute_wrappers:
+                connection.execute_wrappers.remove(self._delay)
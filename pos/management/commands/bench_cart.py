@@ -0,0 +1,65 @@
+# pos/management/commands/bench_cart.py
+import random
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import Client as TestClient
+from django.urls import reverse
+
+from pos.models import CashDrawerSession, Product
+from ._bench import benchmark_database, measure, summarize, write_results
+
+
+class Command(BaseCommand):
+    help = "Mide el escaneo con carritos grandes: líneas nuevas, repetidas, total, pantalla de caja y checkout."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=5000, help="SKUs sintéticos en el catálogo.")
+        parser.add_argument('--lines', type=int, default=100, help="Líneas distintas por carrito.")
+        parser.add_argument('--carts', type=int, default=5, help="Carritos completos a escanear.")
+        parser.add_argument('--repeats', type=int, default=2, help="Re-escaneos de cada línea (cantidad > 1).")
+        parser.add_argument('--json', action='store_true', help="Salida en JSON.")
+        parser.add_argument('--keepdb', action='store_true', help="Reutiliza la base de pruebas.")
+
+    def handle(self, *args, **options):
+        lines = min(options['lines'], options['products'])
+        with benchmark_database(keepdb=options['keepdb']):
+            Product.objects.bulk_create(
+                (Product(name=f"Producto {i}", sku=f"SKU-{i:07d}", price=Decimal('3.10') + i % 7, stock=10 ** 6)
+                 for i in range(options['products'])),
+                batch_size=2000,
+            )
+            user = User.objects.create_user('bench_cajero', password='bench')
+            CashDrawerSession.objects.create(user=user, starting_balance=Decimal('0.00'))
+            client = TestClient()
+            client.force_login(user)
+            urls = {name: reverse(name) for name in ('add_product', 'update_total', 'pos_main', 'checkout')}
+
+            rng = random.Random(42)
+            samples = {name: [] for name in ('first_scan', 'repeat_scan', 'total', 'pos_view', 'checkout')}
+
+            for _ in range(options['carts']):
+                skus = [f"SKU-{i:07d}" for i in rng.sample(range(options['products']), lines)]
+                for label, batch in (('first_scan', skus), ('repeat_scan', skus * options['repeats'])):
+                    for sku in batch:
+                        with measure() as sample:
+                            client.post(urls['add_product'], {'sku': sku})
+                        samples[label].append(sample)
+
+                for label, method, url in (('total', client.post, urls['update_total']),
+                                           ('pos_view', client.get, urls['pos_main']),
+                                           ('checkout', client.post, urls['checkout'])):
+                    with measure() as sample:
+                        response = method(url, {'payment_method': 'card'} if label == 'checkout' else {})
+                    assert response.status_code == 200, (label, response.status_code)
+                    samples[label].append(sample)
+
+            rows = [
+                {'scenario': label, **summarize(values),
+                 'per_second': round(1000 * len(values) / sum(s['ms'] for s in values), 1)}
+                for label, values in samples.items()
+            ]
+
+        write_results(self, rows, ['scenario', 'runs', 'p50_ms', 'p95_ms', 'max_ms', 'queries', 'per_second'],
+                      options['json'])
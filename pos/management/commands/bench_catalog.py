@@ -0,0 +1,108 @@
+# pos/management/commands/bench_catalog.py
+import random
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import Client as TestClient
+from django.urls import reverse
+
+from pos.models import Category, Product, Supplier
+from pos.pagination import encode_cursor
+from pos.search import rebuild_product_index
+from ._bench import benchmark_database, measure, summarize, write_results
+
+KINDS = ['Clavo', 'Tornillo', 'Tuerca', 'Arandela', 'Taco', 'Bisagra', 'Cerradura', 'Llave', 'Martillo',
+         'Destornillador', 'Pinza', 'Cinta', 'Pintura', 'Brocha', 'Rodillo', 'Lija', 'Cable', 'Enchufe',
+         'Foco', 'Caño', 'Codo', 'Canilla', 'Silicona', 'Pegamento', 'Manguera']
+DETAILS = ['galvanizado', 'acero inoxidable', 'bronce', 'zincado', 'negro', 'blanco', 'reforzado', 'PVC']
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el catálogo de productos (product_list_view) paginado por keyset: primera página y páginas "
+        "profundas, con y sin filtros y búsqueda, sobre un catálogo grande."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=40000, help="Productos sintéticos.")
+        parser.add_argument('--repeat', type=int, default=20, help="Cargas por escenario.")
+        parser.add_argument('--legacy', action='store_true',
+                            help="Incluye la consulta con OFFSET a la misma profundidad para comparar.")
+        parser.add_argument('--json', action='store_true', help="Salida en JSON.")
+        parser.add_argument('--keepdb', action='store_true', help="Reutiliza la base de pruebas.")
+
+    def handle(self, *args, **options):
+        with benchmark_database(keepdb=options['keepdb']):
+            category, supplier = self._seed(options)
+            admin_user = User.objects.create_user('bench_admin', password='bench', is_staff=True)
+            client = TestClient()
+            client.force_login(admin_user)
+
+            deep = int(options['products'] * 0.95)
+            by_name = Product.objects.order_by('name', 'pk')
+            deep_name = by_name[deep]
+            deep_sku = Product.objects.order_by('sku')[deep]
+            in_category = by_name.filter(category=category)
+            deep_category = in_category[in_category.count() * 9 // 10]
+
+            scenarios = {
+                'first_page': {},
+                'deep_page': {'after': encode_cursor([deep_name.name, deep_name.pk])},
+                'deep_page_back': {'before': encode_cursor([deep_name.name, deep_name.pk])},
+                'sku_first_page': {'sort': 'sku'},
+                'sku_deep_page': {'sort': 'sku', 'after': encode_cursor([deep_sku.sku])},
+                'category': {'category': category.pk},
+                'category_deep': {'category': category.pk,
+                                  'after': encode_cursor([deep_category.name, deep_category.pk])},
+                'supplier': {'supplier': supplier.pk},
+                'low_stock': {'filter': 'low_stock'},
+                'search_word': {'q': 'tornillo'},
+                'search_words': {'q': 'tornillo galv'},
+                'search_category': {'q': 'clavo', 'category': category.pk},
+            }
+
+            url = reverse('product_list')
+            rows = []
+            for label, params in scenarios.items():
+                samples = []
+                for _ in range(max(1, options['repeat'])):
+                    with measure() as sample:
+                        response = client.get(url, params)
+                    assert response.status_code == 200, (label, response.status_code)
+                    samples.append(sample)
+                rows.append({'scenario': label, **summarize(samples), 'kb': round(len(response.content) / 1024, 1)})
+
+            if options['legacy']:
+                samples = []
+                for _ in range(max(1, options['repeat'])):
+                    with measure() as sample:
+                        list(Product.objects.select_related('category', 'supplier').order_by('name', 'pk')
+                             [deep:deep + 50])
+                    samples.append(sample)
+                rows.append({'scenario': 'legacy_offset_query', **summarize(samples)})
+
+        write_results(self, rows, ['scenario', 'runs', 'p50_ms', 'p95_ms', 'max_ms', 'queries', 'kb'],
+                      options['json'])
+
+    def _seed(self, options):
+        rng = random.Random(18)
+        categories = Category.objects.bulk_create(Category(name=f"Categoría {i}") for i in range(30))
+        suppliers = Supplier.objects.bulk_create(Supplier(name=f"Proveedor {i}") for i in range(50))
+        if categories[0].pk is None:  # MySQL no devuelve los pks de bulk_create
+            categories, suppliers = list(Category.objects.order_by('pk')), list(Supplier.objects.order_by('pk'))
+
+        def make(i):
+            stock = rng.randrange(0, 200)
+            return Product(
+                name=f"{rng.choice(KINDS)} {rng.randrange(1, 100)} mm {rng.choice(DETAILS)}",
+                sku=f"SKU-{i:07d}", price=Decimal('3.10') + i % 50, cost=Decimal('1.90'), stock=stock,
+                category=rng.choice(categories), supplier=rng.choice(suppliers),
+                # bulk_create no dispara las señales que mantienen el indicador.
+                is_low_stock=stock <= 5,
+            )
+
+        Product.objects.bulk_create((make(i) for i in range(options['products'])), batch_size=5000)
+        rebuild_product_index(batch_size=5000)
+        self.stdout.write(f"{options['products']} productos.")
+        return categories[0], suppliers[0]
@@ -0,0 +1,91 @@
+# pos/management/commands/bench_catalog_import.py
+import csv
+import os
+import random
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from openpyxl import Workbook
+
+from pos.catalog_io import EXPORT_HEADER, IMPORT_BATCH_SIZE, import_catalog, read_rows
+from pos.models import Product, ProductSearchToken
+from ._bench import benchmark_database, write_results
+
+CATEGORIES = ["Herramientas", "Electricidad", "Plomería", "Pinturas", "Tornillería", "Jardín", "Construcción"]
+SUPPLIERS = ["Ferretera Andina", "Distribuidora Sur", "Importadora Pacífico", "Aceros del Norte"]
+WORDS = ["Martillo", "Taladro", "Cable", "Tubo", "Codo", "Pintura", "Brocha", "Tornillo", "Clavo", "Llave",
+         "Cinta", "Manguera", "Pala", "Cemento", "Lija", "Foco", "Interruptor", "Válvula", "Sierra", "Nivel"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide import_catalog con una lista de precios sintética: carga inicial (todas altas), simulación "
+        "y aplicación de una actualización (cambios de precio en parte de las filas y algunas altas)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000, help="Filas del archivo.")
+        parser.add_argument('--format', choices=('csv', 'xlsx'), default='csv')
+        parser.add_argument('--changed', type=float, default=0.2, help="Fracción de filas con precio nuevo.")
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help="Filas por lote.")
+        parser.add_argument('--json', action='store_true', help="Salida en JSON.")
+        parser.add_argument('--keepdb', action='store_true', help="Reutiliza la base de pruebas.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(24)
+        rows = [
+            [f'IMP-{i:06d}', f"{rng.choice(WORDS)} {rng.choice(WORDS).lower()} {i}", rng.choice(CATEGORIES),
+             rng.choice(SUPPLIERS), f'{rng.uniform(1, 500):.2f}', f'{rng.uniform(0.5, 300):.2f}',
+             rng.randint(0, 200), 5]
+            for i in range(options['rows'])
+        ]
+        # Actualización: precios nuevos en parte de las filas y un 1% de SKUs nuevos.
+        update = [list(row) for row in rows]
+        for row in update:
+            if rng.random() < options['changed']:
+                row[4] = f'{float(row[4]) * 1.08:.2f}'
+        update += [[f'IMP-N{i:06d}', f"Nuevo {i}", CATEGORIES[0], SUPPLIERS[0], '9.90', '5.00', 10, 5]
+                   for i in range(options['rows'] // 100)]
+
+        results = []
+        with tempfile.TemporaryDirectory() as directory, benchmark_database(keepdb=options['keepdb']):
+            initial = self._write(directory, 'inicial', rows, options['format'])
+            changes = self._write(directory, 'cambios', update, options['format'])
+            for step, path, dry_run in (('carga inicial', initial, False), ('simulación', changes, True),
+                                        ('actualización', changes, False)):
+                results.append(self._run(step, path, dry_run, options))
+            results[-1]['products'] = Product.objects.count()
+            results[-1]['tokens'] = ProductSearchToken.objects.count()
+        write_results(self, results, ['step', 'rows', 'seconds', 'rows_per_second', 'queries', 'inserted',
+                                      'updated', 'price_changes', 'errors', 'products', 'tokens'], options['json'])
+
+    def _write(self, directory, name, rows, file_format):
+        path = os.path.join(directory, f'{name}.{file_format}')
+        if file_format == 'xlsx':
+            workbook = Workbook(write_only=True)
+            sheet = workbook.create_sheet()
+            sheet.append(EXPORT_HEADER)
+            for row in rows:
+                sheet.append(row)
+            workbook.save(path)
+        else:
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(EXPORT_HEADER)
+                writer.writerows(rows)
+        return path
+
+    def _run(self, step, path, dry_run, options):
+        with open(path, 'rb') as f, CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            result = import_catalog(read_rows(f, path), dry_run=dry_run, batch_size=options['batch_size'])
+            seconds = time.perf_counter() - start
+        return {
+            'step': step, 'rows': result.rows, 'seconds': round(seconds, 2),
+            'rows_per_second': round(result.rows / seconds), 'queries': len(queries),
+            'inserted': result.inserted, 'updated': result.updated, 'price_changes': result.price_changes,
+            'errors': len(result.errors),
+        }
@@ -0,0 +1,58 @@
+# pos/management/commands/bench_checkout.py
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import Client as TestClient
+from django.urls import reverse
+
+from pos.cache import get_product_snapshot
+from pos.cart import add_to_cart
+from pos.models import CashDrawerSession, Product
+from ._bench import benchmark_database, measure, summarize, write_results
+
+
+class Command(BaseCommand):
+    help = "Mide la latencia y el número de consultas de checkout_view según el tamaño del carrito."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1,10,50,200', help="Tamaños de carrito separados por coma.")
+        parser.add_argument('--repeat', type=int, default=20, help="Ventas por tamaño de carrito.")
+        parser.add_argument('--json', action='store_true', help="Salida en JSON.")
+        parser.add_argument('--keepdb', action='store_true', help="Reutiliza la base de pruebas.")
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+
+        with benchmark_database(keepdb=options['keepdb']):
+            user = User.objects.create_user('bench_cajero', password='bench')
+            cash_session = CashDrawerSession.objects.create(user=user, starting_balance=Decimal('0.00'))
+            Product.objects.bulk_create([
+                Product(name=f"Producto {i}", sku=f"BENCH-{i:06d}", price=Decimal('1.25'), stock=10 ** 6)
+                for i in range(max(sizes))
+            ])
+            products = list(Product.objects.order_by('pk'))
+
+            client = TestClient()
+            client.force_login(user)
+            url = reverse('checkout')
+
+            rows = []
+            for size in sizes:
+                snapshots = [get_product_snapshot(p.sku) for p in products[:size]]
+                samples = []
+                for _ in range(options['repeat']):
+                    # El carrito vive en Cart/CartLine de la sesión de caja: dos
+                    # escaneos por producto, como en add_product_view.
+                    for snapshot in snapshots:
+                        add_to_cart(cash_session, snapshot)
+                        add_to_cart(cash_session, snapshot)
+                    with measure() as sample:
+                        response = client.post(url, {'payment_method': 'cash'})
+                    if 'Venta completada' not in response.content.decode():
+                        self.stderr.write(response.content.decode())
+                        return
+                    samples.append(sample)
+                rows.append({'cart_lines': size, **summarize(samples)})
+
+        write_results(self, rows, ['cart_lines', 'runs', 'p50_ms', 'p95_ms', 'max_ms', 'queries'], options['json'])
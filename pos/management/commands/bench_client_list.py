@@ -0,0 +1,93 @@
+# pos/management/commands/bench_client_list.py
+import datetime
+import random
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import Client as TestClient
+from django.urls import reverse
+from django.utils import timezone
+
+from pos.models import Client
+from pos.pagination import encode_cursor
+from pos.search import rebuild_client_index
+from ._bench import benchmark_database, measure, summarize, write_results
+from .bench_client_search import FIRST_NAMES, LAST_NAMES, _tax_id
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el directorio de clientes (client_list_view, HTML y JSON del selector) paginado por keyset "
+        "sobre muchos clientes: primera página, páginas profundas y filtros."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=200000, help="Clientes sintéticos.")
+        parser.add_argument('--repeat', type=int, default=20, help="Cargas por escenario.")
+        parser.add_argument('--legacy', action='store_true',
+                            help="Incluye el listado anterior (todos los clientes ordenados) para comparar.")
+        parser.add_argument('--json', action='store_true', help="Salida en JSON.")
+        parser.add_argument('--keepdb', action='store_true', help="Reutiliza la base de pruebas.")
+
+    def handle(self, *args, **options):
+        with benchmark_database(keepdb=options['keepdb']):
+            self._seed(options)
+            user = User.objects.create_user('bench_cajero', password='bench')
+            client = TestClient()
+            client.force_login(user)
+
+            ordered = Client.objects.order_by('last_name', 'first_name', 'pk')
+            deep = ordered[int(options['clients'] * 0.95)]
+            cursor = encode_cursor([deep.last_name, deep.first_name, deep.pk])
+            scenarios = {
+                'first_page': {},
+                'deep_page': {'after': cursor},
+                'deep_page_back': {'before': cursor},
+                'professional': {'professional': '1'},
+                'professional_deep': {'professional': '1', 'after': cursor},
+                'active_30': {'active': '30'},
+                'search': {'q': 'gonzalez'},
+                'json_first_page': {'format': 'json'},
+                'json_deep_page': {'format': 'json', 'after': cursor},
+            }
+
+            url = reverse('client_list')
+            rows = []
+            for label, params in scenarios.items():
+                samples = []
+                for _ in range(max(1, options['repeat'])):
+                    with measure() as sample:
+                        response = client.get(url, params)
+                    assert response.status_code == 200, (label, response.status_code)
+                    samples.append(sample)
+                rows.append({'scenario': label, **summarize(samples), 'kb': round(len(response.content) / 1024, 1)})
+
+            if options['legacy']:
+                samples = []
+                for _ in range(min(3, options['repeat'])):
+                    with measure() as sample:
+                        list(Client.objects.all().order_by('last_name'))
+                    samples.append(sample)
+                rows.append({'scenario': 'legacy_all_clients_query', **summarize(samples)})
+
+        write_results(self, rows, ['scenario', 'runs', 'p50_ms', 'p95_ms', 'max_ms', 'queries', 'kb'],
+                      options['json'])
+
+    def _seed(self, options):
+        rng = random.Random(19)
+        now = timezone.now()
+
+        def make(i):
+            professional = i % 5 == 0
+            return Client(
+                first_name=rng.choice(FIRST_NAMES),
+                # Algunos clientes sin apellido: el keyset tiene que ordenar los NULL.
+                last_name=None if i % 50 == 0 else f"{rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}",
+                company_name=f"Empresa {i}" if professional else None, tax_id=_tax_id(i),
+                is_professional=professional,
+                last_purchase_at=now - datetime.timedelta(days=rng.randrange(400)) if i % 3 == 0 else None,
+            )
+
+        Client.objects.bulk_create((make(i) for i in range(options['clients'])), batch_size=5000)
+        rebuild_client_index(batch_size=5000)
+        self.stdout.write(f"{options['clients']} clientes.")
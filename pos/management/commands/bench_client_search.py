@@ -0,0 +1,99 @@
+# pos/management/commands/bench_client_search.py
+import random
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.test import Client as TestClient
+from django.urls import reverse
+
+from pos.models import Client
+from pos.search import rebuild_client_index
+from ._bench import benchmark_database, measure, summarize, write_results
+
+FIRST_NAMES = ['José', 'María', 'Juan', 'Ana', 'Luis', 'Lucía', 'Carlos', 'Sofía', 'Jorge', 'Valentina',
+               'Martín', 'Camila', 'Andrés', 'Paula', 'Ramón', 'Inés', 'Tomás', 'Julián', 'Mónica', 'Raúl']
+LAST_NAMES = ['Pérez', 'González', 'Rodríguez', 'Fernández', 'López', 'Martínez', 'Sánchez', 'Gómez',
+              'Díaz', 'Álvarez', 'Romero', 'Núñez', 'Muñoz', 'Suárez', 'Benítez', 'Ibáñez', 'Castro',
+              'Ortiz', 'Rojas', 'Molina', 'Acosta', 'Medina', 'Herrera', 'Aguirre', 'Vázquez']
+COMPANY_WORDS = ['Construcciones', 'Ferretería', 'Materiales', 'Servicios', 'Obras', 'Instalaciones',
+                 'Eléctrica', 'Sanitarios', 'Maderera', 'Pinturas']
+
+
+def _tax_id(i):
+    return f"{20 + i % 7}-{i:08d}-{i % 10}"
+
+
+def _company_word(i):
+    return COMPANY_WORDS[i // 5 % len(COMPANY_WORDS)]
+
+
+class Command(BaseCommand):
+    help = "Mide la latencia de client_search_ajax (índice de tokens + atajo por ID fiscal) con muchos clientes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=200000, help="Clientes sintéticos.")
+        parser.add_argument('--searches', type=int, default=300, help="Búsquedas por escenario.")
+        parser.add_argument('--legacy', action='store_true',
+                            help="Incluye la búsqueda anterior (4 × icontains) para comparar.")
+        parser.add_argument('--json', action='store_true', help="Salida en JSON.")
+        parser.add_argument('--keepdb', action='store_true', help="Reutiliza la base de pruebas.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        n = options['clients']
+
+        with benchmark_database(keepdb=options['keepdb']):
+            def make(i):
+                first, last = rng.choice(FIRST_NAMES), f"{rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}"
+                company = f"{_company_word(i)} {last.split()[0]} {i}" if i % 5 == 0 else None
+                return Client(first_name=first, last_name=last, company_name=company, tax_id=_tax_id(i),
+                              is_professional=company is not None)
+
+            Client.objects.bulk_create((make(i) for i in range(n)), batch_size=5000)
+            rebuild_client_index(batch_size=5000)
+
+            user = User.objects.create_user('bench_cajero', password='bench')
+            client = TestClient()
+            client.force_login(user)
+            url = reverse('client_search_ajax')
+
+            def pick(seq):
+                return rng.choice(seq)
+
+            scenarios = {
+                'tax_id_exact': lambda: _tax_id(rng.randrange(n)),
+                'tax_id_prefix': lambda: _tax_id(rng.randrange(n))[:7],
+                'name_prefix': lambda: pick(LAST_NAMES)[:3].lower(),
+                'short_prefix': lambda: pick(FIRST_NAMES)[:1],
+                'full_name': lambda: f"{pick(FIRST_NAMES)} {pick(LAST_NAMES)}",
+                'unaccented': lambda: f"{pick(FIRST_NAMES)} {pick(LAST_NAMES)}".translate(
+                    str.maketrans('áéíóúÁÉÍÓÚñ', 'aeiouAEIOUn')),
+                'company': lambda: (lambda i: f"{_company_word(i)[:5]} {i}")(rng.randrange(0, n, 5)),
+            }
+
+            rows = []
+            for label, make_query in scenarios.items():
+                queries = [make_query() for _ in range(options['searches'])]
+                samples = []
+                for query in queries:
+                    with measure() as sample:
+                        response = client.get(url, {'q': query})
+                    samples.append(sample)
+                    sample['hits'] = len(response.json()['results'])
+                rows.append({'scenario': label, **summarize(samples),
+                             'avg_hits': round(sum(s['hits'] for s in samples) / len(samples), 1)})
+
+            if options['legacy']:
+                samples = []
+                for query in [pick(LAST_NAMES)[:3] for _ in range(min(50, options['searches']))]:
+                    with measure() as sample:
+                        list(Client.objects.filter(
+                            Q(first_name__icontains=query) | Q(last_name__icontains=query) |
+                            Q(company_name__icontains=query) | Q(tax_id__icontains=query)
+                        ).distinct()[:10])
+                    samples.append(sample)
+                rows.append({'scenario': 'legacy_icontains', **summarize(samples)})
+
+        write_results(self, rows, ['scenario', 'runs', 'p50_ms', 'p95_ms', 'max_ms', 'queries', 'avg_hits'],
+                      options['json'])
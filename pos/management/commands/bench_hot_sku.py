@@ -0,0 +1,120 @@
+# pos/management/commands/bench_hot_sku.py
+import threading
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Sum
+from django.test import Client as TestClient
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from pos.models import CashDrawerSession, Product, Sale, SaleItem, StockCounter
+from pos.stock import available_stock, compact_stock_movements
+from ._bench import benchmark_database, measure, summarize, write_results
+
+MODES = ('row', 'ledger')
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el throughput de checkout con varias cajas vendiendo a la vez el mismo SKU, con el "
+        "stock en la fila del producto (POS_STOCK_MODE='row') y en el libro de movimientos ('ledger'). "
+        "Requiere una base con escrituras concurrentes (MySQL, o SQLite en archivo)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help="Cajas (hilos) simultáneas.")
+        parser.add_argument('--checkouts', type=int, default=50, help="Checkouts por caja.")
+        parser.add_argument('--lines', type=int, default=1,
+                            help="Líneas por carrito: el SKU caliente más productos propios de cada caja.")
+        parser.add_argument('--compact-every', type=float, default=0,
+                            help="En modo 'ledger', compacta cada N segundos mientras las cajas venden.")
+        parser.add_argument('--modes', default=','.join(MODES), help="Modos a comparar, separados por coma.")
+        parser.add_argument('--json', action='store_true', help="Salida en JSON.")
+        parser.add_argument('--keepdb', action='store_true', help="Reutiliza la base de pruebas.")
+
+    def handle(self, *args, **options):
+        rows = []
+        with benchmark_database(keepdb=options['keepdb']):
+            for mode in options['modes'].split(','):
+                with override_settings(POS_STOCK_MODE=mode):
+                    rows.append(self._run(mode, options))
+        write_results(self, rows, ['mode', 'workers', 'checkouts', 'per_second', 'runs', 'p50_ms', 'p95_ms',
+                                   'max_ms', 'queries', 'errors', 'stock_ok'], options['json'])
+
+    def _run(self, mode, options):
+        initial = 10 ** 6
+        hot = Product.objects.create(name=f"Clavo 2\" ({mode})", sku=f'HOT-{mode}', price=Decimal('0.15'),
+                                     stock=initial)
+        workers = []
+        for i in range(options['workers']):
+            user = User.objects.create_user(f'bench_{mode}_{i}', password='bench')
+            CashDrawerSession.objects.create(user=user, starting_balance=Decimal('0.00'))
+            # Productos propios de la caja: solo el SKU caliente se comparte.
+            own = [Product.objects.create(name=f"Producto {mode} {i}-{j}", sku=f'OWN-{mode}-{i}-{j}',
+                                          price=Decimal('3.10'), stock=initial).sku
+                   for j in range(options['lines'] - 1)]
+            workers.append((user, [hot.sku, *own]))
+
+        samples = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(len(workers) + 1)
+
+        def work(user, skus):
+            client = TestClient()
+            client.force_login(user)
+            add_url, checkout_url = reverse('add_product'), reverse('checkout')
+            local = []
+            try:
+                barrier.wait()
+                for _ in range(options['checkouts']):
+                    for sku in skus:
+                        client.post(add_url, {'sku': sku})
+                    with measure() as sample:
+                        client.post(checkout_url, {'payment_method': 'cash'})
+                    local.append(sample)
+            finally:
+                connection.close()
+                with lock:
+                    samples.extend(local)
+
+        finished = threading.Event()
+
+        def compact():
+            try:
+                while not finished.wait(options['compact_every']):
+                    compact_stock_movements()
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=work, args=worker) for worker in workers]
+        for thread in threads:
+            thread.start()
+        compactor = None
+        if mode == 'ledger' and options['compact_every']:
+            compactor = threading.Thread(target=compact)
+            compactor.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        finished.set()
+        if compactor:
+            compactor.join()
+
+        # Un checkout que no generó venta (error, stock insuficiente) cuenta como error.
+        errors = len(samples) - Sale.objects.filter(seller__in=[user for user, _ in workers]).count()
+        compact_stock_movements()
+        sold = SaleItem.objects.filter(product=hot).aggregate(units=Sum('quantity'))['units'] or 0
+        hot.refresh_from_db()
+        stock_ok = available_stock(hot.pk) == hot.stock == initial - sold
+        if mode == 'ledger':
+            stock_ok = stock_ok and StockCounter.objects.get(product=hot).available == hot.stock
+
+        return {'mode': mode, 'workers': len(workers), 'checkouts': len(samples),
+                'per_second': round(len(samples) / elapsed, 1), **summarize(samples),
+                'errors': errors, 'stock_ok': stock_ok}
@@ -0,0 +1,76 @@
+# pos/management/commands/bench_reports.py
+import functools
+import random
+import tempfile
+import tracemalloc
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from pos.models import CashDrawerSession, Client, Sale
+from pos.reports import write_sales_excel, write_sales_pdf
+from ._bench import benchmark_database, measure, spread_sale_dates, write_results
+
+WRITERS = {
+    'excel': write_sales_excel,
+    'pdf': write_sales_pdf,
+    'pdf_summary': functools.partial(write_sales_pdf, summary=True),
+}
+
+
+class Command(BaseCommand):
+    help = "Mide tiempo, consultas y memoria pico de las exportaciones del reporte de ventas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', default='1000,10000,100000', help="Cantidades de ventas separadas por coma.")
+        parser.add_argument('--formats', default=','.join(WRITERS), help="Formatos a medir.")
+        parser.add_argument('--json', action='store_true', help="Salida en JSON.")
+        parser.add_argument('--keepdb', action='store_true', help="Reutiliza la base de pruebas.")
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['rows'].split(','))
+        formats = options['formats'].split(',')
+
+        with benchmark_database(keepdb=options['keepdb']):
+            users = [User.objects.create_user(f'bench_cajero_{i}', password='bench') for i in range(5)]
+            sessions = [CashDrawerSession.objects.create(user=u, starting_balance=Decimal('0.00')) for u in users]
+            clients = Client.objects.bulk_create(
+                Client(first_name=f"Cliente {i}", last_name="Bench", tax_id=f"BENCH{i:08d}",
+                       company_name=f"Empresa {i}" if i % 3 == 0 else None)
+                for i in range(500)
+            )
+            rng = random.Random(7)
+
+            rows = []
+            created = 0
+            for size in sizes:
+                Sale.objects.bulk_create(
+                    (Sale(total_amount=Decimal(rng.randrange(100, 50000)) / 100, seller=users[i % 5],
+                          cash_drawer_session=sessions[i % 5], payment_method=rng.choice(['cash', 'card']),
+                          client=rng.choice(clients) if i % 2 else None)
+                     for i in range(created, size)),
+                    batch_size=5000,
+                )
+                spread_sale_dates(Sale.objects.filter(pk__gt=created), days=365)
+                created = size
+
+                for fmt in formats:
+                    writer = WRITERS[fmt]
+                    with tempfile.TemporaryFile() as output:
+                        with measure() as sample:
+                            writer(Sale.objects.all(), output)
+                        output.seek(0, 2)
+                        size_kb = output.tell() // 1024
+                    # Segunda pasada solo para la memoria pico: tracemalloc distorsiona los tiempos.
+                    with tempfile.TemporaryFile() as output:
+                        tracemalloc.start()
+                        writer(Sale.objects.all(), output)
+                        _, peak = tracemalloc.get_traced_memory()
+                        tracemalloc.stop()
+                    rows.append({
+                        'format': fmt, 'rows': size, 'ms': round(sample['ms'], 1), 'queries': sample['queries'],
+                        'peak_mb': round(peak / 2 ** 20, 2), 'file_kb': size_kb,
+                    })
+
+        write_results(self, rows, ['format', 'rows', 'ms', 'queries', 'peak_mb', 'file_kb'], options['json'])
@@ -0,0 +1,69 @@
+# pos/management/commands/bench_scan.py
+import random
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client as TestClient
+from django.urls import reverse
+
+from pos.cache import get_product_snapshot, reset_sku_cache_stats, sku_cache_stats
+from pos.cart import clear_cart
+from pos.models import CashDrawerSession, Product
+from ._bench import benchmark_database, measure, summarize, write_results
+
+
+class Command(BaseCommand):
+    help = "Mide la latencia del escaneo (add_product_view) con la caché de SKU fría y caliente."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=50000, help="SKUs sintéticos en el catálogo.")
+        parser.add_argument('--scans', type=int, default=500, help="Escaneos por escenario.")
+        parser.add_argument('--json', action='store_true', help="Salida en JSON.")
+        parser.add_argument('--keepdb', action='store_true', help="Reutiliza la base de pruebas.")
+
+    def handle(self, *args, **options):
+        with benchmark_database(keepdb=options['keepdb']):
+            Product.objects.bulk_create(
+                (Product(name=f"Producto {i}", sku=f"SKU-{i:07d}", price=Decimal('3.10'), stock=10 ** 6)
+                 for i in range(options['products'])),
+                batch_size=2000,
+            )
+            user = User.objects.create_user('bench_cajero', password='bench')
+            cash_session = CashDrawerSession.objects.create(user=user, starting_balance=Decimal('0.00'))
+            client = TestClient()
+            client.force_login(user)
+            url = reverse('add_product')
+
+            rng = random.Random(42)
+            skus = [f"SKU-{rng.randrange(options['products']):07d}" for _ in range(options['scans'])]
+
+            def empty_cart():
+                clear_cart(cash_session)
+
+            def scan(sku):
+                client.post(url, {'sku': sku})
+
+            rows = []
+            for label, prepare, action in (('lookup', None, get_product_snapshot), ('scan_view', empty_cart, scan)):
+                for mode in ('cold', 'warm'):
+                    cache.clear()
+                    if mode == 'warm':
+                        for sku in skus:
+                            get_product_snapshot(sku)
+                    reset_sku_cache_stats()
+                    samples = []
+                    for sku in skus:
+                        if mode == 'cold':
+                            cache.clear()
+                        if prepare:
+                            prepare()
+                        with measure() as sample:
+                            action(sku)
+                        samples.append(sample)
+                    stats = sku_cache_stats()
+                    rows.append({'scenario': f'{label}_{mode}', **summarize(samples), 'hit_rate': stats['hit_rate']})
+
+        write_results(self, rows, ['scenario', 'runs', 'p50_ms', 'p95_ms', 'max_ms', 'queries', 'hit_rate'],
+                      options['json'])
@@ -0,0 +1,145 @@
+# pos/management/commands/bench_server_timing.py
+import statistics
+import time
+import timeit
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.http import HttpResponse
+from django.template import engines
+from django.template.backends.django import Template
+from django.test import Client as TestClient, RequestFactory
+from django.test.utils import override_settings
+from django.urls import resolve, reverse
+
+from ferrepos.middleware import ServerTimingMiddleware
+from pos.metrics import HISTOGRAMS, _timed_execute, install_sql_timer, uninstall_sql_timer
+from pos.models import CashDrawerSession, Product
+from ._bench import benchmark_database, measure, summarize, write_results
+
+MIDDLEWARE_PATH = 'ferrepos.middleware.ServerTimingMiddleware'
+TEMPLATE_BACKEND = 'pos.metrics.TimedDjangoTemplates'
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el costo de la instrumentación de pos.metrics (ServerTimingMiddleware, cronómetro SQL y "
+        "de plantillas) sobre el escaneo (add_product): bloques alternados (ABBA) con y sin instrumentación, "
+        "para que la deriva de la máquina afecte a los dos por igual. Como esa diferencia queda dentro "
+        "del ruido de la medición (±2%), el control usa el costo directo de los ganchos (middleware, "
+        "cronómetro de cada consulta del escaneo y del render) respecto de la mediana del escaneo sin "
+        "instrumentar: falla si supera --max-overhead (%)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help="Escaneos por variante.")
+        parser.add_argument('--blocks', type=int, default=20, help="Bloques alternados por variante.")
+        parser.add_argument('--max-overhead', type=float, default=2.0, help="Sobrecosto máximo aceptado (%).")
+        parser.add_argument('--json', action='store_true', help="Salida en JSON.")
+        parser.add_argument('--keepdb', action='store_true', help="Reutiliza la base de pruebas.")
+
+    def handle(self, *args, **options):
+        with benchmark_database(keepdb=options['keepdb']):
+            user, skus = self._seed()
+            samples = {'instrumented': [], 'plain': []}
+            per_block = max(1, options['requests'] // options['blocks'])
+            for block in range(options['blocks']):
+                # Orden ABBA: ninguna variante corre siempre primero.
+                for variant in (list(samples) if block % 2 == 0 else reversed(list(samples))):
+                    samples[variant].extend(self._block(variant, user, skus, per_block))
+            queries = self._scan_queries(user, skus)
+            hooks_ms = self._hooks_cost(queries)
+            for histogram in HISTOGRAMS:  # lo observado aquí no es tráfico real
+                histogram.clear()
+
+        plain = statistics.median(samples['plain'])
+        rows = [
+            {'variant': variant, **summarize([{'ms': ms, 'queries': queries} for ms in times]),
+             'mean_ms': round(statistics.fmean(times), 3),
+             'overhead_pct': round((statistics.median(times) / plain - 1) * 100, 2)}
+            for variant, times in samples.items()
+        ]
+        overhead = hooks_ms / plain * 100
+        rows.append({'variant': 'hooks', 'runs': 1, 'p50_ms': round(hooks_ms, 4), 'queries': queries,
+                     'overhead_pct': round(overhead, 2)})
+        write_results(self, rows, ['variant', 'runs', 'p50_ms', 'p95_ms', 'p99_ms', 'mean_ms', 'queries',
+                                   'overhead_pct'], options['json'])
+        if overhead > options['max_overhead']:
+            raise CommandError(f"Sobrecosto de la instrumentación: {overhead:.2f}% "
+                               f"(máximo {options['max_overhead']}%).")
+
+    def _seed(self):
+        # Pocos SKUs y stock de sobra: el carrito no crece ni se topa con el límite.
+        products = [Product.objects.create(name=f"Producto {i}", sku=f'TIMING-{i}', price=Decimal('3.10'),
+                                           stock=10 ** 9)
+                    for i in range(5)]
+        user = User.objects.create_user('bench_timing', password='bench')
+        CashDrawerSession.objects.create(user=user, starting_balance=Decimal('0.00'))
+        return user, [product.sku for product in products]
+
+    def _block(self, variant, user, skus, count):
+        """`count` escaneos cronometrados con o sin la instrumentación."""
+        instrumented = variant == 'instrumented'
+        middleware = [m for m in settings.MIDDLEWARE if m != MIDDLEWARE_PATH]
+        templates = [{**engine, 'BACKEND': 'django.template.backends.django.DjangoTemplates'}
+                     if engine['BACKEND'] == TEMPLATE_BACKEND else engine
+                     for engine in settings.TEMPLATES]
+        overrides = {} if instrumented else {'MIDDLEWARE': middleware, 'TEMPLATES': templates}
+        if instrumented:
+            install_sql_timer(connection=connection)
+        else:
+            uninstall_sql_timer(connection)
+
+        url = reverse('add_product')
+        times = []
+        with override_settings(**overrides):
+            client = TestClient()
+            client.force_login(user)
+            client.post(url, {'sku': skus[0]})  # carga el middleware y las plantillas
+            for i in range(count):
+                start = time.perf_counter()
+                response = client.post(url, {'sku': skus[i % len(skus)]})
+                times.append((time.perf_counter() - start) * 1000)
+                assert response.status_code == 200
+                assert ('Server-Timing' in response) == instrumented
+        install_sql_timer(connection=connection)
+        return times
+
+    def _scan_queries(self, user, skus):
+        client = TestClient()
+        client.force_login(user)
+        with measure() as sample:
+            client.post(reverse('add_product'), {'sku': skus[0]})
+        return sample['queries']
+
+    def _hooks_cost(self, queries, number=20000):
+        """
+        ms por request que agrega la instrumentación a una vista que hace
+        `queries` consultas y un render: la misma vista falsa con y sin ganchos.
+        """
+        request = RequestFactory().post(reverse('add_product'))
+        request.resolver_match = resolve(request.path)
+        timed = engines['django'].from_string('{{ x }}')
+        plain = Template(timed.template, timed.backend)  # el mismo, sin cronómetro
+
+        def execute(sql, params, many, context):
+            return None
+
+        def view(instrumented):
+            template = timed if instrumented else plain
+            def respond(request):
+                for _ in range(queries):
+                    if instrumented:
+                        _timed_execute(execute, '', None, False, None)
+                    else:
+                        execute('', None, False, None)
+                return HttpResponse(template.render({'x': 1}))
+            return respond
+
+        middleware, bare = ServerTimingMiddleware(view(True)), view(False)
+        with_hooks = min(timeit.repeat(lambda: middleware(request), number=number, repeat=3))
+        without = min(timeit.repeat(lambda: bare(request), number=number, repeat=3))
+        return (with_hooks - without) / number * 1000
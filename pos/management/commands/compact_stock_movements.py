@@ -0,0 +1,33 @@
+# pos/management/commands/compact_stock_movements.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from pos.stock import COMPACT_BATCH_SIZE, compact_stock_movements, sync_stock_counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Suma a Product.stock los movimientos de stock pendientes y los marca como aplicados "
+        "(POS_STOCK_MODE='ledger'). Pensado para cron cada pocos minutos, o con --every como proceso."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=COMPACT_BATCH_SIZE,
+                            help="Movimientos por transacción.")
+        parser.add_argument('--every', type=float, default=0,
+                            help="Repite cada N segundos en lugar de terminar.")
+        parser.add_argument('--sync-counters', action='store_true',
+                            help="Antes de compactar recalcula los contadores de disponible "
+                                 "(al pasar de 'row' a 'ledger', con las cajas cerradas).")
+
+    def handle(self, *args, **options):
+        if options['sync_counters']:
+            counters = sync_stock_counters()
+            self.stdout.write(self.style.SUCCESS(f"{counters} contadores de stock recalculados."))
+        while True:
+            products, movements = compact_stock_movements(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"{movements} movimientos aplicados en {products} productos."))
+            if not options['every']:
+                return
+            time.sleep(options['every'])
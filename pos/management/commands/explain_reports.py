@@ -0,0 +1,160 @@
+# pos/management/commands/explain_reports.py
+import datetime
+import itertools
+import json
+import random
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from pos.dates import date_range_q
+from pos.models import CashDrawerSession, Client, Product, Sale, SaleItem
+from pos.reports import EXPORT_CHUNK_SIZE, iter_sale_rows, sales_in_range, sales_summary_rows
+from pos.rollups import rebuild_range
+from ._bench import benchmark_database, measure, spread_sale_dates, summarize, write_results
+
+
+def _report_totals(sales):
+    return sales.aggregate(
+        total_sales=Sum('total_amount'),
+        total_transactions=Count('id'),
+        total_cash_sales=Sum('total_amount', filter=Q(payment_method='cash')),
+        total_card_sales=Sum('total_amount', filter=Q(payment_method='card')),
+    )
+
+
+def explain(sql):
+    """Plan de ejecución de una consulta ya ejecutada (EXPLAIN QUERY PLAN en SQLite, EXPLAIN en MySQL)."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}")
+        return [' | '.join(str(column) for column in row) for row in cursor.fetchall()]
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera un set de datos sintético grande en la base de pruebas y, para cada consulta de "
+        "reportes, muestra el tiempo y el plan (EXPLAIN) de cada SELECT que ejecuta."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sales', type=int, default=200000, help="Ventas sintéticas.")
+        parser.add_argument('--days', type=int, default=365, help="Días hacia atrás en que se reparten.")
+        parser.add_argument('--products', type=int, default=2000, help="Productos sintéticos.")
+        parser.add_argument('--items', type=int, default=2, help="Líneas por venta.")
+        parser.add_argument('--repeat', type=int, default=5, help="Ejecuciones por reporte.")
+        parser.add_argument('--json', action='store_true', help="Salida en JSON (incluye los planes).")
+        parser.add_argument('--keepdb', action='store_true', help="Reutiliza la base de pruebas.")
+
+    def handle(self, *args, **options):
+        with benchmark_database(keepdb=options['keepdb']):
+            self._seed(options)
+            results = [self._run(name, report, options['repeat']) for name, report in self._reports()]
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2, default=str))
+            return
+        write_results(self, results, ['report', 'runs', 'p50_ms', 'p95_ms', 'max_ms', 'queries'])
+        for result in results:
+            self.stdout.write(f"\n== {result['report']}")
+            for query in result['plans']:
+                self.stdout.write(f"  {query['sql'][:160]}")
+                for line in query['plan']:
+                    self.stdout.write(f"    {line}")
+
+    def _seed(self, options):
+        rng = random.Random(10)
+        n, days = options['sales'], options['days']
+
+        users = [User.objects.create_user(f'bench_cajero_{i}', password='bench') for i in range(5)]
+        # Un turno por cajero y por día, como en una ferretería real.
+        sessions = CashDrawerSession.objects.bulk_create(
+            CashDrawerSession(user=users[i % 5], starting_balance=Decimal('0.00')) for i in range(days * 5)
+        )
+        clients = Client.objects.bulk_create(
+            Client(first_name=f"Cliente {i}", last_name="Bench", tax_id=f"BENCH{i:08d}") for i in range(1000)
+        )
+        products = Product.objects.bulk_create(
+            Product(name=f"Producto {i}", sku=f"SKU-{i:07d}", price=Decimal('3.10') + i % 50, stock=10 ** 6)
+            for i in range(options['products'])
+        )
+
+        Sale.objects.bulk_create(
+            (Sale(total_amount=Decimal(rng.randrange(100, 50000)) / 100, seller=users[i % 5],
+                  cash_drawer_session=sessions[min(len(sessions) - 1, i * len(sessions) // n)],
+                  payment_method=rng.choice(['cash', 'card']),
+                  client=rng.choice(clients) if i % 3 == 0 else None)
+             for i in range(n)),
+            batch_size=5000,
+        )
+        spread_sale_dates(Sale.objects.all(), days=days, slots_per_day=24)
+
+        sale_ids = Sale.objects.order_by('pk').values_list('pk', flat=True)
+        SaleItem.objects.bulk_create(
+            (SaleItem(sale_id=sale_id, product=product, quantity=1, unit_price=product.price,
+                      subtotal=product.price, product_name=product.name)
+             for sale_id in sale_ids.iterator(chunk_size=5000)
+             for product in rng.sample(products, options['items'])),
+            batch_size=5000,
+        )
+        self.stdout.write(f"{n} ventas, {n * options['items']} líneas, {len(sessions)} turnos.")
+        self._sample_session = sessions[len(sessions) // 2]
+        self._sample_product = products[0]
+
+    def _reports(self):
+        today = timezone.localdate()
+        month_start = today - datetime.timedelta(days=30)
+        week_start = today - datetime.timedelta(days=7)
+        session = self._sample_session
+
+        def legacy_range(start, end):
+            return Sale.objects.filter(sale_date__date__gte=start, sale_date__date__lte=end)
+
+        def export_chunks():
+            # Primer lote y uno por keyset (WHERE sale_date < ... OR ...).
+            list(itertools.islice(iter_sale_rows(sales_in_range(month_start, today)), EXPORT_CHUNK_SIZE + 1))
+
+        return [
+            ('sales_report_totals_30d', lambda: _report_totals(sales_in_range(month_start, today))),
+            ('sales_report_totals_30d_legacy', lambda: _report_totals(legacy_range(month_start, today))),
+            ('sales_report_page_30d', lambda: list(sales_in_range(month_start, today)[:100])),
+            ('export_keyset_chunks_30d', export_chunks),
+            ('summary_rows_30d', lambda: list(sales_summary_rows(sales_in_range(month_start, today)))),
+            ('close_session_totals', lambda: session.sales.filter(payment_method__in=['cash', 'card']).aggregate(
+                cash=Sum('total_amount', filter=Q(payment_method='cash')),
+                card=Sum('total_amount', filter=Q(payment_method='card')),
+            )),
+            ('admin_session_cash_sales', lambda: session.sales.filter(payment_method='cash').aggregate(
+                total_sum=Sum('total_amount'))),
+            ('product_sales_30d', lambda: SaleItem.objects.filter(
+                date_range_q('sale__sale_date', month_start, today), product=self._sample_product,
+            ).aggregate(units=Sum('quantity'), revenue=Sum('subtotal'))),
+            ('top_products_30d', lambda: list(SaleItem.objects.filter(
+                date_range_q('sale__sale_date', month_start, today)
+            ).values('product_id').annotate(revenue=Sum('subtotal')).order_by('-revenue')[:10])),
+            ('monthly_summary', lambda: list(Sale.objects.annotate(
+                year=ExtractYear('sale_date'), month=ExtractMonth('sale_date'),
+            ).values('year', 'month').annotate(
+                total_amount=Sum('total_amount'), total_transactions=Count('id'),
+            ).order_by('-year', '-month'))),
+            ('rebuild_rollups_7d', lambda: rebuild_range(week_start, today)),
+        ]
+
+    def _run(self, name, report, repeat):
+        samples = []
+        for _ in range(max(1, repeat)):
+            with measure() as sample, CaptureQueriesContext(connection) as queries:
+                report()
+            samples.append(sample)
+
+        plans = [
+            {'sql': query['sql'], 'ms': float(query['time']) * 1000, 'plan': explain(query['sql'])}
+            for query in queries.captured_queries
+            if query['sql'].lstrip().upper().startswith('SELECT')
+        ]
+        return {'report': name, **summarize(samples), 'plans': plans}
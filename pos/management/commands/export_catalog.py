@@ -0,0 +1,24 @@
+# pos/management/commands/export_catalog.py
+from django.core.management.base import BaseCommand
+
+from pos.catalog_io import stream_catalog_csv, write_catalog_excel
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta el catálogo (SKU, producto, categoría, proveedor, precio, costo, stock disponible, "
+        "umbral) a CSV o XLSX según la extensión, en el formato que acepta import_catalog."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Archivo .csv o .xlsx de salida.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if path.lower().endswith('.xlsx'):
+            with open(path, 'wb') as f:
+                write_catalog_excel(f)
+        else:
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                f.writelines(stream_catalog_csv())
+        self.stdout.write(self.style.SUCCESS(f"Catálogo exportado a {path}."))
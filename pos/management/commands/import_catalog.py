@@ -0,0 +1,52 @@
+# pos/management/commands/import_catalog.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pos.catalog_io import IMPORT_BATCH_SIZE, CatalogImportError, import_catalog, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa una lista de precios o catálogo (CSV o XLSX) por SKU: altas con bulk_create y cambios "
+        "con bulk_update, por lotes y en una sola transacción. Con --dry-run solo informa altas, "
+        "cambios y cambios de precio. Columnas: SKU (obligatoria), Producto, Categoría, Proveedor, "
+        "Precio, Costo, Stock (solo altas), Umbral de Stock Bajo; una celda vacía no cambia el valor."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Archivo .csv o .xlsx.")
+        parser.add_argument('--dry-run', action='store_true', help="No escribe nada: muestra lo que haría.")
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help="Filas por lote.")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as f:
+                result = import_catalog(read_rows(f, options['path']), dry_run=options['dry_run'],
+                                        batch_size=options['batch_size'])
+        except (OSError, CatalogImportError) as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - start
+
+        for line, sku, name, price in result.inserts_preview:
+            self.stdout.write(f"  + línea {line}: {sku} {name} ${price}")
+        for line, sku, changes in result.updates_preview:
+            detail = ', '.join(f"{field}: {old} → {new}" for field, (old, new) in changes.items())
+            self.stdout.write(f"  ~ línea {line}: {sku} ({detail})")
+        for line, message in result.errors[:50]:
+            self.stderr.write(f"  ! línea {line}: {message}")
+        if len(result.errors) > 50:
+            self.stderr.write(f"  ... y {len(result.errors) - 50} errores más.")
+
+        verb = "Se importarían" if result.dry_run else "Importadas"
+        summary = (
+            f"{verb} {result.rows} filas en {elapsed:.1f}s: {result.inserted} altas, {result.updated} "
+            f"cambios ({result.price_changes} de precio), {result.unchanged} sin cambios, "
+            f"{len(result.errors)} con errores."
+        )
+        if result.new_categories or result.new_suppliers:
+            summary += (f" Nuevas: {len(result.new_categories)} categorías, "
+                        f"{len(result.new_suppliers)} proveedores.")
+        style = self.style.SUCCESS if result.ok else self.style.WARNING
+        self.stdout.write(style(summary))
@@ -0,0 +1,246 @@
+# pos/management/commands/loadtest_pos.py
+import datetime
+import json
+import logging
+import platform
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from decimal import Decimal
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.core.signals import got_request_exception
+from django.db import OperationalError, connection
+from django.test import Client as TestClient
+from django.urls import reverse
+
+from pos.models import Product, SaleItem
+from ._bench import benchmark_database, measure, summarize, write_results
+
+ENDPOINTS = ('open_session', 'scan', 'checkout', 'return', 'close_session', 'dashboard')
+COLUMNS = ['endpoint', 'runs', 'per_second', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms', 'queries_avg',
+           'queries', 'rejected', 'errors', 'lock_timeouts', 'error_rate', 'lock_timeout_rate']
+
+# Códigos de MySQL: 1205 = lock wait timeout, 1213 = deadlock. SQLite solo
+# tiene el mensaje ("database is locked").
+LOCK_ERROR_CODES = (1205, 1213)
+
+# La excepción de la última petición fallida de cada hilo. got_request_exception
+# se envía en el hilo que atendió la petición, así que cada caja ve solo la suya
+# (el receptor del Client de pruebas la recibiría también de los otros hilos).
+_failures = threading.local()
+
+
+def _record_failure(sender, **kwargs):
+    _failures.exception = sys.exc_info()[1]
+
+
+def _is_lock_timeout(exception):
+    if not isinstance(exception, OperationalError):
+        return False
+    code = exception.args[0] if exception.args else None
+    return code in LOCK_ERROR_CODES or 'locked' in str(exception).lower()
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga del flujo completo de caja: N cajeros simultáneos abren sesión, escanean "
+        "productos, cobran y de vez en cuando devuelven, mientras un administrador consulta el "
+        "dashboard. Informa por endpoint p50/p95/p99, consultas por petición y tasas de error y de "
+        "bloqueos (lock timeout / deadlock). --output guarda el resultado en JSON para comparar corridas. "
+        "Requiere una base con escrituras concurrentes (MySQL, o SQLite en archivo)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cashiers', type=int, default=8, help="Cajeros (hilos) simultáneos.")
+        parser.add_argument('--cycles', type=int, default=20, help="Ventas por cajero.")
+        parser.add_argument('--scans', type=int, default=5, help="Escaneos por venta.")
+        parser.add_argument('--products', type=int, default=500, help="Productos del catálogo.")
+        parser.add_argument('--hot-skus', type=int, default=10,
+                            help="SKUs más vendidos: la mitad de los escaneos cae en ellos (choques por fila).")
+        parser.add_argument('--return-rate', type=float, default=0.1,
+                            help="Fracción de ventas que se devuelven (una unidad) apenas cobradas.")
+        parser.add_argument('--dashboard-interval', type=float, default=0.5,
+                            help="Segundos entre consultas del dashboard (0 = sin administrador).")
+        parser.add_argument('--think-ms', type=float, default=0.0, help="Pausa del cajero entre peticiones.")
+        parser.add_argument('--seed', type=int, default=21, help="Semilla de los recorridos.")
+        parser.add_argument('--output', help="Archivo donde guardar el resultado en JSON.")
+        parser.add_argument('--json', action='store_true', help="Salida en JSON.")
+        parser.add_argument('--keepdb', action='store_true', help="Reutiliza la base de pruebas.")
+
+    def handle(self, *args, **options):
+        # Los errores se cuentan por endpoint; el traceback de cada 500 no aporta aquí.
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        got_request_exception.connect(_record_failure, dispatch_uid='loadtest_pos')
+        started_at = datetime.datetime.now(datetime.timezone.utc)
+        try:
+            with benchmark_database(keepdb=options['keepdb']):
+                skus, hot, cashiers, admin = self._seed(options)
+                samples, elapsed = self._run(skus, hot, cashiers, admin, options)
+        finally:
+            got_request_exception.disconnect(dispatch_uid='loadtest_pos')
+
+        rows = [self._row('all', samples, elapsed)]
+        rows += [self._row(endpoint, [s for s in samples if s['endpoint'] == endpoint], elapsed)
+                 for endpoint in ENDPOINTS]
+        rows = [row for row in rows if row['runs']]
+        report = {
+            'meta': {
+                'started_at': started_at.isoformat(),
+                'elapsed_s': round(elapsed, 3),
+                'database': connection.vendor,
+                'django': django.get_version(),
+                'python': platform.python_version(),
+                'stock_mode': getattr(settings, 'POS_STOCK_MODE', 'row'),
+                'options': {name: options[name] for name in (
+                    'cashiers', 'cycles', 'scans', 'products', 'hot_skus', 'return_rate',
+                    'dashboard_interval', 'think_ms', 'seed')},
+            },
+            'endpoints': rows,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, default=str)
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2, default=str))
+        else:
+            write_results(self, rows, COLUMNS)
+
+    def _seed(self, options):
+        products = Product.objects.bulk_create(
+            Product(name=f"Producto {i}", sku=f'LOAD-{i:05d}', price=Decimal('3.10') + i % 50,
+                    stock=10 ** 7)
+            for i in range(options['products'])
+        )
+        skus = [product.sku for product in products]
+        cashiers = [User.objects.create_user(f'carga_caja_{i}', password='carga')
+                    for i in range(options['cashiers'])]
+        admin = User.objects.create_user('carga_admin', password='carga', is_staff=True)
+        return skus, skus[:options['hot_skus']], cashiers, admin
+
+    def _run(self, skus, hot, cashiers, admin, options):
+        samples = []
+        lock = threading.Lock()
+        done = threading.Event()
+        barrier = threading.Barrier(len(cashiers) + 2)
+
+        def collect(local):
+            with lock:
+                samples.extend(local)
+
+        # Login antes de arrancar: un hilo que falle antes de la barrera colgaría a los demás.
+        clients = [self._client(user) for user in cashiers]
+        admin_client = self._client(admin)
+
+        def cashier(index, user, client):
+            local = []
+            try:
+                self._cashier(index, user, client, skus, hot, options, barrier, local)
+            finally:
+                connection.close()
+                collect(local)
+
+        def administrator():
+            local = []
+            try:
+                self._administrator(admin_client, options, barrier, done, local)
+            finally:
+                connection.close()
+                collect(local)
+
+        threads = [threading.Thread(target=cashier, args=(i, user, client))
+                   for i, (user, client) in enumerate(zip(cashiers, clients))]
+        poller = threading.Thread(target=administrator)
+        for thread in [*threads, poller]:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        done.set()
+        poller.join()
+        return samples, elapsed
+
+    def _client(self, user):
+        client = TestClient(raise_request_exception=False)
+        client.force_login(user)
+        return client
+
+    def _cashier(self, index, user, client, skus, hot, options, barrier, local):
+        """Recorrido de una caja: apertura, ventas (con alguna devolución) y cierre."""
+        rng = random.Random(options['seed'] * 1000 + index)
+        barrier.wait()
+
+        def call(endpoint, url, data):
+            local.append(self._request(client, endpoint, url, data))
+            if options['think_ms']:
+                time.sleep(options['think_ms'] / 1000)
+
+        call('open_session', reverse('open_session'), {'starting_balance': '100.00'})
+        for _ in range(options['cycles']):
+            for _ in range(options['scans']):
+                call('scan', reverse('add_product'), {'sku': rng.choice(hot if rng.random() < 0.5 else skus)})
+            call('checkout', reverse('checkout'), {'payment_method': rng.choice(('cash', 'card'))})
+            if local[-1]['outcome'] == 'ok' and rng.random() < options['return_rate']:
+                try:
+                    item = (SaleItem.objects.filter(sale__seller=user).order_by('-pk')
+                            .values('id', 'sale_id').first())
+                except OperationalError:  # la consulta del harness también puede toparse con un bloqueo
+                    item = None
+                if item:
+                    call('return', reverse('process_return', args=[item['sale_id']]),
+                         {f"qty_{item['id']}": 1, 'motive': 'Prueba de carga'})
+        call('close_session', reverse('close_session'), {'ending_balance': '0.00'})
+
+    def _administrator(self, client, options, barrier, done, local):
+        """Un administrador que refresca el dashboard mientras las cajas venden."""
+        barrier.wait()
+        if not options['dashboard_interval']:
+            return
+        while not done.is_set():
+            local.append(self._request(client, 'dashboard', reverse('dashboard'), None, method='get'))
+            done.wait(options['dashboard_interval'])
+
+    def _request(self, client, endpoint, url, data, method='post'):
+        """Hace la petición y la clasifica: ok, rechazada (4xx o aviso en rojo), error o bloqueo."""
+        _failures.exception = None
+        with measure() as sample:
+            try:
+                response = getattr(client, method)(url, data)
+            except Exception as e:  # fallos fuera de la vista (middleware, client)
+                response, _failures.exception = None, e
+        exception = _failures.exception
+        if exception is not None:
+            outcome = 'lock_timeout' if _is_lock_timeout(exception) else 'error'
+        elif response.status_code >= 500:
+            outcome = 'error'
+        elif response.status_code >= 400 or b'color:red' in response.content:
+            outcome = 'rejected'
+        else:
+            outcome = 'ok'
+        return {'endpoint': endpoint, 'outcome': outcome, **sample}
+
+    def _row(self, endpoint, samples, elapsed):
+        if not samples:
+            return {'endpoint': endpoint, 'runs': 0}
+        outcomes = defaultdict(int)
+        for sample in samples:
+            outcomes[sample['outcome']] += 1
+        runs = len(samples)
+        return {
+            'endpoint': endpoint,
+            'per_second': round(runs / elapsed, 1),
+            **summarize(samples),
+            'queries_avg': round(sum(s['queries'] for s in samples) / runs, 1),
+            'rejected': outcomes['rejected'],
+            'errors': outcomes['error'],
+            'lock_timeouts': outcomes['lock_timeout'],
+            'error_rate': round((outcomes['error'] + outcomes['lock_timeout']) / runs, 4),
+            'lock_timeout_rate': round(outcomes['lock_timeout'] / runs, 4),
+        }
@@ -0,0 +1,18 @@
+# pos/management/commands/rebuild_product_index.py
+from django.core.management.base import BaseCommand
+
+from pos.search import rebuild_product_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye el índice de búsqueda del catálogo (ProductSearchToken). "
+        "Solo hace falta después de cargas masivas (bulk_create/update) que no disparan señales."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help="Productos por lote.")
+
+    def handle(self, *args, **options):
+        total = rebuild_product_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{total} productos indexados."))
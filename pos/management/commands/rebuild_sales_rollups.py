@@ -0,0 +1,62 @@
+# pos/management/commands/rebuild_sales_rollups.py
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from pos.models import Sale
+from pos.rollups import rebuild_range
+
+
+def _parse_date(value):
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f"Fecha inválida: {value} (formato AAAA-MM-DD)")
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye (o rellena por primera vez) los rollups diarios del dashboard "
+        "a partir de Sale/SaleItem/SaleReturnItem, en lotes de días. "
+        "Cada lote es una transacción que bloquea las filas de sus días. El día en curso "
+        "se omite salvo con --include-today (mejor fuera del horario de venta)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="Primer día (AAAA-MM-DD). Por defecto, la primera venta.")
+        parser.add_argument('--end', help="Último día (AAAA-MM-DD). Por defecto, la última venta.")
+        parser.add_argument('--batch-days', type=int, default=31, help="Días por lote/transacción.")
+        parser.add_argument(
+            '--include-today', action='store_true',
+            help="Reconstruye también el día en curso; las cajas que vendan mientras tanto esperan al lote.",
+        )
+
+    def handle(self, *args, **options):
+        bounds = Sale.objects.aggregate(first=Min('sale_date'), last=Max('sale_date'))
+        if bounds['first'] is None and not (options['start'] and options['end']):
+            self.stdout.write("No hay ventas registradas.")
+            return
+
+        start = _parse_date(options['start']) if options['start'] else timezone.localdate(bounds['first'])
+        end = _parse_date(options['end']) if options['end'] else timezone.localdate(bounds['last'])
+        if start > end:
+            raise CommandError("--start debe ser anterior o igual a --end.")
+
+        today = timezone.localdate()
+        if end >= today and not options['include_today']:
+            end = today - datetime.timedelta(days=1)
+            if start > end:
+                raise CommandError("El rango solo abarca el día en curso: agrega --include-today.")
+            self.stdout.write(f"Se omite el día en curso ({today}); agrega --include-today para incluirlo.")
+
+        batch = datetime.timedelta(days=max(1, options['batch_days']))
+        batch_start = start
+        while batch_start <= end:
+            batch_end = min(end, batch_start + batch - datetime.timedelta(days=1))
+            summaries, products = rebuild_range(batch_start, batch_end)
+            self.stdout.write(f"{batch_start} → {batch_end}: {summaries} resúmenes, {products} filas por producto")
+            batch_start = batch_end + datetime.timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS("Rollups reconstruidos."))
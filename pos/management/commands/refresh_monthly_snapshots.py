@@ -0,0 +1,22 @@
+# pos/management/commands/refresh_monthly_snapshots.py
+from django.core.management.base import BaseCommand
+
+from pos.models import MonthlySalesSnapshot
+from pos.rollups import refresh_monthly_snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        "Calcula los snapshots de meses cerrados que falten o estén desactualizados. "
+        "El resumen mensual lo hace solo al abrirse; esto sirve para precalcular o, con --all, "
+        "para recalcular todo después de cargas masivas que no disparan señales."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Recalcula todos los meses cerrados.")
+
+    def handle(self, *args, **options):
+        if options['all']:
+            MonthlySalesSnapshot.objects.update(is_stale=True)
+        refreshed = refresh_monthly_snapshots()
+        self.stdout.write(self.style.SUCCESS(f"{refreshed} meses recalculados."))
@@ -0,0 +1,60 @@
+# pos/management/commands/reprice_products.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pos.forms import RepriceForm
+from pos.models import Category, Supplier
+from pos.pricing import PREVIEW_ROWS, ROUNDINGS, RULES, apply_repricing, repricing_preview
+
+
+class Command(BaseCommand):
+    help = (
+        "Reprecio masivo de una categoría y/o proveedor con un solo UPDATE: porcentaje o monto fijo sobre "
+        "el precio actual, o costo + margen, con redondeo. Sin --apply solo muestra cuántos productos "
+        "cambian y las primeras filas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--category', help="Nombre de la categoría.")
+        parser.add_argument('--supplier', help="Nombre del proveedor.")
+        parser.add_argument('--rule', choices=[key for key, _ in RULES], default='percent')
+        parser.add_argument('value', help="Porcentaje (percent, margin) o monto (delta); puede ser negativo.")
+        parser.add_argument('--round', dest='rounding', choices=[key for key, _ in ROUNDINGS], default='cent')
+        parser.add_argument('--preview', type=int, default=PREVIEW_ROWS, help="Filas de la vista previa.")
+        parser.add_argument('--apply', action='store_true', help="Aplica el reprecio (por defecto solo vista previa).")
+
+    def handle(self, *args, **options):
+        form = RepriceForm({
+            'category': self._lookup(Category, options['category'], "la categoría"),
+            'supplier': self._lookup(Supplier, options['supplier'], "el proveedor"),
+            'rule': options['rule'], 'value': options['value'], 'rounding': options['rounding'],
+            'preview_rows': options['preview'],
+        })
+        if not form.is_valid():
+            raise CommandError(' '.join(message for errors in form.errors.values() for message in errors))
+
+        start = time.perf_counter()
+        if options['apply']:
+            updated = apply_repricing(**form.pricing_args())
+            self.stdout.write(self.style.SUCCESS(
+                f"{updated} productos con precio nuevo en {time.perf_counter() - start:.2f}s."
+            ))
+            return
+
+        total, rows = repricing_preview(**form.pricing_args(), limit=options['preview'])
+        for row in rows:
+            self.stdout.write(f"  {row['sku']} {row['name']}: ${row['price']} → ${row['new_price']}")
+        if total > len(rows):
+            self.stdout.write(f"  ... y {total - len(rows)} más.")
+        self.stdout.write(self.style.WARNING(
+            f"Cambiarían {total} productos ({time.perf_counter() - start:.2f}s). Use --apply para aplicar."
+        ))
+
+    def _lookup(self, model, name, label):
+        if not name:
+            return None
+        try:
+            return model.objects.get(name=name).pk
+        except model.DoesNotExist:
+            raise CommandError(f"No existe {label} '{name}'.")
@@ -0,0 +1,76 @@
+# pos/management/commands/run_report_worker.py
+import datetime
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+# OJO: este módulo se re-importa en cada proceso 'spawn' ANTES de django.setup(),
+# por eso pos.jobs (que importa modelos) se importa dentro de las funciones.
+
+
+def _init_process():
+    # 'spawn': cada proceso arranca limpio y abre sus propias conexiones a la BD
+    # (nunca comparte el socket del proceso padre).
+    django.setup()
+
+
+def _run(job_id):
+    from pos.jobs import run_report_job
+    try:
+        run_report_job(job_id)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker local de reportes: toma ReportJob en cola y los genera en un pool de procesos. "
+        "No necesita Redis ni ningún broker; la cola es la propia tabla."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2, help="Reportes generados en paralelo.")
+        parser.add_argument('--poll-interval', type=float, default=2.0, help="Segundos entre consultas a la cola.")
+        parser.add_argument('--stale-minutes', type=int, default=60,
+                            help="Trabajos 'running' más viejos que esto se devuelven a la cola al arrancar.")
+        parser.add_argument('--once', action='store_true', help="Procesa lo que haya en cola y termina.")
+
+    def handle(self, *args, **options):
+        from pos.jobs import claim_jobs, fail_job, requeue_job, requeue_stale_jobs
+
+        requeued = requeue_stale_jobs(datetime.timedelta(minutes=options['stale_minutes']))
+        if requeued:
+            self.stdout.write(f"{requeued} trabajos devueltos a la cola.")
+
+        processes = max(1, options['processes'])
+        running = {}
+        context = multiprocessing.get_context('spawn')
+
+        with ProcessPoolExecutor(max_workers=processes, mp_context=context, initializer=_init_process) as pool:
+            while True:
+                for job_id, future in list(running.items()):
+                    if future.done():
+                        del running[job_id]
+                        error = future.exception()
+                        if error:
+                            fail_job(job_id, error)
+                            self.stderr.write(f"Reporte {job_id} falló: {error}")
+                        else:
+                            self.stdout.write(f"Reporte {job_id} listo.")
+
+                for job_id in claim_jobs(processes - len(running)):
+                    self.stdout.write(f"Generando reporte {job_id}...")
+                    try:
+                        running[job_id] = pool.submit(_run, job_id)
+                    except BrokenProcessPool:
+                        requeue_job(job_id)
+                        raise
+
+                if options['once'] and not running:
+                    return
+                time.sleep(options['poll_interval'])
@@ -0,0 +1,143 @@
+# pos/management/commands/stress_returns.py
+import logging
+import random
+import threading
+from collections import Counter
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+from django.test import Client as TestClient
+from django.urls import reverse
+
+from pos.models import CashDrawerSession, Product, Sale, SaleItem, SaleReturnItem
+from pos.stock import compact_stock_movements
+from ._bench import benchmark_database, write_results
+
+HOT_SKU = 'STRESS-HOT'
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de concurrencia: varios hilos cobran y devuelven a la vez el mismo SKU a través de las "
+        "vistas reales y al final se verifica que el stock cuadre con las ventas y devoluciones "
+        "(ninguna actualización perdida) y que ninguna venta quede sobre-devuelta. "
+        "Requiere una base con escrituras concurrentes (MySQL, o SQLite en archivo)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help="Hilos (la mitad cobra, la mitad devuelve).")
+        parser.add_argument('--operations', type=int, default=100, help="Operaciones por hilo.")
+        parser.add_argument('--sales', type=int, default=20,
+                            help="Ventas previas que se devuelven (pocas = más choques en la misma venta).")
+        parser.add_argument('--units', type=int, default=5, help="Unidades del SKU en cada venta previa.")
+        parser.add_argument('--stock', type=int, default=100000, help="Stock inicial del SKU.")
+        parser.add_argument('--json', action='store_true', help="Salida en JSON.")
+        parser.add_argument('--keepdb', action='store_true', help="Reutiliza la base de pruebas.")
+
+    def handle(self, *args, **options):
+        # Los 400 de devoluciones rechazadas son esperables; no llenar la salida con ellos.
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+        with benchmark_database(keepdb=options['keepdb']):
+            product, targets = self._seed(options)
+            last_seeded_sale = Sale.objects.order_by('-pk').values_list('pk', flat=True).first()
+
+            outcomes = Counter()
+            lock = threading.Lock()
+            users = [User.objects.create_user(f'stress_cajero_{i}', password='stress')
+                     for i in range(options['workers'])]
+            for user in users:
+                CashDrawerSession.objects.create(user=user, starting_balance=Decimal('0.00'))
+
+            threads = [
+                threading.Thread(target=self._worker, args=(i, user, targets, options, outcomes, lock))
+                for i, user in enumerate(users)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            # Con POS_STOCK_MODE='ledger' la foto se pone al día al compactar.
+            compact_stock_movements()
+            product.refresh_from_db()
+            sold = SaleItem.objects.filter(product=product, sale__pk__gt=last_seeded_sale).aggregate(
+                units=Sum('quantity'))['units'] or 0
+            returned = SaleReturnItem.objects.filter(product=product).aggregate(units=Sum('quantity'))['units'] or 0
+            expected_stock = options['stock'] - sold + returned
+            over_returned = [
+                sale_id for sale_id, _ in targets
+                if (SaleReturnItem.objects.filter(return_request__original_sale_id=sale_id)
+                    .aggregate(units=Sum('quantity'))['units'] or 0) > options['units']
+            ]
+
+        rows = [{'metric': name, 'value': value} for name, value in [
+            *sorted(outcomes.items()),
+            ('unidades_vendidas', sold),
+            ('unidades_devueltas', returned),
+            ('stock_esperado', expected_stock),
+            ('stock_final', product.stock),
+            ('ventas_sobre_devueltas', len(over_returned)),
+        ]]
+        write_results(self, rows, ['metric', 'value'], options['json'])
+
+        if product.stock != expected_stock or over_returned or outcomes['error']:
+            raise CommandError(
+                f"Inconsistencia: stock {product.stock} (esperado {expected_stock}), "
+                f"{len(over_returned)} ventas sobre-devueltas, {outcomes['error']} errores."
+            )
+        self.stdout.write(self.style.SUCCESS("Sin actualizaciones perdidas ni devoluciones de más."))
+
+    def _seed(self, options):
+        """El SKU caliente y ventas previas de ese SKU que los hilos devolverán."""
+        product = Product.objects.create(name="Producto de prueba", sku=HOT_SKU, price=Decimal('9.90'),
+                                         stock=options['stock'])
+        seller = User.objects.create_user('stress_vendedor', password='stress')
+        session = CashDrawerSession.objects.create(user=seller, starting_balance=Decimal('0.00'))
+        amount = product.price * options['units']
+        sales = Sale.objects.bulk_create(
+            Sale(seller=seller, cash_drawer_session=session, total_amount=amount, payment_method='card')
+            for _ in range(options['sales'])
+        )
+        if sales[0].pk is None:  # MySQL no devuelve los pks de bulk_create
+            sales = list(Sale.objects.filter(cash_drawer_session=session).order_by('pk'))
+        SaleItem.objects.bulk_create(
+            SaleItem(sale=sale, product=product, quantity=options['units'], unit_price=product.price,
+                     subtotal=amount, product_name=product.name)
+            for sale in sales
+        )
+        targets = list(SaleItem.objects.filter(sale__in=sales).values_list('sale_id', 'id'))
+        return product, targets
+
+    def _worker(self, index, user, targets, options, outcomes, lock):
+        rng = random.Random(index)
+        client = TestClient()
+        client.force_login(user)
+        add_url, checkout_url = reverse('add_product'), reverse('checkout')
+        local = Counter()
+        try:
+            for _ in range(options['operations']):
+                try:
+                    if index % 2 == 0:
+                        client.post(add_url, {'sku': HOT_SKU})
+                        response = client.post(checkout_url, {'payment_method': 'cash'})
+                        local['cobros' if response.status_code == 200 else 'error'] += 1
+                    else:
+                        sale_id, item_id = rng.choice(targets)
+                        response = client.post(reverse('process_return', args=[sale_id]),
+                                               {f'qty_{item_id}': rng.randint(1, 2)})
+                        if response.status_code == 200:
+                            local['devoluciones'] += 1
+                        elif response.status_code == 400:
+                            local['devoluciones_rechazadas'] += 1
+                        else:
+                            local['error'] += 1
+                except Exception as e:
+                    local['error'] += 1
+                    self.stderr.write(f"Hilo {index}: {e!r}")
+        finally:
+            connection.close()
+            with lock:
+                outcomes.update(local)
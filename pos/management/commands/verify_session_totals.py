@@ -0,0 +1,52 @@
+# pos/management/commands/verify_session_totals.py
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from pos.models import CashDrawerSession
+from pos.rollups import session_totals_from_sales
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula desde Sale los totales acumulados de cada turno (efectivo, tarjeta, devoluciones "
+        "y N° de ventas) y muestra los que no coinciden. Con --fix los corrige."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--session', type=int, action='append', dest='sessions',
+                            help="Solo este turno (se puede repetir).")
+        parser.add_argument('--fix', action='store_true', help="Sobrescribe los totales que no coinciden.")
+
+    def handle(self, *args, **options):
+        session_ids = options['sessions']
+        sessions = CashDrawerSession.objects.only(*CashDrawerSession.TOTAL_FIELDS).order_by('pk')
+        if session_ids:
+            sessions = sessions.filter(pk__in=session_ids)
+        expected = session_totals_from_sales(session_ids)
+        empty = {'cash_sales_total': Decimal('0.00'), 'card_sales_total': Decimal('0.00'),
+                 'returns_total': Decimal('0.00'), 'num_transactions': 0}
+
+        checked = mismatched = 0
+        for session in sessions.iterator(chunk_size=2000):
+            checked += 1
+            totals = expected.get(session.pk, empty)
+            diffs = {
+                field: (getattr(session, field), value)
+                for field, value in totals.items() if getattr(session, field) != value
+            }
+            if not diffs:
+                continue
+            mismatched += 1
+            detail = ', '.join(f"{field}: {stored} → {value}" for field, (stored, value) in diffs.items())
+            self.stdout.write(self.style.WARNING(f"Turno #{session.pk}: {detail}"))
+            if options['fix']:
+                with transaction.atomic():
+                    # Se recalcula con la fila bloqueada para no pisar una venta en curso.
+                    CashDrawerSession.objects.select_for_update().filter(pk=session.pk).get()
+                    fresh = session_totals_from_sales([session.pk]).get(session.pk, empty)
+                    CashDrawerSession.objects.filter(pk=session.pk).update(**fresh)
+
+        action = "corregidos" if options['fix'] else "con diferencias"
+        self.stdout.write(self.style.SUCCESS(f"{checked} turnos revisados, {mismatched} {action}."))
@@ -0,0 +1,189 @@
+# pos/metrics.py
+"""
+Instrumentación por request: consultas SQL (cantidad y tiempo), render de
+plantillas y tiempo total de la vista, por nombre de URL.
+
+ferrepos.middleware.ServerTimingMiddleware abre la medición de cada request,
+devuelve los tiempos en la cabecera Server-Timing y los acumula en histogramas
+en memoria que metrics_view expone en el formato de texto de Prometheus. Los
+histogramas son por proceso: con varios workers, cada uno expone los suyos.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.db.backends.signals import connection_created
+from django.template.backends.django import DjangoTemplates, Template
+
+# Mediciones del request en curso. Un ContextVar y no un threading.local: bajo
+# ASGI las consultas de las vistas corren en otro hilo (sync_to_async), que
+# hereda el contexto del request.
+_current = ContextVar('pos_request_timings', default=None)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class RequestTimings:
+    """Lo acumulado durante un request (tiempos en segundos)."""
+
+    __slots__ = ('queries', 'sql', 'template')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.template = 0.0
+
+
+def start_request():
+    """Abre la medición del request actual; devuelve (token, timings)."""
+    timings = RequestTimings()
+    return _current.set(timings), timings
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+# ---------------------------------------------------------------------------
+# SQL y plantillas
+# ---------------------------------------------------------------------------
+
+def _timed_execute(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:  # comandos, tareas en segundo plano
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.sql += time.perf_counter() - start
+
+
+def install_sql_timer(sender=None, connection=None, **kwargs):
+    """Agrega el cronómetro de consultas a la conexión (una sola vez por conexión)."""
+    if _timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_timed_execute)
+
+
+def uninstall_sql_timer(connection):
+    if _timed_execute in connection.execute_wrappers:
+        connection.execute_wrappers.remove(_timed_execute)
+
+
+connection_created.connect(install_sql_timer, dispatch_uid='pos_metrics_sql_timer')
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        timings = _current.get()
+        if timings is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings.template += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    Backend de plantillas de Django que mide el render. Solo se cronometran las
+    plantillas pedidas al backend (render/render_to_string): los {% include %} y
+    {% extends %} quedan dentro del tiempo de la plantilla que los usa.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+# ---------------------------------------------------------------------------
+# Histogramas
+# ---------------------------------------------------------------------------
+
+class Histogram:
+    """Histograma acumulativo por vista, con los buckets fijos de Prometheus."""
+
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self._series = {}  # vista -> [conteos por bucket (+Inf al final), suma]
+        self._lock = threading.Lock()
+
+    def observe(self, view, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(view)
+            if series is None:
+                series = self._series[view] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {view: (list(counts), total) for view, (counts, total) in self._series.items()}
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def exposition(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for view, (counts, total) in sorted(self.snapshot().items()):
+            label = f'view="{_escape_label(view)}"'
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label}}} {total:.6f}')
+            lines.append(f'{self.name}_count{{{label}}} {cumulative}')
+        return lines
+
+
+REQUEST_SECONDS = Histogram('pos_request_duration_seconds', "Tiempo total de la vista por request.",
+                            DURATION_BUCKETS)
+SQL_SECONDS = Histogram('pos_request_sql_seconds', "Tiempo en consultas SQL por request.", DURATION_BUCKETS)
+SQL_QUERIES = Histogram('pos_request_sql_queries', "Consultas SQL por request.", QUERY_BUCKETS)
+TEMPLATE_SECONDS = Histogram('pos_request_template_seconds', "Tiempo de render de plantillas por request.",
+                             DURATION_BUCKETS)
+HISTOGRAMS = (REQUEST_SECONDS, SQL_SECONDS, SQL_QUERIES, TEMPLATE_SECONDS)
+
+
+def _escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def view_name(request):
+    """Nombre de la URL resuelta ('pos:…' con namespace); 'unresolved' para los 404."""
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else 'unresolved'
+
+
+def observe_request(view, timings, total):
+    REQUEST_SECONDS.observe(view, total)
+    SQL_SECONDS.observe(view, timings.sql)
+    SQL_QUERIES.observe(view, timings.queries)
+    TEMPLATE_SECONDS.observe(view, timings.template)
+
+
+def server_timing(timings, total):
+    """Valor de la cabecera Server-Timing (duraciones en ms)."""
+    return (
+        f'sql;dur={timings.sql * 1000:.2f};desc="{timings.queries} consultas", '
+        f'tpl;dur={timings.template * 1000:.2f}, '
+        f'view;dur={total * 1000:.2f}'
+    )
+
+
+def render_prometheus():
+    """Todos los histogramas en el formato de texto de Prometheus (0.0.4)."""
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.exposition())
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:56
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Copia congelada de pos.search.normalize_words/client_tokens al momento de
+# esta migración: el módulo vivo puede cambiar sin que la migración deba hacerlo.
+TOKEN_MAX_LENGTH = 50
+WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def normalize_words(text):
+    if not text:
+        return []
+    folded = unicodedata.normalize('NFKD', str(text))
+    folded = ''.join(ch for ch in folded if not unicodedata.combining(ch)).lower()
+    return [word[:TOKEN_MAX_LENGTH] for word in WORD_RE.findall(folded)]
+
+
+def client_tokens(client):
+    tokens = set()
+    for value in (client.first_name, client.last_name, client.company_name, client.tax_id):
+        tokens.update(normalize_words(value))
+    return tokens
+
+
+def index_existing_clients(apps, schema_editor):
+    Client = apps.get_model('pos', 'Client')
+    ClientSearchToken = apps.get_model('pos', 'ClientSearchToken')
+    batch = []
+    for client in Client.objects.only('first_name', 'last_name', 'company_name', 'tax_id').iterator(chunk_size=2000):
+        batch.extend(ClientSearchToken(client_id=client.pk, token=token) for token in client_tokens(client))
+        if len(batch) >= 2000:
+            ClientSearchToken.objects.bulk_create(batch)
+            batch = []
+    ClientSearchToken.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0012_reportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=50, verbose_name='Token')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='pos.client')),
+            ],
+            options={
+                'verbose_name': 'Token de Búsqueda de Cliente',
+                'verbose_name_plural': 'Tokens de Búsqueda de Clientes',
+                'constraints': [models.UniqueConstraint(fields=('token', 'client'), name='uniq_client_search_token')],
+            },
+        ),
+        migrations.RunPython(index_existing_clients, migrations.RunPython.noop),
+    ]
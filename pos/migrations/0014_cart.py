@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0013_client_search_token'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Cart',
+            fields=[
+                ('cash_drawer_session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='cart', serialize=False, to='pos.cashdrawersession')),
+                ('total_cents', models.BigIntegerField(default=0, verbose_name='Total (centavos)')),
+            ],
+            options={
+                'verbose_name': 'Carrito',
+                'verbose_name_plural': 'Carritos',
+            },
+        ),
+        migrations.CreateModel(
+            name='CartLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sku', models.CharField(max_length=100, verbose_name='SKU')),
+                ('name', models.CharField(max_length=200, verbose_name='Nombre')),
+                ('unit_price_cents', models.BigIntegerField(verbose_name='Precio Unitario (centavos)')),
+                ('quantity', models.PositiveIntegerField(default=0, verbose_name='Cantidad')),
+                ('cart', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='pos.cart')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='pos.product')),
+            ],
+            options={
+                'verbose_name': 'Línea de Carrito',
+                'verbose_name_plural': 'Líneas de Carrito',
+                'constraints': [models.UniqueConstraint(fields=('cart', 'product'), name='uniq_cart_line_product')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0014_cart'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Primero los índices compuestos: en MySQL la FK necesita un índice que empiece
+        # por su columna antes de poder borrar el índice propio.
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['sale_date', 'payment_method'], name='sale_date_method'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['cash_drawer_session', 'payment_method'], name='sale_session_method'),
+        ),
+        migrations.AddIndex(
+            model_name='saleitem',
+            index=models.Index(fields=['product', 'sale'], name='saleitem_product_sale'),
+        ),
+        migrations.AlterField(
+            model_name='sale',
+            name='cash_drawer_session',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='sales', to='pos.cashdrawersession', verbose_name='Turno de Caja'),
+        ),
+        migrations.AlterField(
+            model_name='saleitem',
+            name='product',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='pos.product'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0015_reporting_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlySalesSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(unique=True, verbose_name='Mes')),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Total')),
+                ('num_transactions', models.IntegerField(default=0, verbose_name='Transacciones')),
+                ('is_stale', models.BooleanField(default=False, verbose_name='Desactualizado')),
+                ('computed_at', models.DateTimeField(auto_now=True, verbose_name='Calculado')),
+            ],
+            options={
+                'verbose_name': 'Resumen Mensual Cerrado',
+                'verbose_name_plural': 'Resúmenes Mensuales Cerrados',
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:22
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_session_totals(apps, schema_editor):
+    CashDrawerSession = apps.get_model('pos', 'CashDrawerSession')
+    Sale = apps.get_model('pos', 'Sale')
+    rows = Sale.objects.values('cash_drawer_session_id').annotate(
+        cash=Sum('total_amount', filter=Q(payment_method='cash')),
+        card=Sum('total_amount', filter=Q(payment_method='card')),
+        returns=Sum('total_amount', filter=Q(payment_method='return')),
+        count=Count('id', filter=Q(payment_method__in=['cash', 'card'])),
+    ).order_by()
+    for row in rows:
+        CashDrawerSession.objects.filter(pk=row['cash_drawer_session_id']).update(
+            cash_sales_total=row['cash'] or 0,
+            card_sales_total=row['card'] or 0,
+            returns_total=-(row['returns'] or 0),
+            num_transactions=row['count'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0016_monthly_sales_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cashdrawersession',
+            name='card_sales_total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Ventas con Tarjeta'),
+        ),
+        migrations.AddField(
+            model_name='cashdrawersession',
+            name='cash_sales_total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Ventas en Efectivo'),
+        ),
+        migrations.AddField(
+            model_name='cashdrawersession',
+            name='num_transactions',
+            field=models.IntegerField(default=0, verbose_name='N° de Ventas'),
+        ),
+        migrations.AddField(
+            model_name='cashdrawersession',
+            name='returns_total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Devoluciones'),
+        ),
+        migrations.RunPython(backfill_session_totals, migrations.RunPython.noop),
+    ]
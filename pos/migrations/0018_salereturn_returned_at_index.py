@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0017_cash_session_totals'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='salereturn',
+            index=models.Index(fields=['returned_at'], name='salereturn_returned_at'),
+        ),
+    ]
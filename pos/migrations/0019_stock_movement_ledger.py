@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:47
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0018_salereturn_returned_at_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='stock',
+            field=models.IntegerField(default=0, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Cantidad en Stock'),
+        ),
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(verbose_name='Cantidad')),
+                ('reason', models.CharField(choices=[('sale', 'Venta'), ('return', 'Devolución'), ('adjustment', 'Ajuste de Inventario')], max_length=20, verbose_name='Motivo')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha')),
+                ('applied', models.BooleanField(default=False, verbose_name='Aplicado a la Foto de Stock')),
+                ('product', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='pos.product')),
+            ],
+            options={
+                'verbose_name': 'Movimiento de Stock',
+                'verbose_name_plural': 'Movimientos de Stock',
+                'indexes': [models.Index(fields=['product', 'created_at'], name='stockmove_product_created'), models.Index(fields=['applied', 'product'], name='stockmove_pending')],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_low_stock(apps, schema_editor):
+    # Disponible = foto + movimientos sin aplicar (como pos.stock.with_available_stock).
+    Product = apps.get_model('pos', 'Product')
+    StockMovement = apps.get_model('pos', 'StockMovement')
+    pending = (
+        StockMovement.objects.filter(product=OuterRef('pk'), applied=False)
+        .values('product').annotate(total=Sum('quantity')).values('total')
+    )
+    Product.objects.annotate(
+        available_stock=F('stock') + Coalesce(Subquery(pending, output_field=IntegerField()), Value(0)),
+    ).filter(available_stock__lte=F('low_stock_threshold')).update(is_low_stock=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0019_stock_movement_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='is_low_stock',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Stock Bajo'),
+        ),
+        migrations.CreateModel(
+            name='LowStockChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_low_stock', models.BooleanField(verbose_name='Stock Bajo')),
+                ('stock', models.IntegerField(verbose_name='Stock Disponible')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='low_stock_changes', to='pos.product')),
+            ],
+            options={
+                'verbose_name': 'Cambio de Stock Bajo',
+                'verbose_name_plural': 'Cambios de Stock Bajo',
+            },
+        ),
+        migrations.RunPython(backfill_low_stock, migrations.RunPython.noop),
+        # Después del backfill: el índice se construye una vez, con los valores ya puestos.
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_low_stock', 'name', 'id'], name='product_low_stock_name'),
+        ),
+    ]
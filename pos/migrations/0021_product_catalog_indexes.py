@@ -0,0 +1,79 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:54
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Copia congelada de pos.search.normalize_words/product_tokens al momento de
+# esta migración: el módulo vivo puede cambiar sin que la migración deba hacerlo.
+TOKEN_MAX_LENGTH = 50
+WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def normalize_words(text):
+    if not text:
+        return []
+    folded = unicodedata.normalize('NFKD', str(text))
+    folded = ''.join(ch for ch in folded if not unicodedata.combining(ch)).lower()
+    return [word[:TOKEN_MAX_LENGTH] for word in WORD_RE.findall(folded)]
+
+
+def product_tokens(product):
+    return set(normalize_words(product.name)) | set(normalize_words(product.sku))
+
+
+def index_existing_products(apps, schema_editor):
+    Product = apps.get_model('pos', 'Product')
+    ProductSearchToken = apps.get_model('pos', 'ProductSearchToken')
+    batch = []
+    for product in Product.objects.only('name', 'sku').iterator(chunk_size=2000):
+        batch.extend(ProductSearchToken(product_id=product.pk, token=token) for token in product_tokens(product))
+        if len(batch) >= 2000:
+            ProductSearchToken.objects.bulk_create(batch)
+            batch = []
+    ProductSearchToken.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0020_low_stock_flag'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=50, verbose_name='Token')),
+            ],
+            options={
+                'verbose_name': 'Token de Búsqueda de Producto',
+                'verbose_name_plural': 'Tokens de Búsqueda de Productos',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['name', 'id'], name='product_name_id'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', 'name', 'id'], name='product_category_name'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['supplier', 'name', 'id'], name='product_supplier_name'),
+        ),
+        migrations.AddField(
+            model_name='productsearchtoken',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='pos.product'),
+        ),
+        migrations.AddConstraint(
+            model_name='productsearchtoken',
+            constraint=models.UniqueConstraint(fields=('token', 'product'), name='uniq_product_search_token'),
+        ),
+        migrations.RunPython(index_existing_products, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:58
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_last_purchase(apps, schema_editor):
+    Client = apps.get_model('pos', 'Client')
+    Sale = apps.get_model('pos', 'Sale')
+    # Igual que pos.rollups.record_sale: una devolución no es una compra.
+    purchases = Sale.objects.exclude(payment_method='return')
+    latest = purchases.filter(client=OuterRef('pk')).order_by('-sale_date').values('sale_date')[:1]
+    Client.objects.filter(pk__in=purchases.values('client_id')).update(last_purchase_at=Subquery(latest))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0021_product_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='client',
+            options={'ordering': ['last_name', 'first_name', 'id'], 'verbose_name': 'Cliente', 'verbose_name_plural': 'Clientes'},
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='last_purchase_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Última Compra'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['last_name', 'first_name', 'id'], name='client_name_order'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['is_professional', 'last_name', 'first_name', 'id'], name='client_professional_name'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['last_purchase_at'], name='client_last_purchase'),
+        ),
+        migrations.RunPython(backfill_last_purchase, migrations.RunPython.noop),
+    ]
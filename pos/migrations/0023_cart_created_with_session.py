@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:07
+
+from django.db import migrations
+
+
+def create_open_carts(apps, schema_editor):
+    Cart = apps.get_model('pos', 'Cart')
+    CashDrawerSession = apps.get_model('pos', 'CashDrawerSession')
+    # Desde ahora el carrito se crea al abrir la sesión; las que ya estaban abiertas sin escanear no lo tienen.
+    open_sessions = CashDrawerSession.objects.filter(end_time__isnull=True, cart__isnull=True)
+    Cart.objects.bulk_create(
+        [Cart(cash_drawer_session_id=pk) for pk in open_sessions.values_list('pk', flat=True)],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0022_client_directory_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='cart',
+            name='total_cents',
+        ),
+        migrations.RunPython(create_open_carts, migrations.RunPython.noop),
+    ]
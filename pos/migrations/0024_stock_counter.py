@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0023_cart_created_with_session'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockCounter',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stock_counter', serialize=False, to='pos.product', verbose_name='Producto')),
+                ('available', models.IntegerField(verbose_name='Stock Disponible')),
+            ],
+            options={
+                'verbose_name': 'Contador de Stock',
+                'verbose_name_plural': 'Contadores de Stock',
+            },
+        ),
+    ]
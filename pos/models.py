@@ -1,3 +1,6 @@
+from decimal import Decimal
+
+from django.core.validators import MinValueValidator
 from django.db import models
 from django.contrib.auth.models import User
 from django.conf import settings
@@ -17,7 +20,10 @@ class Product(models.Model):
     sku = models.CharField(max_length=100, unique=True, verbose_name="SKU / Código")
     price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Precio de Venta")
     cost = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Precio de Costo", null=True, blank=True)
-    stock = models.PositiveIntegerField(default=0, verbose_name="Cantidad en Stock")
+    # Con POS_STOCK_MODE='ledger' es la foto compactada: el disponible es stock +
+    # los StockMovement sin aplicar (ver pos.stock). Entero con signo porque la
+    # compactación suma los pendientes por lotes y un lote puede ser negativo.
+    stock = models.IntegerField(default=0, validators=[MinValueValidator(0)], verbose_name="Cantidad en Stock")
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Categoría")
     supplier = models.ForeignKey(Supplier, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Proveedor")
     low_stock_threshold = models.PositiveIntegerField(
@@ -25,8 +31,22 @@ class Product(models.Model):
         verbose_name="Umbral de Stock Bajo",
         help_text="Stock mínimo para disparar una alerta."
     )
+    # Disponible <= umbral. Lo mantiene pos.stock en cada cambio de stock o de
+    # umbral (ver refresh_low_stock); indexado (product_low_stock_name) para que
+    # las alertas no recorran todo el catálogo.
+    is_low_stock = models.BooleanField(default=False, editable=False, verbose_name="Stock Bajo")
     def __str__(self): return self.name
 
+    class Meta:
+        # Catálogo paginado por keyset (pos.catalog): cada filtro lee un rango
+        # ya ordenado por (name, id) en lugar de ordenar el conjunto filtrado.
+        indexes = [
+            models.Index(fields=['name', 'id'], name='product_name_id'),
+            models.Index(fields=['category', 'name', 'id'], name='product_category_name'),
+            models.Index(fields=['supplier', 'name', 'id'], name='product_supplier_name'),
+            models.Index(fields=['is_low_stock', 'name', 'id'], name='product_low_stock_name'),
+        ]
+
 class CashDrawerSession(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name="Cajero")
     start_time = models.DateTimeField(auto_now_add=True, verbose_name="Hora de Apertura")
@@ -36,6 +56,18 @@ class CashDrawerSession(models.Model):
                                          verbose_name="Saldo de Cierre")
     notes = models.TextField(blank=True, verbose_name="Notas de Cierre")
 
+    # Totales acumulados del turno: los mantiene pos.rollups.record_sale con F()
+    # en la misma transacción de cada venta/devolución (ver verify_session_totals).
+    cash_sales_total = models.DecimalField(max_digits=12, decimal_places=2, default=0,
+                                           verbose_name="Ventas en Efectivo")
+    card_sales_total = models.DecimalField(max_digits=12, decimal_places=2, default=0,
+                                           verbose_name="Ventas con Tarjeta")
+    returns_total = models.DecimalField(max_digits=12, decimal_places=2, default=0,
+                                        verbose_name="Devoluciones")
+    num_transactions = models.IntegerField(default=0, verbose_name="N° de Ventas")
+
+    TOTAL_FIELDS = ('cash_sales_total', 'card_sales_total', 'returns_total', 'num_transactions')
+
     def __str__(self):
         end_str = self.end_time.strftime('%H:%M') if self.end_time else 'Activa'
         return f"Sesión {self.id} de {self.user.username}"
@@ -46,8 +78,9 @@ class Sale(models.Model):
     sale_date = models.DateTimeField(auto_now_add=True)
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     seller = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Sin índice propio: lo cubre sale_session_method (cash_drawer_session, payment_method).
     cash_drawer_session = models.ForeignKey(CashDrawerSession, on_delete=models.PROTECT, related_name='sales',
-                                            verbose_name="Turno de Caja")
+                                            verbose_name="Turno de Caja", db_index=False)
     client = models.ForeignKey(
         'Client',
         on_delete=models.SET_NULL,
@@ -65,9 +98,18 @@ class Sale(models.Model):
     def __str__(self):
         return f"Venta #{self.id} - Total: ${self.total_amount}"
 
+    class Meta:
+        indexes = [
+            # Reportes por rango de fechas (pos.dates.date_range_q) y totales por método de pago.
+            models.Index(fields=['sale_date', 'payment_method'], name='sale_date_method'),
+            # Cierre de caja y admin de sesiones: ventas de un turno por método de pago.
+            models.Index(fields=['cash_drawer_session', 'payment_method'], name='sale_session_method'),
+        ]
+
 class SaleItem(models.Model):
     sale = models.ForeignKey('Sale', related_name='items', on_delete=models.CASCADE)
-    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    # Sin índice propio: lo cubre saleitem_product_sale (product, sale).
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, db_index=False)
     quantity = models.IntegerField(default=1)
     unit_price = models.DecimalField(max_digits=10, decimal_places=2)
     subtotal = models.DecimalField(max_digits=10, decimal_places=2)
@@ -76,6 +118,12 @@ class SaleItem(models.Model):
     def __str__(self):
         return f"{self.quantity} x {self.product.name}"
 
+    class Meta:
+        indexes = [
+            # Ventas de un producto (historial, rollups por producto) sin pasar por todas sus líneas.
+            models.Index(fields=['product', 'sale'], name='saleitem_product_sale'),
+        ]
+
 
 class Client(models.Model):
     first_name = models.CharField(max_length=100, verbose_name="Nombre")
@@ -89,11 +137,22 @@ class Client(models.Model):
     is_professional = models.BooleanField(default=False, verbose_name="Cliente Profesional/Empresa")
 
     created_at = models.DateTimeField(auto_now_add=True)
+    # Fecha de la última venta asociada; la actualiza pos.rollups.record_sale
+    # (filtro "con compras recientes" del directorio).
+    last_purchase_at = models.DateTimeField(null=True, blank=True, editable=False,
+                                            verbose_name="Última Compra")
 
     class Meta:
         verbose_name = "Cliente"
         verbose_name_plural = "Clientes"
-        ordering = ['last_name', 'first_name']
+        # El id al final desempata y es la última columna del keyset (client_list_view).
+        ordering = ['last_name', 'first_name', 'id']
+        indexes = [
+            models.Index(fields=['last_name', 'first_name', 'id'], name='client_name_order'),
+            models.Index(fields=['is_professional', 'last_name', 'first_name', 'id'],
+                         name='client_professional_name'),
+            models.Index(fields=['last_purchase_at'], name='client_last_purchase'),
+        ]
 
     def __str__(self):
         if self.company_name:
@@ -124,11 +183,15 @@ class SaleReturn(models.Model):
     )
 
     def __str__(self):
-        return f"Devolución de Venta #{self.original_sale.id} ({self.returned_at.strftime('%Y-%m-%d')})"
+        return f"Devolución de Venta #{self.original_sale_id} ({self.returned_at.strftime('%Y-%m-%d')})"
 
     class Meta:
         verbose_name = "Devolución de Venta"
         verbose_name_plural = "Devoluciones de Ventas"
+        indexes = [
+            # date_hierarchy del admin de devoluciones.
+            models.Index(fields=['returned_at'], name='salereturn_returned_at'),
+        ]
 
 
 class SaleReturnItem(models.Model):
@@ -154,4 +217,269 @@ class SaleReturnItem(models.Model):
 
     class Meta:
         verbose_name = "Artículo Devuelto"
-        verbose_name_plural = "Artículos Devueltos"
\ No newline at end of file
+        verbose_name_plural = "Artículos Devueltos"
+
+class DailySalesSummary(models.Model):
+    """Rollup diario de ventas por método de pago. Lo mantienen checkout y devoluciones."""
+    date = models.DateField(verbose_name="Fecha")
+    payment_method = models.CharField(max_length=10, verbose_name="Método de Pago")
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Total")
+    num_transactions = models.IntegerField(default=0, verbose_name="Transacciones")
+
+    def __str__(self):
+        return f"{self.date} {self.payment_method}: ${self.total_amount}"
+
+    class Meta:
+        verbose_name = "Resumen Diario de Ventas"
+        verbose_name_plural = "Resúmenes Diarios de Ventas"
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'payment_method'], name='uniq_daily_sales_date_method'),
+        ]
+
+
+class DailyProductSales(models.Model):
+    """Rollup diario de unidades e ingresos por producto (neto de devoluciones)."""
+    date = models.DateField(verbose_name="Fecha")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    units = models.IntegerField(default=0, verbose_name="Unidades")
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Ingresos")
+
+    def __str__(self):
+        return f"{self.date} {self.product_id}: {self.units}"
+
+    class Meta:
+        verbose_name = "Venta Diaria por Producto"
+        verbose_name_plural = "Ventas Diarias por Producto"
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'product'], name='uniq_daily_product_date_product'),
+        ]
+
+
+class MonthlySalesSnapshot(models.Model):
+    """
+    Totales de un mes ya cerrado (Sale completo, incluidas las devoluciones).
+    Se calcula una vez y queda congelado; is_stale marca los meses que hay que
+    recalcular porque se creó, editó o borró una venta con fecha en ese mes.
+    """
+    month = models.DateField(unique=True, verbose_name="Mes")  # primer día del mes
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Total")
+    num_transactions = models.IntegerField(default=0, verbose_name="Transacciones")
+    is_stale = models.BooleanField(default=False, verbose_name="Desactualizado")
+    computed_at = models.DateTimeField(auto_now=True, verbose_name="Calculado")
+
+    def __str__(self):
+        return f"{self.month:%Y-%m}: {self.total_amount}"
+
+    class Meta:
+        verbose_name = "Resumen Mensual Cerrado"
+        verbose_name_plural = "Resúmenes Mensuales Cerrados"
+
+
+class ReportJob(models.Model):
+    """Exportación del reporte de ventas generada en segundo plano (manage.py run_report_worker)."""
+    FORMAT_CHOICES = [
+        ('excel', 'Excel'),
+        ('pdf', 'PDF'),
+        ('pdf_summary', 'PDF Resumido'),
+    ]
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'En cola'),
+        (STATUS_RUNNING, 'Generando'),
+        (STATUS_DONE, 'Listo'),
+        (STATUS_FAILED, 'Error'),
+    ]
+
+    report_format = models.CharField(max_length=20, choices=FORMAT_CHOICES, verbose_name="Formato")
+    start_date = models.DateField(verbose_name="Desde")
+    end_date = models.DateField(verbose_name="Hasta")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name="Estado")
+    progress = models.PositiveSmallIntegerField(default=0, verbose_name="Progreso (%)")
+    file_name = models.CharField(max_length=255, blank=True, verbose_name="Archivo")
+    error = models.TextField(blank=True, verbose_name="Error")
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                     verbose_name="Solicitado por")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.get_report_format_display()} {self.start_date} a {self.end_date} ({self.get_status_display()})"
+
+    class Meta:
+        verbose_name = "Reporte en Segundo Plano"
+        verbose_name_plural = "Reportes en Segundo Plano"
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='reportjob_status_created'),
+            models.Index(fields=['report_format', 'start_date', 'end_date'], name='reportjob_request'),
+        ]
+
+
+class ClientSearchToken(models.Model):
+    """
+    Índice de búsqueda de clientes: una fila por palabra normalizada (minúsculas,
+    sin tildes) de nombre, apellido, empresa e ID fiscal. Se busca por prefijo
+    (token LIKE 'abc%'), que sí usa el índice. Lo mantiene pos.search.
+    """
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='search_tokens')
+    token = models.CharField(max_length=50, verbose_name="Token")
+
+    def __str__(self):
+        return f"{self.token} → {self.client_id}"
+
+    class Meta:
+        verbose_name = "Token de Búsqueda de Cliente"
+        verbose_name_plural = "Tokens de Búsqueda de Clientes"
+        constraints = [
+            models.UniqueConstraint(fields=['token', 'client'], name='uniq_client_search_token'),
+        ]
+
+
+class ProductSearchToken(models.Model):
+    """
+    Índice de búsqueda del catálogo: una fila por palabra normalizada del nombre
+    y del SKU de cada producto, igual que ClientSearchToken. Lo mantiene pos.search.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='search_tokens')
+    token = models.CharField(max_length=50, verbose_name="Token")
+
+    def __str__(self):
+        return f"{self.token} → {self.product_id}"
+
+    class Meta:
+        verbose_name = "Token de Búsqueda de Producto"
+        verbose_name_plural = "Tokens de Búsqueda de Productos"
+        constraints = [
+            models.UniqueConstraint(fields=['token', 'product'], name='uniq_product_search_token'),
+        ]
+
+
+class Cart(models.Model):
+    """
+    Carrito en curso de una caja (uno por sesión de caja, creado al abrirla;
+    ver pos.cart). Los montos se guardan en centavos enteros en las líneas; el
+    total es su suma.
+    """
+    cash_drawer_session = models.OneToOneField(
+        CashDrawerSession, on_delete=models.CASCADE, primary_key=True, related_name='cart'
+    )
+
+    def __str__(self):
+        return f"Carrito de la sesión {self.cash_drawer_session_id}"
+
+    class Meta:
+        verbose_name = "Carrito"
+        verbose_name_plural = "Carritos"
+
+
+class CartLine(models.Model):
+    """Línea del carrito: un producto con el precio que tenía al escanearse por primera vez."""
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='lines')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    sku = models.CharField(max_length=100, verbose_name="SKU")
+    name = models.CharField(max_length=200, verbose_name="Nombre")
+    unit_price_cents = models.BigIntegerField(verbose_name="Precio Unitario (centavos)")
+    quantity = models.PositiveIntegerField(default=0, verbose_name="Cantidad")
+
+    @property
+    def subtotal_cents(self):
+        return self.unit_price_cents * self.quantity
+
+    # price/subtotal en Decimal para las plantillas (product_row.html).
+    @property
+    def price(self):
+        return Decimal(self.unit_price_cents).scaleb(-2)
+
+    @property
+    def subtotal(self):
+        return Decimal(self.subtotal_cents).scaleb(-2)
+
+    def __str__(self):
+        return f"{self.quantity} x {self.name}"
+
+    class Meta:
+        verbose_name = "Línea de Carrito"
+        verbose_name_plural = "Líneas de Carrito"
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'product'], name='uniq_cart_line_product'),
+        ]
+
+
+class StockMovement(models.Model):
+    """
+    Movimiento de stock firmado (venta -, devolución +, ajuste ±). Solo se
+    agregan filas: las cajas no reescriben Product.stock, y compact_stock_movements
+    suma periódicamente los pendientes a la foto y los marca como aplicados.
+    """
+    REASON_SALE = 'sale'
+    REASON_RETURN = 'return'
+    REASON_ADJUSTMENT = 'adjustment'
+    REASON_CHOICES = [
+        (REASON_SALE, 'Venta'),
+        (REASON_RETURN, 'Devolución'),
+        (REASON_ADJUSTMENT, 'Ajuste de Inventario'),
+    ]
+
+    # Sin índice propio: lo cubren stockmove_product_created y stockmove_pending.
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_movements',
+                                db_index=False)
+    quantity = models.IntegerField(verbose_name="Cantidad")
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES, verbose_name="Motivo")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Fecha")
+    applied = models.BooleanField(default=False, verbose_name="Aplicado a la Foto de Stock")
+
+    def __str__(self):
+        return f"{self.product_id}: {self.quantity:+d} ({self.get_reason_display()})"
+
+    class Meta:
+        verbose_name = "Movimiento de Stock"
+        verbose_name_plural = "Movimientos de Stock"
+        indexes = [
+            # Stock a una fecha: movimientos de un producto posteriores a X.
+            models.Index(fields=['product', 'created_at'], name='stockmove_product_created'),
+            # Disponible (pendientes de un producto) y compactación (productos con pendientes).
+            models.Index(fields=['applied', 'product'], name='stockmove_pending'),
+        ]
+
+
+class StockCounter(models.Model):
+    """
+    Disponible de un producto en modo 'ledger' (foto + movimientos pendientes),
+    en una fila aparte de Product. Las ventas lo descuentan con un UPDATE
+    condicional, así que validan el disponible sin bloquear la fila del
+    producto; la compactación no lo toca porque no cambia el disponible.
+    Se crea la primera vez que el libro mueve stock del producto (ver pos.stock).
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True,
+                                   related_name='stock_counter', verbose_name="Producto")
+    available = models.IntegerField(verbose_name="Stock Disponible")
+
+    def __str__(self):
+        return f"{self.product_id}: {self.available}"
+
+    class Meta:
+        verbose_name = "Contador de Stock"
+        verbose_name_plural = "Contadores de Stock"
+
+
+class LowStockChange(models.Model):
+    """
+    Entrada o salida de un producto del conjunto de stock bajo. Solo se agregan
+    filas y el id sirve de versión: low_stock_changes_view devuelve lo ocurrido
+    desde la versión N que ya tiene la página de alertas.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='low_stock_changes')
+    is_low_stock = models.BooleanField(verbose_name="Stock Bajo")
+    stock = models.IntegerField(verbose_name="Stock Disponible")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Fecha")
+
+    def __str__(self):
+        state = "stock bajo" if self.is_low_stock else "reabastecido"
+        return f"#{self.pk} {self.product_id}: {state} ({self.stock})"
+
+    class Meta:
+        verbose_name = "Cambio de Stock Bajo"
+        verbose_name_plural = "Cambios de Stock Bajo"
@@ -0,0 +1,187 @@
+# pos/pagination.py
+import base64
+import binascii
+import json
+
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+# Hasta aquí se cuenta exacto; más allá el admin muestra un estimado.
+EXACT_COUNT_LIMIT = 10000
+
+
+def estimated_row_count(queryset):
+    """
+    Estimado barato de filas de una tabla sin filtros: el rango de pks (dos
+    lecturas del extremo del índice primario). Sobrestima si hubo borrados, lo
+    que para ventas y sus líneas (solo se agregan) es despreciable.
+    """
+    pks = queryset.model._default_manager.values_list('pk', flat=True)
+    low = pks.order_by('pk').first()
+    if low is None:
+        return 0
+    return pks.order_by('-pk').first() - low + 1
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginador para tablas con millones de filas (Sale, SaleItem): nunca hace un
+    COUNT(*) completo. Sin filtros usa estimated_row_count(); con filtros cuenta
+    a lo sumo EXACT_COUNT_LIMIT + 1 filas y no ofrece páginas más allá (para eso
+    se afinan los filtros).
+    """
+    exact_count_limit = EXACT_COUNT_LIMIT
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.has_filters():
+            estimate = estimated_row_count(queryset)
+            if estimate > self.exact_count_limit:
+                return estimate
+        return queryset.order_by().values('pk')[:self.exact_count_limit + 1].count()
+
+
+# =================================================================
+# Paginación por keyset (seek)
+# =================================================================
+# En lugar de OFFSET N (que lee y descarta N filas) cada página pide las filas
+# posteriores a la última vista: WHERE (name, id) > ('Clavo', 812) ORDER BY
+# name, id LIMIT 51. Con un índice sobre las columnas del orden, la página
+# 800 cuesta lo mismo que la primera.
+
+
+def encode_cursor(values):
+    """Valores de orden de una fila → cursor opaco para la URL."""
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """Cursor de la URL → lista de valores, o None si está vacío o mal formado."""
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
+
+
+def _equal(field, value):
+    return Q(**{f'{field}__isnull': True}) if value is None else Q(**{field: value})
+
+
+def _beyond(field, value, descending, nullable):
+    """Filas estrictamente después (o antes, si descending) de `value` en `field`."""
+    if value is None:
+        return Q(pk__in=[]) if descending else Q(**{f'{field}__isnull': False})
+    condition = Q(**{f'{field}__{"lt" if descending else "gt"}': value})
+    if descending and nullable:
+        condition |= Q(**{f'{field}__isnull': True})
+    return condition
+
+
+def _seek(fields, values, descending, nullable=()):
+    """
+    (f1, f2, ...) > (v1, v2, ...) como OR de prefijos iguales. El f1 >= v1
+    redundante de adelante es el que deja a SQLite (y a MySQL) leer un rango del
+    índice en lugar de recorrerlo entero evaluando el OR. Las columnas de
+    `nullable` siguen el orden de MySQL y SQLite: NULL antes que cualquier valor.
+    Hacia atrás desde un f1 no nulo no se incluyen los f1 NULL (romperían el
+    rango); los agrega KeysetPaginator.page() con una segunda consulta.
+    """
+    condition = Q()
+    for i, field in enumerate(fields):
+        prefix = Q()
+        for previous, value in zip(fields[:i], values[:i]):
+            prefix &= _equal(previous, value)
+        condition |= prefix & _beyond(field, values[i], descending, field in nullable and i > 0)
+    if len(fields) > 1:
+        first, value = fields[0], values[0]
+        if value is not None:
+            condition &= Q(**{f'{first}__{"lte" if descending else "gte"}': value})
+        elif descending:
+            condition &= Q(**{f'{first}__isnull': True})
+    return condition
+
+
+class KeysetPage:
+    """Filas de la página y los cursores para pedir la siguiente y la anterior (None si no hay)."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class KeysetPaginator:
+    """
+    Paginador por keyset sobre `ordering` (campos ascendentes; el último debe
+    ser único, p. ej. 'pk'). page(after=...) avanza desde el cursor de la
+    última fila vista; page(before=...) retrocede desde la primera. No hay
+    total ni números de página: eso exigiría contar o recorrer el conjunto.
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        opts = queryset.model._meta
+        self.nullable = {field for field in self.ordering if field != 'pk' and opts.get_field(field).null}
+
+    def _cursor(self, obj):
+        return encode_cursor([getattr(obj, field) for field in self.ordering])
+
+    def page(self, after=None, before=None):
+        before_values = decode_cursor(before, len(self.ordering))
+        after_values = None if before_values else decode_cursor(after, len(self.ordering))
+
+        queryset = self.queryset
+        if before_values:
+            queryset = queryset.filter(_seek(self.ordering, before_values, True, self.nullable))
+            queryset = queryset.order_by(*(f'-{field}' for field in self.ordering))
+        else:
+            if after_values:
+                queryset = queryset.filter(_seek(self.ordering, after_values, False, self.nullable))
+            queryset = queryset.order_by(*self.ordering)
+
+        rows = list(queryset[:self.per_page + 1])
+        first = self.ordering[0]
+        if (before_values and before_values[0] is not None and first in self.nullable
+                and len(rows) <= self.per_page):
+            # Se acabaron los f1 no nulos: siguen (hacia atrás) los f1 NULL.
+            nulls = self.queryset.filter(**{f'{first}__isnull': True})
+            rows += list(nulls.order_by(*(f'-{field}' for field in self.ordering))[:self.per_page + 1 - len(rows)])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if before_values:
+            rows.reverse()
+
+        if not rows:
+            return KeysetPage(rows)
+        # Hacia atrás siempre hay una página siguiente (la que se dejó); hacia
+        # adelante hay anterior si se llegó con un cursor.
+        has_next = more if not before_values else True
+        has_previous = more if before_values else after_values is not None
+        return KeysetPage(
+            rows,
+            next_cursor=self._cursor(rows[-1]) if has_next else None,
+            previous_cursor=self._cursor(rows[0]) if has_previous else None,
+        )
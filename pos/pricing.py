@@ -0,0 +1,110 @@
+# pos/pricing.py
+"""
+Reprecio masivo por categoría y/o proveedor.
+
+El precio nuevo es una expresión SQL (regla + redondeo) que se usa igual para
+la vista previa (annotate) y para aplicar (un solo UPDATE): lo que se ve en la
+vista previa es exactamente lo que se escribe. Solo se tocan las filas cuyo
+precio cambia; nunca se escribe un precio negativo.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Q, Value
+from django.db.models.functions import Floor, Round
+
+from .cache import invalidate_all_product_skus
+from .inventory import invalidate_inventory_valuation
+from .models import Product
+
+PREVIEW_ROWS = 50
+CENT = Decimal('0.01')
+
+_PRICE = DecimalField(max_digits=10, decimal_places=2)
+_FACTOR = DecimalField(max_digits=12, decimal_places=6)
+
+RULES = [
+    ('percent', "Porcentaje sobre el precio actual"),
+    ('delta', "Monto fijo sobre el precio actual"),
+    ('margin', "Costo + margen (%)"),
+]
+ROUNDINGS = [
+    ('cent', "Al centavo"),
+    ('ten_cents', "A los 10 centavos"),
+    ('unit', "A la unidad"),
+    ('ending_99', "Terminado en ,99"),
+]
+
+
+def _decimal(value, output_field=_PRICE):
+    return Value(Decimal(value), output_field=output_field)
+
+
+def _rule_expression(rule, value):
+    if rule == 'percent':
+        return F('price') * _decimal(1 + Decimal(value) / 100, _FACTOR)
+    if rule == 'delta':
+        return F('price') + _decimal(value)
+    if rule == 'margin':
+        return F('cost') * _decimal(1 + Decimal(value) / 100, _FACTOR)
+    raise ValueError(f"Regla desconocida: {rule}")
+
+
+def _round(expression, rounding):
+    # ROUND de MySQL y de SQLite redondea las mitades alejándose de cero.
+    if rounding == 'cent':
+        return Round(expression, 2)
+    if rounding == 'ten_cents':
+        return Round(expression, 1)
+    if rounding == 'unit':
+        return Round(expression, 0)
+    if rounding == 'ending_99':
+        return Floor(expression) + _decimal('0.99')
+    raise ValueError(f"Redondeo desconocido: {rounding}")
+
+
+def new_price_expression(rule, value, rounding):
+    """Precio nuevo en SQL para cada fila, según la regla y el redondeo."""
+    return ExpressionWrapper(_round(_rule_expression(rule, value), rounding), output_field=_PRICE)
+
+
+def repricing_queryset(rule, value, rounding, category_id=None, supplier_id=None):
+    """
+    Productos de la selección cuyo precio cambia, con `new_price` anotado.
+    Costo + margen deja fuera a los productos sin costo cargado.
+    """
+    products = Product.objects.all()
+    if category_id:
+        products = products.filter(category_id=category_id)
+    if supplier_id:
+        products = products.filter(supplier_id=supplier_id)
+    if rule == 'margin':
+        products = products.filter(cost__isnull=False)
+    return products.annotate(new_price=new_price_expression(rule, value, rounding)).filter(
+        ~Q(new_price=F('price')), new_price__gte=0,
+    )
+
+
+def repricing_preview(rule, value, rounding, category_id=None, supplier_id=None, limit=PREVIEW_ROWS):
+    """(total de filas que cambian, las primeras `limit` por nombre con precio actual y nuevo)."""
+    products = repricing_queryset(rule, value, rounding, category_id, supplier_id)
+    rows = list(products.order_by('name', 'pk').values('pk', 'sku', 'name', 'cost', 'price', 'new_price')[:limit])
+    for row in rows:
+        # SQLite devuelve el resultado de ROUND sin escala fija.
+        row['new_price'] = Decimal(row['new_price']).quantize(CENT)
+    return products.count(), rows
+
+
+@transaction.atomic
+def apply_repricing(rule, value, rounding, category_id=None, supplier_id=None):
+    """
+    Aplica el reprecio con un único UPDATE y, al confirmar, deja viejos los
+    snapshots de SKU de todas las cajas (una versión nueva del catálogo en la
+    caché compartida) y la valorización. Devuelve las filas cambiadas.
+    """
+    products = repricing_queryset(rule, value, rounding, category_id, supplier_id)
+    updated = products.update(price=new_price_expression(rule, value, rounding))
+    if updated:
+        invalidate_all_product_skus()
+        invalidate_inventory_valuation()
+    return updated
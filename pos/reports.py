@@ -0,0 +1,245 @@
+# pos/reports.py
+import itertools
+
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from .dates import date_range_q
+from .models import Sale
+
+# Solo las columnas que usan los reportes (sin instanciar Sale/Client/User).
+SALE_EXPORT_FIELDS = (
+    'id',
+    'sale_date',
+    'total_amount',
+    'payment_method',
+    'cash_drawer_session__user__username',
+    'client_id',
+    'client__company_name',
+    'client__tax_id',
+    'client__first_name',
+    'client__last_name',
+)
+EXPORT_CHUNK_SIZE = 2000
+WIDTH_SAMPLE_SIZE = 500
+PDF_ROWS_PER_TABLE = 40  # ~una página carta por tabla
+PAYMENT_METHOD_LABELS = dict(Sale.PAYMENT_METHOD_CHOICES)
+
+
+def client_display(row):
+    """Equivalente a str(Client) a partir de una fila de values()."""
+    if row['client_id'] is None:
+        return "Consumidor Final"
+    if row['client__company_name']:
+        return f"{row['client__company_name']} ({row['client__tax_id']})"
+    return f"{row['client__first_name']} {row['client__last_name'] or ''}"
+
+
+def sales_in_range(start_date, end_date):
+    """Ventas entre dos fechas locales (ambas incluidas), como en sales_report_view."""
+    return Sale.objects.filter(
+        date_range_q('sale_date', start_date, end_date)
+    ).select_related('cash_drawer_session__user', 'client').order_by('-sale_date')
+
+
+def iter_sale_rows(sales_queryset, chunk_size=EXPORT_CHUNK_SIZE, progress=None):
+    """
+    Recorre las ventas (más recientes primero) como dicts, en lotes por keyset
+    sobre (sale_date, id). A diferencia de .iterator(), con MySQL esto no carga
+    todo el resultado en el driver: cada lote es un LIMIT independiente.
+    progress(filas_leídas) se llama después de cada lote.
+    """
+    queryset = sales_queryset.order_by('-sale_date', '-id').values(*SALE_EXPORT_FIELDS)
+    last = None
+    done = 0
+    while True:
+        chunk = queryset
+        if last is not None:
+            chunk = chunk.filter(
+                Q(sale_date__lt=last['sale_date']) | Q(sale_date=last['sale_date'], id__lt=last['id'])
+            )
+        rows = list(chunk[:chunk_size])
+        yield from rows
+        done += len(rows)
+        if progress:
+            progress(done)
+        if len(rows) < chunk_size:
+            return
+        last = rows[-1]
+
+
+def sale_export_row(row):
+    return [
+        row['id'],
+        row['sale_date'].strftime("%Y-%m-%d %H:%M"),
+        row['total_amount'],
+        PAYMENT_METHOD_LABELS.get(row['payment_method'], row['payment_method']),
+        row['cash_drawer_session__user__username'] or 'N/A',
+        client_display(row),
+    ]
+
+
+def write_sales_excel(sales_queryset, fileobj, chunk_size=EXPORT_CHUNK_SIZE, progress=None):
+    """
+    Escribe el reporte de ventas en modo write-only de openpyxl: las filas van a
+    disco a medida que se agregan, así que la memoria no crece con el rango.
+    El ancho de columnas se estima con una muestra de las primeras filas.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Reporte de Ventas")
+
+    headers = ['ID Venta', 'Fecha y Hora', 'Total ($)', 'Método de Pago', 'Vendedor', 'Comprador']
+    rows = (sale_export_row(row) for row in iter_sale_rows(sales_queryset, chunk_size, progress))
+    sample = list(itertools.islice(rows, WIDTH_SAMPLE_SIZE))
+
+    # En write-only los anchos deben fijarse antes de la primera fila.
+    for index, header in enumerate(headers):
+        max_length = max([len(header)] + [len(str(row[index])) for row in sample])
+        ws.column_dimensions[get_column_letter(index + 1)].width = max_length + 2
+
+    font = Font(bold=True, color="FFFFFF")
+    fill = PatternFill("solid", fgColor="4361ee")
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = font
+        cell.fill = fill
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    for row in itertools.chain(sample, rows):
+        ws.append(row)
+
+    wb.save(fileobj)
+
+
+# =================================================================
+# PDF
+# =================================================================
+
+class LazyFlowables(list):
+    """
+    Lista de flowables que se rellena bajo demanda desde un generador.
+    doc.build() consume la lista desde el frente (flowables[0] / del flowables[0]),
+    así que solo hay unas pocas tablas en memoria a la vez.
+    """
+
+    def __init__(self, source, lookahead=2):
+        super().__init__()
+        self._source = iter(source)
+        self._lookahead = lookahead
+
+    def _fill(self):
+        while self._source is not None and list.__len__(self) < self._lookahead:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._source = None
+
+    def __len__(self):
+        self._fill()
+        return list.__len__(self)
+
+    def __getitem__(self, index):
+        self._fill()
+        return list.__getitem__(self, index)
+
+
+# Un único estilo para todas las tablas: el rayado usa ROWBACKGROUNDS en lugar
+# de un comando BACKGROUND por fila.
+PDF_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4361ee')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.HexColor('#f0f0f0'), colors.white]),
+
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('ALIGN', (2, 1), (2, -1), 'RIGHT'),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+])
+
+
+def _chunked_tables(header, rows, col_widths, chunk_size):
+    """Una tabla (con su encabezado) por cada chunk_size filas."""
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return
+        table = Table([header] + chunk, colWidths=col_widths, repeatRows=1)
+        table.setStyle(PDF_TABLE_STYLE)
+        yield table
+
+
+def _detail_pdf_rows(sales_queryset, progress=None):
+    for row in iter_sale_rows(sales_queryset, progress=progress):
+        yield [
+            row['id'],
+            row['sale_date'].strftime("%Y-%m-%d %H:%M"),
+            f"{row['total_amount']:.2f}",
+            row['cash_drawer_session__user__username'] or 'N/A',
+            client_display(row),
+        ]
+
+
+def sales_summary_rows(sales_queryset):
+    """Totales por día y cajero, calculados en la base de datos."""
+    return (
+        sales_queryset
+        .annotate(day=TruncDate('sale_date'))
+        .values('day', 'cash_drawer_session__user__username')
+        .annotate(total=Sum('total_amount'), transactions=Count('id'))
+        .order_by('-day', 'cash_drawer_session__user__username')
+    )
+
+
+def _summary_pdf_rows(sales_queryset):
+    grand_total, grand_count = 0, 0
+    for row in sales_summary_rows(sales_queryset).iterator():
+        grand_total += row['total'] or 0
+        grand_count += row['transactions']
+        yield [
+            row['day'].strftime("%Y-%m-%d"),
+            row['cash_drawer_session__user__username'] or 'N/A',
+            row['transactions'],
+            f"{row['total'] or 0:.2f}",
+        ]
+    yield ['TOTAL', '', grand_count, f"{grand_total:.2f}"]
+
+
+def write_sales_pdf(sales_queryset, fileobj, date_range='', summary=False, chunk_size=PDF_ROWS_PER_TABLE,
+                    progress=None):
+    """
+    Escribe el reporte de ventas en PDF como una serie de tablas de tamaño fijo
+    (encabezado repetido en cada una). Con summary=True se imprimen solo los
+    totales por día y cajero en lugar de cada ticket.
+    """
+    # reportlab guarda cada página terminada hasta el save(); comprimirlas reduce
+    # esa parte (lo único que sigue creciendo con el rango) a la mitad.
+    doc = SimpleDocTemplate(fileobj, pagesize=letter, pageCompression=1)
+    styles = getSampleStyleSheet()
+
+    title = "Resumen de Ventas" if summary else "Reporte de Ventas"
+    head = [Paragraph(f"{title}: {date_range}", styles['Heading1']), Spacer(1, 18)]
+
+    if summary:
+        tables = _chunked_tables(
+            ['Fecha', 'Vendedor', 'Transacciones', 'Total ($)'],
+            _summary_pdf_rows(sales_queryset), [100, 160, 100, 100], chunk_size,
+        )
+    else:
+        tables = _chunked_tables(
+            ['ID Venta', 'Fecha', 'Total ($)', 'Vendedor', 'Comprador'],
+            _detail_pdf_rows(sales_queryset, progress), [60, 140, 80, 100, 120], chunk_size,
+        )
+
+    doc.build(LazyFlowables(itertools.chain(head, tables)))
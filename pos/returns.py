@@ -0,0 +1,29 @@
+# pos/returns.py
+from django.db.models import Sum
+
+from .models import SaleReturnItem
+
+
+def returned_quantities(sale):
+    """{product_id: unidades ya devueltas} de todas las devoluciones de la venta, en una consulta."""
+    return dict(
+        SaleReturnItem.objects.filter(return_request__original_sale=sale)
+        .values('product_id').annotate(units=Sum('quantity'))
+        .order_by().values_list('product_id', 'units')
+    )
+
+
+def returnable_quantities(sale, items):
+    """
+    {sale_item_id: unidades que todavía se pueden devolver}. SaleReturnItem
+    guarda el producto, no la línea: si una venta vieja tiene el mismo producto
+    en varias líneas, lo ya devuelto se descuenta de ellas en orden.
+    """
+    returned = returned_quantities(sale)
+    returnable = {}
+    for item in items:
+        used = min(item.quantity, returned.get(item.product_id, 0))
+        if used:
+            returned[item.product_id] -= used
+        returnable[item.id] = item.quantity - used
+    return returnable
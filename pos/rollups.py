@@ -0,0 +1,307 @@
+# pos/rollups.py
+import datetime
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, IntegerField, Min, Q, Sum, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .dashboard import bump_dashboard
+from .dates import date_range_q, local_date_range
+from .models import (
+    CashDrawerSession, Client, DailyProductSales, DailySalesSummary, MonthlySalesSnapshot, Sale, SaleItem,
+    SaleReturnItem,
+)
+
+
+# =================================================================
+# Mantenimiento incremental (dentro de la transacción de la venta)
+# =================================================================
+# Patrón: INSERT ... IGNORE de filas en cero + un único UPDATE con CASE que
+# suma los deltas. Dos cajas que crean la misma fila a la vez no chocan.
+
+def _add_to_product_rollup(date, deltas):
+    """deltas: {product_id: (unidades, ingresos)}; los valores pueden ser negativos."""
+    if not deltas:
+        return
+    DailyProductSales.objects.bulk_create(
+        [DailyProductSales(date=date, product_id=product_id) for product_id in deltas],
+        ignore_conflicts=True,
+    )
+    DailyProductSales.objects.filter(date=date, product_id__in=list(deltas)).update(
+        units=Case(
+            *[When(product_id=pid, then=F('units') + units) for pid, (units, _) in deltas.items()],
+            default=F('units'), output_field=IntegerField(),
+        ),
+        revenue=Case(
+            *[When(product_id=pid, then=F('revenue') + revenue) for pid, (_, revenue) in deltas.items()],
+            default=F('revenue'), output_field=DecimalField(max_digits=14, decimal_places=2),
+        ),
+    )
+
+
+def _add_to_sales_rollup(date, payment_method, amount):
+    DailySalesSummary.objects.bulk_create(
+        [DailySalesSummary(date=date, payment_method=payment_method)],
+        ignore_conflicts=True,
+    )
+    DailySalesSummary.objects.filter(date=date, payment_method=payment_method).update(
+        total_amount=F('total_amount') + amount,
+        num_transactions=F('num_transactions') + 1,
+    )
+
+
+# Campo de CashDrawerSession que acumula cada método de pago. Las devoluciones
+# son ventas negativas: returns_total guarda el monto devuelto en positivo.
+SESSION_TOTAL_FIELDS = {
+    'cash': 'cash_sales_total',
+    'card': 'card_sales_total',
+    'return': 'returns_total',
+}
+
+
+def _add_to_session_totals(sale):
+    if sale.payment_method == 'return':
+        updates = {'returns_total': F('returns_total') - sale.total_amount}
+    else:
+        field = SESSION_TOTAL_FIELDS.get(sale.payment_method)
+        if field is None:
+            # Sin total propio en el turno; session_totals_from_sales tampoco lo cuenta.
+            return
+        updates = {field: F(field) + sale.total_amount, 'num_transactions': F('num_transactions') + 1}
+    CashDrawerSession.objects.filter(pk=sale.cash_drawer_session_id).update(**updates)
+
+
+def record_sale(sale, items):
+    """
+    Suma una venta (y sus SaleItem) a los rollups del día y a los totales del
+    turno, y anota la fecha como última compra del cliente.
+    """
+    date = timezone.localdate(sale.sale_date)
+    _add_to_sales_rollup(date, sale.payment_method, sale.total_amount)
+    _add_to_session_totals(sale)
+    if sale.client_id and sale.payment_method != 'return':
+        # Un UPDATE por la PK; el directorio filtra por actividad reciente con esta columna.
+        Client.objects.filter(pk=sale.client_id).update(last_purchase_at=sale.sale_date)
+
+    deltas = {}
+    for item in items:
+        units, revenue = deltas.get(item.product_id, (0, 0))
+        deltas[item.product_id] = (units + item.quantity, revenue + item.subtotal)
+    _add_to_product_rollup(date, deltas)
+    bump_dashboard('sales')
+
+
+def record_return(refund_sale, return_items):
+    """
+    Registra una devolución: la venta negativa (payment_method='return') y la
+    resta de unidades/ingresos por producto, ambas en la fecha de la devolución.
+    La venta negativa suma a returns_total del turno de la venta original.
+    """
+    record_sale(refund_sale, [])
+
+    deltas = {}
+    for item in return_items:
+        units, revenue = deltas.get(item.product_id, (0, 0))
+        deltas[item.product_id] = (units - item.quantity, revenue - item.refund_amount)
+    _add_to_product_rollup(timezone.localdate(refund_sale.sale_date), deltas)
+
+
+# =================================================================
+# Reconstrucción por lotes (manage.py rebuild_sales_rollups)
+# =================================================================
+
+@transaction.atomic
+def rebuild_range(start, end):
+    """
+    Recalcula desde Sale/SaleItem/SaleReturnItem los rollups de los días
+    [start, end] (ambos incluidos) en una sola transacción.
+    Devuelve (filas de resumen, filas por producto) escritas.
+    """
+    range_start, range_end = local_date_range(start, end)
+
+    # Bloquea las filas del rango antes de leer las ventas. Un record_sale /
+    # record_return en curso sobre esos días termina antes (y entra en la
+    # lectura) o espera al COMMIT; si no, su delta se borraría con la fila.
+    # En InnoDB el bloqueo cubre también los huecos del índice (date, ...), así
+    # que tampoco se cuelan filas nuevas. Aun así, el comando no toca el día en
+    # curso sin --include-today.
+    len(DailySalesSummary.objects.select_for_update().filter(date__gte=start, date__lte=end).values_list('pk'))
+    len(DailyProductSales.objects.select_for_update().filter(date__gte=start, date__lte=end).values_list('pk'))
+
+    sales = (
+        Sale.objects.filter(sale_date__gte=range_start, sale_date__lt=range_end)
+        .annotate(day=TruncDate('sale_date'))
+        .values('day', 'payment_method')
+        .annotate(total=Sum('total_amount'), count=Count('id'))
+        .order_by()
+    )
+    summaries = [
+        DailySalesSummary(date=row['day'], payment_method=row['payment_method'],
+                          total_amount=row['total'], num_transactions=row['count'])
+        for row in sales
+    ]
+
+    products = {}
+    sold = (
+        SaleItem.objects.filter(sale__sale_date__gte=range_start, sale__sale_date__lt=range_end)
+        .annotate(day=TruncDate('sale__sale_date'))
+        .values('day', 'product_id')
+        .annotate(units=Sum('quantity'), revenue=Sum('subtotal'))
+        .order_by()
+    )
+    for row in sold:
+        products[row['day'], row['product_id']] = [row['units'], row['revenue']]
+
+    returned = (
+        SaleReturnItem.objects.filter(return_request__returned_at__gte=range_start,
+                                      return_request__returned_at__lt=range_end)
+        .annotate(day=TruncDate('return_request__returned_at'))
+        .values('day', 'product_id')
+        .annotate(units=Sum('quantity'), revenue=Sum('refund_amount'))
+        .order_by()
+    )
+    for row in returned:
+        totals = products.setdefault((row['day'], row['product_id']), [0, 0])
+        totals[0] -= row['units']
+        totals[1] -= row['revenue']
+
+    DailySalesSummary.objects.filter(date__gte=start, date__lte=end).delete()
+    DailyProductSales.objects.filter(date__gte=start, date__lte=end).delete()
+    DailySalesSummary.objects.bulk_create(summaries, batch_size=1000)
+    DailyProductSales.objects.bulk_create(
+        [DailyProductSales(date=day, product_id=product_id, units=units, revenue=revenue)
+         for (day, product_id), (units, revenue) in products.items()],
+        batch_size=1000,
+    )
+    bump_dashboard('sales')
+    return len(summaries), len(products)
+
+
+# =================================================================
+# Snapshots mensuales (monthly_summary_view)
+# =================================================================
+# Los meses cerrados se leen de MonthlySalesSnapshot; solo el mes en curso
+# se agrega en vivo (un rango de sale_date, ver pos.dates).
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(first_day):
+    return (first_day.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+
+
+def month_totals(first_day):
+    """(total, transacciones) de Sale para el mes que empieza en first_day."""
+    totals = Sale.objects.filter(
+        date_range_q('sale_date', first_day, next_month(first_day) - datetime.timedelta(days=1))
+    ).aggregate(total=Sum('total_amount'), count=Count('id'))
+    return totals['total'] or Decimal('0.00'), totals['count']
+
+
+def refresh_monthly_snapshots():
+    """
+    Calcula los meses cerrados que aún no tienen snapshot o están marcados como
+    desactualizados. En régimen normal no hay ninguno (o solo el mes recién
+    cerrado), así que cuesta una consulta. Devuelve los meses recalculados.
+    """
+    current = month_start(timezone.localdate())
+    first_sale = Sale.objects.aggregate(first=Min('sale_date'))['first']
+    if first_sale is None:
+        return 0
+
+    fresh = set(MonthlySalesSnapshot.objects.filter(is_stale=False).values_list('month', flat=True))
+    refreshed = 0
+    month = month_start(timezone.localdate(first_sale))
+    while month < current:
+        if month not in fresh:
+            total, count = month_totals(month)
+            MonthlySalesSnapshot.objects.update_or_create(
+                month=month,
+                defaults={'total_amount': total, 'num_transactions': count, 'is_stale': False},
+            )
+            refreshed += 1
+        month = next_month(month)
+    return refreshed
+
+
+def mark_months_stale(dates):
+    """Marca para recálculo los snapshots de los meses cerrados que contienen esas fechas."""
+    current = month_start(timezone.localdate())
+    months = {month_start(day) for day in dates if day is not None}
+    months = [month for month in months if month < current]
+    if months:
+        MonthlySalesSnapshot.objects.filter(month__in=months).update(is_stale=True)
+
+
+def monthly_summary(year=None):
+    """
+    Filas del resumen mensual (más reciente primero), con el mismo mes del año
+    anterior para comparar. Todo sale de los snapshots salvo el mes en curso.
+    """
+    refresh_monthly_snapshots()
+    current = month_start(timezone.localdate())
+
+    snapshots = MonthlySalesSnapshot.objects.all()
+    if year:
+        snapshots = snapshots.filter(month__year__in=[year, year - 1])
+    totals = {s.month: (s.total_amount, s.num_transactions) for s in snapshots}
+    if not year or year == current.year:
+        totals[current] = month_totals(current)
+
+    rows = []
+    for month in sorted(totals, reverse=True):
+        total, count = totals[month]
+        if (year and month.year != year) or not count:
+            continue
+        previous_total, previous_count = totals.get(month.replace(year=month.year - 1), (None, 0))
+        if not previous_count:
+            previous_total = None
+        rows.append({
+            'year': month.year,
+            'month': month.month,
+            'total_amount': total,
+            'total_transactions': count,
+            'ticket_promedio': total / Decimal(count) if total else Decimal('0.00'),
+            'previous_total': previous_total,
+            'change_pct': (total - previous_total) * 100 / abs(previous_total) if previous_total else None,
+        })
+    return rows
+
+
+def summary_years():
+    """Años con ventas, para el filtro del resumen mensual (sin recorrer Sale)."""
+    years = {day.year for day in MonthlySalesSnapshot.objects.filter(num_transactions__gt=0).dates('month', 'year')}
+    years.add(timezone.localdate().year)
+    return sorted(years, reverse=True)
+
+
+# =================================================================
+# Totales por turno (CashDrawerSession.*_total)
+# =================================================================
+
+def session_totals_from_sales(session_ids=None):
+    """
+    Recalcula desde Sale los totales de los turnos (todos, o los de session_ids)
+    en una sola consulta agrupada: {session_id: {campo: valor}}.
+    """
+    sales = Sale.objects.all()
+    if session_ids is not None:
+        sales = sales.filter(cash_drawer_session_id__in=session_ids)
+    rows = sales.values('cash_drawer_session_id').annotate(
+        cash_sales_total=Sum('total_amount', filter=Q(payment_method='cash')),
+        card_sales_total=Sum('total_amount', filter=Q(payment_method='card')),
+        returns=Sum('total_amount', filter=Q(payment_method='return')),
+        num_transactions=Count('id', filter=Q(payment_method__in=['cash', 'card'])),
+    ).order_by()
+    return {
+        row['cash_drawer_session_id']: {
+            'cash_sales_total': row['cash_sales_total'] or Decimal('0.00'),
+            'card_sales_total': row['card_sales_total'] or Decimal('0.00'),
+            'returns_total': -(row['returns'] or Decimal('0.00')),
+            'num_transactions': row['num_transactions'],
+        }
+        for row in rows
+    }
@@ -0,0 +1,268 @@
+# pos/search.py
+import re
+import unicodedata
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+
+from .models import Client, ClientSearchToken, Product, ProductSearchToken
+
+SEARCH_RESULTS = 10
+# Filas del índice que se leen por palabra buscada. Acota el costo de
+# prefijos muy comunes ("a", "jose") a una lectura de rango fija.
+SEARCH_CANDIDATES = 200
+SEARCH_MAX_WORDS = 4
+# Lo que usan str(Client) y la respuesta JSON del selector.
+RESULT_FIELDS = ('first_name', 'last_name', 'company_name', 'tax_id', 'is_professional')
+TOKEN_MAX_LENGTH = ClientSearchToken._meta.get_field('token').max_length
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+# Un ID fiscal: sin espacios, con al menos un dígito y solo dígitos/letras/guiones/puntos.
+_TAX_ID_RE = re.compile(r'^(?=.*\d)[\w.\-/]+$')
+
+EXACT, PREFIX = 2, 1
+
+
+def normalize_words(text):
+    """'José  Pérez-Núñez' → ['jose', 'perez', 'nunez'] (minúsculas y sin tildes)."""
+    if not text:
+        return []
+    folded = unicodedata.normalize('NFKD', str(text))
+    folded = ''.join(ch for ch in folded if not unicodedata.combining(ch)).lower()
+    return [word[:TOKEN_MAX_LENGTH] for word in _WORD_RE.findall(folded)]
+
+
+def client_tokens(client):
+    """Tokens únicos con los que se encuentra a un cliente."""
+    tokens = set()
+    for value in (client.first_name, client.last_name, client.company_name, client.tax_id):
+        tokens.update(normalize_words(value))
+    return tokens
+
+
+def index_client(client):
+    """Reemplaza los tokens de un cliente (ClientForm, admin; ver pos.signals)."""
+    tokens = client_tokens(client)
+    with transaction.atomic():
+        ClientSearchToken.objects.filter(client=client).exclude(token__in=tokens).delete()
+        ClientSearchToken.objects.bulk_create(
+            [ClientSearchToken(client_id=client.pk, token=token) for token in tokens],
+            ignore_conflicts=True,
+        )
+
+
+def rebuild_client_index(batch_size=2000):
+    """Reconstruye todo el índice (después de cargas masivas que no disparan señales)."""
+    ClientSearchToken.objects.all().delete()
+    total = 0
+    last_id = 0
+    fields = ('pk', 'first_name', 'last_name', 'company_name', 'tax_id')
+    while True:
+        batch = list(Client.objects.filter(pk__gt=last_id).order_by('pk').only(*fields)[:batch_size])
+        if not batch:
+            return total
+        tokens = [
+            ClientSearchToken(client_id=client.pk, token=token)
+            for client in batch for token in client_tokens(client)
+        ]
+        ClientSearchToken.objects.bulk_create(tokens, batch_size=batch_size)
+        total += len(batch)
+        last_id = batch[-1].pk
+
+
+def _search_tax_id(query, limit):
+    """
+    Coincidencia exacta y por prefijo sobre el índice único de tax_id: se lee el
+    rango tax_id >= query en orden (la exacta queda primera) y se corta en la
+    primera fila que ya no empieza con query. A diferencia de LIKE 'abc%', esto
+    usa el índice con cualquier collation/motor.
+    """
+    results = []
+    for client in Client.objects.only(*RESULT_FIELDS).filter(tax_id__gte=query).order_by('tax_id')[:limit]:
+        if not client.tax_id.lower().startswith(query.lower()):
+            break
+        results.append(client)
+    return results
+
+
+def _next_prefix(prefix):
+    """
+    Menor cadena mayor que todas las que empiezan con prefix, para leer el
+    prefijo como rango [prefix, siguiente). Los tokens solo tienen [a-z0-9],
+    que ordenan igual (dígitos < letras) en cualquier collation.
+    """
+    stripped = prefix.rstrip('z')
+    if not stripped:
+        return None
+    last = stripped[-1]
+    return stripped[:-1] + ('a' if last == '9' else chr(ord(last) + 1))
+
+
+def _token_matches(word):
+    """
+    ({client_id: puntaje}, completo) para los tokens que empiezan con word, en
+    orden alfabético del token. Se leen a lo sumo SEARCH_CANDIDATES filas;
+    completo=False si el prefijo tenía más.
+    """
+    upper = _next_prefix(word)
+    rows = ClientSearchToken.objects.filter(token__gte=word)
+    if upper:
+        rows = rows.filter(token__lt=upper)
+    rows = list(rows.order_by('token', 'client_id').values_list('client_id', 'token')[:SEARCH_CANDIDATES + 1])
+    complete = len(rows) <= SEARCH_CANDIDATES
+
+    scores = {}
+    for client_id, token in rows[:SEARCH_CANDIDATES]:
+        scores[client_id] = max(scores.get(client_id, 0), EXACT if token == word else PREFIX)
+    return scores, complete
+
+
+def _search_tokens(words, limit):
+    """
+    Cada palabra de la búsqueda debe coincidir (exacta o por prefijo) con algún
+    token del cliente. Se lee el rango de cada palabra y se parte del más chico
+    que esté completo; las palabras con rango truncado (prefijos muy comunes)
+    se verifican con una consulta sobre esos candidatos. Ranking: coincidencias
+    exactas antes que prefijos; a igual puntaje, en orden alfabético del token.
+    """
+    words = sorted(set(words), key=len, reverse=True)[:SEARCH_MAX_WORDS]
+    found = [(word, *_token_matches(word)) for word in words]
+    found.sort(key=lambda match: (not match[2], len(match[1])))
+    _, scores, _ = found[0]
+
+    pending = []
+    for word, matches, complete in found[1:]:
+        if not complete:
+            pending.append(word)
+            continue
+        for client_id in list(scores):
+            if client_id in matches:
+                scores[client_id] += matches[client_id]
+            else:
+                del scores[client_id]
+
+    if pending and scores:
+        matched = {word: {} for word in pending}
+        for client_id, token in (ClientSearchToken.objects.filter(client_id__in=list(scores))
+                                 .values_list('client_id', 'token')):
+            for word in pending:
+                if token.startswith(word):
+                    best = matched[word]
+                    best[client_id] = max(best.get(client_id, 0), EXACT if token == word else PREFIX)
+        for client_id in list(scores):
+            if all(client_id in matched[word] for word in pending):
+                scores[client_id] += sum(matched[word][client_id] for word in pending)
+            else:
+                del scores[client_id]
+
+    # sorted() es estable: a igual puntaje queda el orden del índice (token, pk).
+    top = sorted(scores, key=lambda client_id: -scores[client_id])[:limit]
+    clients = Client.objects.only(*RESULT_FIELDS).in_bulk(top)
+    return [clients[client_id] for client_id in top if client_id in clients]
+
+
+def search_clients(query, limit=SEARCH_RESULTS):
+    """Búsqueda del selector de clientes del checkout (client_search_ajax)."""
+    query = (query or '').strip()
+    if not query:
+        return []
+
+    if _TAX_ID_RE.match(query):
+        results = _search_tax_id(query, limit)
+        if results:
+            return results
+
+    words = normalize_words(query)
+    if not words:
+        return []
+    return _search_tokens(words, limit)
+
+
+async def asearch_clients(query, limit=SEARCH_RESULTS):
+    """
+    search_clients() para client_search_ajax (async). Cada consulta depende de
+    la anterior (atajo por ID fiscal, rangos de tokens, verificación), así que
+    se ejecutan todas en un solo salto al hilo de la base de datos.
+    """
+    return await sync_to_async(search_clients)(query, limit)
+
+
+# =================================================================
+# Catálogo de productos (product_list_view)
+# =================================================================
+
+def product_tokens(product):
+    """Tokens únicos con los que se encuentra a un producto: palabras del nombre y del SKU."""
+    return set(normalize_words(product.name)) | set(normalize_words(product.sku))
+
+
+def index_product(product):
+    """Reemplaza los tokens de un producto (ProductForm, admin; ver pos.signals)."""
+    tokens = product_tokens(product)
+    with transaction.atomic():
+        ProductSearchToken.objects.filter(product=product).exclude(token__in=tokens).delete()
+        ProductSearchToken.objects.bulk_create(
+            [ProductSearchToken(product_id=product.pk, token=token) for token in tokens],
+            ignore_conflicts=True,
+        )
+
+
+def index_products(products):
+    """index_product() para un lote (importación masiva): un DELETE y un INSERT para todos."""
+    ids = [product.pk for product in products]
+    ProductSearchToken.objects.filter(product_id__in=ids).delete()
+    ProductSearchToken.objects.bulk_create(
+        [ProductSearchToken(product_id=product.pk, token=token)
+         for product in products for token in product_tokens(product)],
+        batch_size=2000,
+    )
+
+
+def rebuild_product_index(batch_size=2000):
+    """Reconstruye el índice del catálogo (después de cargas masivas que no disparan señales)."""
+    ProductSearchToken.objects.all().delete()
+    total = 0
+    last_id = 0
+    while True:
+        batch = list(Product.objects.filter(pk__gt=last_id).order_by('pk').only('pk', 'name', 'sku')[:batch_size])
+        if not batch:
+            return total
+        ProductSearchToken.objects.bulk_create(
+            [ProductSearchToken(product_id=product.pk, token=token)
+             for product in batch for token in product_tokens(product)],
+            batch_size=batch_size,
+        )
+        total += len(batch)
+        last_id = batch[-1].pk
+
+
+# =================================================================
+# Filtro de búsqueda para listados paginados (catálogo, directorio de clientes)
+# =================================================================
+
+def _filter_by_tokens(queryset, query, token_model, owner_field):
+    """
+    Restringe el queryset a las filas con un token que empiece con cada palabra
+    buscada. A diferencia del selector de clientes no se corta en
+    SEARCH_CANDIDATES: cada palabra es una semijunta (id IN (SELECT ...)) sobre
+    el rango [palabra, siguiente) del índice de tokens, y el orden y el LIMIT
+    los pone la paginación del listado.
+    """
+    words = sorted(set(normalize_words(query)), key=len, reverse=True)[:SEARCH_MAX_WORDS]
+    for word in words:
+        tokens = token_model.objects.filter(token__gte=word)
+        upper = _next_prefix(word)
+        if upper:
+            tokens = tokens.filter(token__lt=upper)
+        queryset = queryset.filter(pk__in=tokens.values(owner_field))
+    return queryset
+
+
+def filter_products(queryset, query):
+    """Búsqueda del catálogo (product_list_view) por palabras del nombre y del SKU."""
+    return _filter_by_tokens(queryset, query, ProductSearchToken, 'product_id')
+
+
+def filter_clients(queryset, query):
+    """Búsqueda del directorio de clientes (client_list_view) sobre el mismo índice que el selector."""
+    return _filter_by_tokens(queryset, query, ClientSearchToken, 'client_id')
@@ -0,0 +1,86 @@
+# pos/signals.py
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import invalidate_active_session, invalidate_product_skus
+from .catalog import invalidate_catalog_counts
+from .dashboard import bump_dashboard
+from .inventory import invalidate_inventory_valuation
+from .models import Cart, CashDrawerSession, Category, Client, Product, Sale, Supplier
+from .rollups import mark_months_stale
+from .search import index_client, index_product
+from .stock import refresh_low_stock
+
+
+@receiver([post_save, post_delete], sender=CashDrawerSession)
+def cash_drawer_session_changed(sender, instance, **kwargs):
+    # Apertura, cierre o ediciones desde el admin (las ventas actualizan el balance
+    # y los totales con UPDATE, sin pasar por aquí: la caché no los guarda).
+    invalidate_active_session(instance.user_id)
+    bump_dashboard('sessions')
+
+
+@receiver(post_save, sender=CashDrawerSession)
+def cash_drawer_session_opened(sender, instance, created, **kwargs):
+    # El carrito existe desde la apertura: el escaneo nunca lo busca ni lo crea.
+    if created:
+        Cart.objects.create(cash_drawer_session=instance)
+
+
+@receiver(post_init, sender=Product)
+def remember_loaded_sku(sender, instance, **kwargs):
+    # __dict__ para no disparar una consulta si el campo está diferido (only/defer).
+    instance._loaded_sku = instance.__dict__.get('sku')
+
+
+@receiver([post_save, post_delete], sender=Product)
+def product_changed(sender, instance, **kwargs):
+    # ProductForm / StockUpdateForm / admin. Si cambió el SKU se invalida también el anterior.
+    invalidate_product_skus([instance.sku, instance._loaded_sku])
+    instance._loaded_sku = instance.sku
+    invalidate_inventory_valuation()
+    # Altas, bajas y cambios de categoría/proveedor mueven las cantidades de los filtros.
+    invalidate_catalog_counts()
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    # Los cruces de umbral ya avisan al dashboard (pos.stock); una baja no cruza nada.
+    bump_dashboard('stock')
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, update_fields=None, **kwargs):
+    # Alta con stock inicial, o cambio de stock o de umbral desde un formulario o el admin.
+    refresh_low_stock([instance.pk])
+    if update_fields is None or {'name', 'sku'} & set(update_fields):
+        index_product(instance)
+
+
+@receiver([post_save, post_delete], sender=Supplier)
+@receiver([post_save, post_delete], sender=Category)
+def product_group_changed(sender, instance, **kwargs):
+    # La valorización y los filtros del catálogo agrupan por proveedor y categoría (y muestran sus nombres).
+    invalidate_inventory_valuation()
+    invalidate_catalog_counts()
+
+
+@receiver(post_save, sender=Client)
+def client_changed(sender, instance, **kwargs):
+    # ClientForm / admin. Al borrar, los tokens caen por CASCADE.
+    index_client(instance)
+
+
+@receiver(post_init, sender=Sale)
+def remember_loaded_sale_date(sender, instance, **kwargs):
+    instance._loaded_sale_date = instance.__dict__.get('sale_date')
+
+
+@receiver([post_save, post_delete], sender=Sale)
+def sale_changed(sender, instance, **kwargs):
+    # Ventas nuevas caen en el mes en curso (no hace nada); una edición o borrado
+    # desde el admin sobre un mes cerrado obliga a recalcular su snapshot.
+    dates = [instance.sale_date, instance._loaded_sale_date]
+    mark_months_stale(timezone.localdate(value) for value in dates if value is not None)
+    instance._loaded_sale_date = instance.sale_date
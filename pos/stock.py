@@ -0,0 +1,388 @@
+# pos/stock.py
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from .cache import invalidate_product_skus
+from .catalog import invalidate_catalog_counts
+from .dashboard import bump_dashboard
+from .inventory import invalidate_inventory_valuation
+from .models import LowStockChange, Product, StockCounter, StockMovement
+
+# =================================================================
+# Modo de stock (settings.POS_STOCK_MODE)
+# =================================================================
+# 'row':    (por defecto) cada operación bloquea y reescribe Product.stock.
+# 'ledger': las ventas, devoluciones y ajustes agregan StockMovement y no tocan
+#           la fila del producto; el disponible es Product.stock (foto
+#           compactada) + los movimientos sin aplicar. La venta lo valida con
+#           un UPDATE condicional sobre StockCounter (un contador por producto),
+#           así que dos cajas nunca venden las mismas últimas unidades y ni las
+#           ventas ni la compactación esperan por la fila del producto. Al pasar
+#           de 'row' a 'ledger' los contadores se recalculan con
+#           compact_stock_movements --sync-counters.
+# Los listados y reportes (stock bajo, valorización) leen la foto, que se
+# atrasa a lo sumo lo que tarde la próxima compactación (compact_stock_movements).
+# Product.is_low_stock sí sigue al disponible: cada escritura de stock
+# actualiza el indicador de los productos que cruzan el umbral.
+
+COMPACT_BATCH_SIZE = 1000
+
+
+def ledger_enabled():
+    return getattr(settings, 'POS_STOCK_MODE', 'row') == 'ledger'
+
+
+def pending_stock():
+    """Suma de los movimientos sin aplicar del producto (subconsulta correlacionada)."""
+    pending = (
+        StockMovement.objects.filter(product=OuterRef('pk'), applied=False)
+        .values('product').annotate(total=Sum('quantity')).values('total')
+    )
+    return Coalesce(Subquery(pending, output_field=IntegerField()), Value(0))
+
+
+def with_available_stock(queryset):
+    """Anota available_stock = foto + pendientes en cada producto del queryset."""
+    return queryset.annotate(available_stock=F('stock') + pending_stock())
+
+
+class InsufficientStock(Exception):
+    """Se lanza cuando una línea del carrito pide más unidades de las que hay en stock."""
+
+    def __init__(self, product):
+        self.product = product
+        super().__init__(f"Stock insuficiente para {product.name}.")
+
+
+def lock_products(product_ids):
+    """
+    Bloquea (SELECT ... FOR UPDATE) todos los productos en UNA sola consulta.
+    El orden por pk es determinista para que dos cajas que venden los mismos
+    productos nunca tomen los bloqueos en orden inverso (deadlock).
+    """
+    return list(
+        Product.objects.select_for_update().filter(pk__in=product_ids).order_by('pk')
+    )
+
+
+def _record_movements(quantities, reason):
+    StockMovement.objects.bulk_create([
+        StockMovement(product_id=product_id, quantity=quantity, reason=reason)
+        for product_id, quantity in quantities.items() if quantity
+    ])
+
+
+# =================================================================
+# Contadores del modo 'ledger' (StockCounter)
+# =================================================================
+
+def create_stock_counters(product_ids):
+    """
+    Crea los contadores que falten con el disponible actual (foto + pendientes)
+    y devuelve cuántos faltaban. Si otra caja crea el mismo contador a la vez,
+    el INSERT se ignora y vale el suyo, que ya incluye su propio movimiento.
+    """
+    missing = list(
+        with_available_stock(Product.objects.filter(pk__in=list(product_ids), stock_counter__isnull=True))
+        .values_list('pk', 'available_stock')
+    )
+    StockCounter.objects.bulk_create(
+        [StockCounter(product_id=product_id, available=available) for product_id, available in missing],
+        ignore_conflicts=True,
+    )
+    return len(missing)
+
+
+def _update_counters(deltas, guard):
+    """
+    Un único UPDATE sobre los contadores:
+
+        UPDATE stockcounter SET available = CASE WHEN product_id = 1 THEN available - 2 ... END
+        WHERE (product_id = 1 AND available >= 2) OR ...
+
+    Con `guard` solo se descuenta donde alcanza. Devuelve las filas escritas.
+    """
+    condition = Q()
+    whens = []
+    for product_id, delta in deltas.items():
+        if guard:
+            condition |= Q(product_id=product_id, available__gte=-delta)
+        else:
+            condition |= Q(product_id=product_id)
+        whens.append(When(product_id=product_id, then=F('available') + delta))
+    return StockCounter.objects.filter(condition).update(
+        available=Case(*whens, default=F('available'), output_field=IntegerField())
+    )
+
+
+def _change_counters(deltas, guard=False):
+    """
+    Aplica `deltas` a los contadores, todos o ninguno. Si el UPDATE no alcanza a
+    todas las filas se deshace hasta el savepoint; cuando faltaba crear algún
+    contador se crea y se reintenta una vez. Devuelve si se aplicó.
+    """
+    savepoint = transaction.savepoint()
+    if _update_counters(deltas, guard) == len(deltas):
+        return True
+    transaction.savepoint_rollback(savepoint)
+    if not create_stock_counters(deltas):
+        return False
+    savepoint = transaction.savepoint()
+    if _update_counters(deltas, guard) == len(deltas):
+        return True
+    transaction.savepoint_rollback(savepoint)
+    return False
+
+
+def sync_stock_counters():
+    """
+    Recalcula todos los contadores (foto + pendientes). En modo 'row' nadie los
+    mantiene: correrlo al activar 'ledger', con las cajas cerradas. Devuelve
+    cuántos productos tienen contador.
+    """
+    with transaction.atomic():
+        StockCounter.objects.all().delete()
+        products = with_available_stock(Product.objects.order_by()).values_list('pk', 'available_stock')
+        StockCounter.objects.bulk_create(
+            [StockCounter(product_id=product_id, available=available) for product_id, available in products],
+            batch_size=COMPACT_BATCH_SIZE,
+        )
+    return StockCounter.objects.count()
+
+
+# =================================================================
+# Conjunto de stock bajo (Product.is_low_stock + LowStockChange)
+# =================================================================
+
+def _sync_low_stock(products):
+    """
+    `products` trae stock = disponible actual, low_stock_threshold e
+    is_low_stock. Solo los que cruzan el umbral se escriben: un UPDATE por
+    sentido y un INSERT en LowStockChange; la venta común no agrega consultas.
+    """
+    changed = [product for product in products
+               if (product.stock <= product.low_stock_threshold) != product.is_low_stock]
+    if not changed:
+        return
+    for product in changed:
+        product.is_low_stock = not product.is_low_stock
+    for value in (True, False):
+        ids = [product.pk for product in changed if product.is_low_stock is value]
+        if ids:
+            Product.objects.filter(pk__in=ids).update(is_low_stock=value)
+    LowStockChange.objects.bulk_create([
+        LowStockChange(product_id=product.pk, is_low_stock=product.is_low_stock, stock=product.stock)
+        for product in changed
+    ])
+    invalidate_catalog_counts()
+    bump_dashboard('stock')
+
+
+def refresh_low_stock(product_ids):
+    """
+    Recalcula is_low_stock de esos productos contra su disponible (una consulta,
+    más las escrituras de los que cambian). Devuelve los productos leídos.
+    """
+    products = list(
+        with_available_stock(Product.objects.filter(pk__in=list(product_ids)))
+        .only('pk', 'sku', 'stock', 'low_stock_threshold', 'is_low_stock')
+    )
+    for product in products:
+        product.stock = product.available_stock
+    _sync_low_stock(products)
+    return products
+
+
+def _short_product(quantities, products, current):
+    """
+    El primer producto (en orden de pk) cuyo stock actual no alcanza para su
+    cantidad; `current` es {product_id: stock} releído después del UPDATE fallido.
+    """
+    for product_id in sorted(quantities):
+        if current.get(product_id, 0) < quantities[product_id]:
+            product = products[product_id]
+            product.stock = current.get(product_id, 0)
+            return product
+    # Otra transacción ya repuso lo que faltaba: se informa el primero del carrito.
+    return products[min(quantities)]
+
+
+def _check_products_exist(quantities, products):
+    for product_id in quantities:
+        if product_id not in products:
+            raise Product.DoesNotExist(f"El producto {product_id} ya no existe.")
+
+
+def decrement_stock(quantities):
+    """
+    Descuenta el stock de {product_id: cantidad}. Debe llamarse dentro de una
+    transacción. Si alguna línea no alcanza se lanza InsufficientStock ANTES de
+    escribir nada. Devuelve {product_id: Product} con el stock ya descontado en
+    memoria.
+
+    Modo 'row': bloquea las filas y aplica un único UPDATE condicional
+
+        UPDATE product SET stock = CASE WHEN id = 1 THEN stock - 2 ... END
+        WHERE (id = 1 AND stock >= 2) OR ...
+
+    Modo 'ledger': el mismo UPDATE condicional, pero sobre StockCounter y sin
+    SELECT ... FOR UPDATE previo: el UPDATE bloquea solo los contadores que
+    escribe, y una caja que espera uno lo reevalúa contra lo que confirmó la
+    otra (READ COMMITTED, el nivel que Django usa en MySQL y PostgreSQL). Luego
+    agrega un movimiento negativo por producto (un INSERT).
+    """
+    if ledger_enabled():
+        if not _change_counters({product_id: -quantity for product_id, quantity in quantities.items()},
+                                guard=True):
+            products = {product.pk: product for product in Product.objects.filter(pk__in=list(quantities))}
+            _check_products_exist(quantities, products)
+            current = dict(StockCounter.objects.filter(product_id__in=list(quantities))
+                           .values_list('product_id', 'available'))
+            raise InsufficientStock(_short_product(quantities, products, current))
+        _record_movements({product_id: -quantity for product_id, quantity in quantities.items()},
+                          StockMovement.REASON_SALE)
+        # Los contadores ya están descontados: el stock leído es el disponible final.
+        products = {product.pk: product for product in
+                    Product.objects.filter(pk__in=list(quantities)).annotate(available_stock=F('stock_counter__available'))}
+        for product in products.values():
+            product.stock = product.available_stock
+    else:
+        products = {product.pk: product for product in lock_products(quantities)}
+        _check_products_exist(quantities, products)
+        for product_id, quantity in quantities.items():
+            if quantity > products[product_id].stock:
+                raise InsufficientStock(products[product_id])
+
+        condition = Q()
+        whens = []
+        for product_id, quantity in quantities.items():
+            condition |= Q(pk=product_id, stock__gte=quantity)
+            whens.append(When(pk=product_id, then=F('stock') - quantity))
+
+        # Con las filas bloqueadas el UPDATE alcanza a todas. Si no (una base sin
+        # bloqueos de fila), se deshace solo el UPDATE parcial hasta el savepoint
+        # y se relee el stock para nombrar al producto que de verdad faltó.
+        savepoint = transaction.savepoint()
+        updated = Product.objects.filter(condition).update(
+            stock=Case(*whens, default=F('stock'), output_field=IntegerField())
+        )
+        if updated != len(quantities):
+            transaction.savepoint_rollback(savepoint)
+            current = dict(Product.objects.filter(pk__in=list(quantities)).values_list('pk', 'stock'))
+            raise InsufficientStock(_short_product(quantities, products, current))
+
+        for product_id, quantity in quantities.items():
+            products[product_id].stock -= quantity
+
+    _sync_low_stock(products.values())
+
+    invalidate_product_skus(product.sku for product in products.values())
+    invalidate_inventory_valuation()
+    return products
+
+
+def increment_stock(quantities, reason=StockMovement.REASON_RETURN):
+    """
+    Devuelve unidades al stock de {product_id: cantidad}. En modo 'row' es un
+    único UPDATE (stock = CASE WHEN id = 1 THEN stock + 2 ... END) relativo a la
+    fila, que no pisa un descuento de checkout_view concurrente; en modo
+    'ledger', un movimiento positivo por producto. Debe llamarse dentro de una
+    transacción.
+    """
+    if not quantities:
+        return
+    if ledger_enabled():
+        _change_counters(quantities)
+        _record_movements(quantities, reason)
+    else:
+        whens = [When(pk=product_id, then=F('stock') + quantity) for product_id, quantity in quantities.items()]
+        Product.objects.filter(pk__in=list(quantities)).update(
+            stock=Case(*whens, default=F('stock'), output_field=IntegerField())
+        )
+    products = refresh_low_stock(quantities)
+    invalidate_product_skus(product.sku for product in products)
+    invalidate_inventory_valuation()
+
+
+def set_stock(product, new_stock):
+    """
+    Reabastecimiento / conteo físico (product_edit_view): deja el disponible en
+    new_stock. En modo 'ledger' se registra la diferencia como ajuste. Debe
+    llamarse dentro de una transacción.
+    """
+    if ledger_enabled():
+        # Con el contador bloqueado una venta concurrente no cambia el disponible
+        # entre la lectura y el ajuste; la fila del producto queda libre.
+        create_stock_counters([product.pk])
+        available = StockCounter.objects.select_for_update().values_list('available', flat=True).get(
+            product_id=product.pk)
+        StockCounter.objects.filter(product_id=product.pk).update(available=new_stock)
+        _record_movements({product.pk: new_stock - available}, StockMovement.REASON_ADJUSTMENT)
+    else:
+        Product.objects.filter(pk=product.pk).update(stock=new_stock)
+    refresh_low_stock([product.pk])
+    invalidate_product_skus([product.sku])
+    invalidate_inventory_valuation()
+
+
+def available_stock(product_id):
+    return with_available_stock(Product.objects.filter(pk=product_id)).values_list(
+        'available_stock', flat=True).get()
+
+
+def stock_as_of(product_id, moment):
+    """
+    Stock disponible de un producto en `moment`: el actual menos los movimientos
+    posteriores (rango sobre el índice stockmove_product_created). Vale para
+    fechas desde que el stock se lleva en el libro (POS_STOCK_MODE='ledger').
+    """
+    later = StockMovement.objects.filter(product_id=product_id, created_at__gt=moment).aggregate(
+        total=Sum('quantity'))['total'] or 0
+    return available_stock(product_id) - later
+
+
+# =================================================================
+# Compactación (manage.py compact_stock_movements)
+# =================================================================
+
+def compact_product(product_id, batch_size=COMPACT_BATCH_SIZE):
+    """
+    Suma a Product.stock los movimientos pendientes de un producto y los marca
+    como aplicados, en una transacción corta por lote. Se marcan exactamente los
+    ids que se sumaron: un movimiento de una transacción que confirma durante la
+    compactación queda pendiente para la próxima. Al terminar se recalcula
+    is_low_stock del producto, lo que corrige un indicador que dos cajas
+    concurrentes hayan dejado desfasado. Devuelve los movimientos aplicados.
+    """
+    applied = 0
+    while True:
+        with transaction.atomic():
+            pending = list(
+                StockMovement.objects.filter(product_id=product_id, applied=False)
+                .order_by('pk').values_list('pk', 'quantity')[:batch_size]
+            )
+            if not pending:
+                break
+            StockMovement.objects.filter(pk__in=[pk for pk, _ in pending]).update(applied=True)
+            Product.objects.filter(pk=product_id).update(
+                stock=F('stock') + sum(quantity for _, quantity in pending)
+            )
+        applied += len(pending)
+        if len(pending) < batch_size:
+            break
+    refresh_low_stock([product_id])
+    return applied
+
+
+def compact_stock_movements(batch_size=COMPACT_BATCH_SIZE):
+    """Compacta todos los productos con movimientos pendientes. Devuelve (productos, movimientos)."""
+    product_ids = list(
+        StockMovement.objects.filter(applied=False).values_list('product_id', flat=True).distinct().order_by()
+    )
+    movements = sum(compact_product(product_id, batch_size) for product_id in product_ids)
+    if movements:
+        # La foto cambió; el disponible (y los snapshots por SKU) no.
+        invalidate_inventory_valuation()
+    return len(product_ids), movements
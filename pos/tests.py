@@ -1,3 +1,592 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Sum
+from django.test import Client as TestClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .cache import aget_product_snapshot, get_active_session, get_product_snapshot
+from .cart import StockLimitReached, add_to_cart, get_cart_lines, get_cart_total
+from .catalog_io import import_catalog
+from .dashboard import TOP_PRODUCTS_DAYS, WIDGETS
+from .models import (CashDrawerSession, DailyProductSales, DailySalesSummary, Product, Sale, SaleReturnItem,
+                     StockCounter, StockMovement)
+from .pricing import apply_repricing
+from .rollups import rebuild_range, session_totals_from_sales
+from .stock import InsufficientStock, available_stock, decrement_stock, set_stock
+
+
+def _serializes_writers():
+    # Las pruebas concurrentes necesitan escritores que esperen su turno: bloqueos
+    # de fila (MySQL, PostgreSQL) o SQLite en archivo con transacciones IMMEDIATE.
+    # La SQLite en memoria de las pruebas falla con "table is locked" en lugar de esperar.
+    if connection.features.has_select_for_update:
+        return True
+    options = connection.settings_dict.get('OPTIONS', {})
+    return (connection.vendor == 'sqlite' and options.get('transaction_mode') == 'IMMEDIATE'
+            and bool(connection.settings_dict['TEST'].get('NAME')))
+
+
+concurrent_writes = skipUnless(_serializes_writers(), "La base no serializa escrituras concurrentes.")
+
+# La caché configurada es la compartida de la instalación (Redis): las pruebas
+# usan una propia en memoria, que pueden vaciar sin tocar la de las cajas.
+local_cache = override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pos-tests'},
+})
+
+
+def run_concurrently(*functions):
+    """
+    Ejecuta cada función en su propio hilo (y su propia conexión), todas a la
+    vez, y devuelve lo que devolvió o lanzó cada una, en orden.
+    """
+    barrier = threading.Barrier(len(functions))
+    results = [None] * len(functions)
+
+    def run(index, function):
+        try:
+            barrier.wait()
+            results[index] = function()
+        except Exception as e:
+            results[index] = e
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=run, args=(index, function)) for index, function in enumerate(functions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def create_product(sku, stock=10, price='2.50', **fields):
+    return Product.objects.create(name=f"Producto {sku}", sku=sku, price=Decimal(price), stock=stock, **fields)
+
+
+class CashierMixin:
+    """Un cajero con su sesión de caja abierta y un test client ya logueado."""
+
+    def setUp(self):
+        super().setUp()
+        # TransactionTestCase vacía las tablas de los modelos pero no la de la caché.
+        cache.clear()
+        self.user = User.objects.create_user('cajero', password='cajero')
+        self.cash_session = CashDrawerSession.objects.create(user=self.user, starting_balance=Decimal('100.00'))
+        self.client.force_login(self.user)
+
+    def scan(self, product, times=1, client=None):
+        for _ in range(times):
+            (client or self.client).post(reverse('add_product'), {'sku': product.sku})
+
+    def checkout(self, payment_method='cash', client=None):
+        return (client or self.client).post(reverse('checkout'), {'payment_method': payment_method})
+
+    def sell(self, *lines, payment_method='cash'):
+        """Cobra [(producto, unidades), ...] por las vistas y devuelve la venta."""
+        for product, units in lines:
+            self.scan(product, units)
+        response = self.checkout(payment_method)
+        self.assertContains(response, "Venta completada")
+        return Sale.objects.latest('pk')
+
+    def return_items(self, sale, units_by_product, client=None):
+        data = {'motive': 'Prueba'}
+        for item in sale.items.all():
+            data[f'qty_{item.pk}'] = units_by_product.get(item.product_id, 0)
+        return (client or self.client).post(reverse('process_return', args=[sale.pk]), data)
+
+
+# =================================================================
+# Stock (pos.stock)
+# =================================================================
+
+@local_cache
+class StockTests(TestCase):
+
+    def test_short_stock_writes_nothing(self):
+        for mode in ('row', 'ledger'):
+            with self.subTest(mode=mode), override_settings(POS_STOCK_MODE=mode):
+                enough = create_product(f'OK-{mode}', stock=5)
+                short = create_product(f'SHORT-{mode}', stock=1)
+                with self.assertRaises(InsufficientStock) as raised, transaction.atomic():
+                    decrement_stock({enough.pk: 2, short.pk: 2})
+                self.assertEqual(raised.exception.product.pk, short.pk)
+                self.assertEqual(available_stock(enough.pk), 5)
+                self.assertEqual(available_stock(short.pk), 1)
+
+    def test_update_that_misses_a_row_names_the_short_product(self):
+        # Una base sin bloqueos de fila: la lectura dice que alcanza, pero cuando
+        # llega el UPDATE otra caja ya vendió las unidades de `short`.
+        enough = create_product('STALE-OK', stock=5)
+        short = create_product('STALE-SHORT', stock=1)
+        stale = [Product(pk=enough.pk, name=enough.name, stock=5), Product(pk=short.pk, name=short.name, stock=5)]
+
+        with mock.patch('pos.stock.lock_products', return_value=stale):
+            with self.assertRaises(InsufficientStock) as raised, transaction.atomic():
+                decrement_stock({enough.pk: 2, short.pk: 2})
+
+        self.assertEqual(raised.exception.product.pk, short.pk)
+        self.assertEqual(available_stock(enough.pk), 5)
+
+    @override_settings(POS_STOCK_MODE='ledger')
+    def test_ledger_never_sells_below_zero(self):
+        product = create_product('LEDGER-1', stock=1)
+        with transaction.atomic():
+            decrement_stock({product.pk: 1})
+        with self.assertRaises(InsufficientStock), transaction.atomic():
+            decrement_stock({product.pk: 1})
+        self.assertEqual(available_stock(product.pk), 0)
+
+    @override_settings(POS_STOCK_MODE='ledger')
+    def test_ledger_sale_does_not_lock_the_product_row(self):
+        product = create_product('LEDGER-2', stock=50)
+        with CaptureQueriesContext(connection) as captured, transaction.atomic():
+            decrement_stock({product.pk: 3})
+
+        self.assertFalse([query['sql'] for query in captured if 'FOR UPDATE' in query['sql']])
+        self.assertFalse([query['sql'] for query in captured if query['sql'].startswith('UPDATE "pos_product"')])
+        self.assertEqual(available_stock(product.pk), 47)
+
+    @override_settings(POS_STOCK_MODE='ledger')
+    def test_counter_starts_from_the_pending_movements(self):
+        # Un producto dado de alta por importación no tiene contador hasta su primera venta.
+        product = create_product('LEDGER-3', stock=5)
+        StockMovement.objects.create(product=product, quantity=-2, reason=StockMovement.REASON_SALE)
+
+        with transaction.atomic():
+            decrement_stock({product.pk: 3})
+        with self.assertRaises(InsufficientStock), transaction.atomic():
+            decrement_stock({product.pk: 1})
+
+        self.assertEqual(StockCounter.objects.get(product=product).available, 0)
+        self.assertEqual(available_stock(product.pk), 0)
+
+    def test_sync_counters_catches_up_with_row_mode(self):
+        product = create_product('LEDGER-4', stock=10)
+        with override_settings(POS_STOCK_MODE='ledger'), transaction.atomic():
+            set_stock(product, 8)
+        with transaction.atomic():
+            decrement_stock({product.pk: 5})
+
+        call_command('compact_stock_movements', '--sync-counters', stdout=StringIO())
+
+        self.assertEqual(StockCounter.objects.get(product=product).available, 3)
+        with override_settings(POS_STOCK_MODE='ledger'):
+            with self.assertRaises(InsufficientStock), transaction.atomic():
+                decrement_stock({product.pk: 4})
+            with transaction.atomic():
+                decrement_stock({product.pk: 3})
+        self.assertEqual(available_stock(product.pk), 0)
+
+
+@local_cache
+@concurrent_writes
+class ConcurrentStockTests(TransactionTestCase):
+
+    def test_last_unit_is_sold_once(self):
+        for mode in ('row', 'ledger'):
+            with self.subTest(mode=mode), override_settings(POS_STOCK_MODE=mode):
+                product = create_product(f'LAST-{mode}', stock=1)
+
+                def sell():
+                    with transaction.atomic():
+                        decrement_stock({product.pk: 1})
+                    return 'vendido'
+
+                results = run_concurrently(sell, sell)
+                self.assertEqual(results.count('vendido'), 1, results)
+                self.assertTrue(any(isinstance(result, InsufficientStock) for result in results), results)
+                self.assertEqual(available_stock(product.pk), 0)
+
+    @override_settings(POS_STOCK_MODE='ledger')
+    def test_ledger_never_oversells_multi_unit_lines(self):
+        product = create_product('LEDGER-5', stock=5)
+
+        def sell():
+            with transaction.atomic():
+                decrement_stock({product.pk: 2})
+            return 'vendido'
+
+        results = run_concurrently(*[sell] * 4)
+
+        self.assertEqual(results.count('vendido'), 2, results)
+        self.assertEqual(sum(isinstance(result, InsufficientStock) for result in results), 2, results)
+        self.assertEqual(available_stock(product.pk), 1)
+        self.assertEqual(StockCounter.objects.get(product=product).available, 1)
+
+    @skipUnless(connection.features.has_select_for_update, "Sin bloqueos de fila no hay nada que medir.")
+    @override_settings(POS_STOCK_MODE='ledger')
+    def test_open_ledger_sale_leaves_the_product_row_free(self):
+        product = create_product('LEDGER-6', stock=50)
+        sold = threading.Event()
+        checked = threading.Event()
+
+        def sell():
+            with transaction.atomic():
+                decrement_stock({product.pk: 1})
+                sold.set()
+                checked.wait(5)
+            return 'vendido'
+
+        def edit_product():
+            sold.wait(5)
+            try:
+                # Lo que haría una edición o la compactación mientras la venta sigue abierta.
+                with transaction.atomic():
+                    Product.objects.select_for_update(nowait=True).get(pk=product.pk)
+                return 'libre'
+            except DatabaseError:
+                return 'bloqueado'
+            finally:
+                checked.set()
+
+        self.assertEqual(run_concurrently(sell, edit_product), ['vendido', 'libre'])
+        self.assertEqual(available_stock(product.pk), 49)
+
+
+# =================================================================
+# Snapshots por SKU (pos.cache)
+# =================================================================
+
+@local_cache
+class ProductSnapshotTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_import_refreshes_cached_and_unknown_skus(self):
+        drill = create_product('TAL-8', price='45.90')
+        self.assertEqual(get_product_snapshot(drill.sku)['price'], Decimal('45.90'))
+        self.assertIsNone(get_product_snapshot('NUEVO-8'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            import_catalog([['SKU', 'Producto', 'Precio'], ['TAL-8', drill.name, '49.90'], ['NUEVO-8', 'Nuevo', '5']])
+
+        self.assertEqual(get_product_snapshot(drill.sku)['price'], Decimal('49.90'))
+        self.assertEqual(get_product_snapshot('NUEVO-8')['name'], 'Nuevo')
+
+    def test_repricing_refreshes_cached_prices(self):
+        drill = create_product('TAL-9', price='45.90')
+        self.assertEqual(get_product_snapshot(drill.sku)['price'], Decimal('45.90'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(apply_repricing('percent', '10', 'cent'), 1)
+
+        self.assertEqual(get_product_snapshot(drill.sku)['price'], Decimal('50.49'))
+
+    def test_cached_lookup_does_not_query_the_database(self):
+        drill = create_product('TAL-10', price='45.90')
+        snapshot = get_product_snapshot(drill.sku)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_product_snapshot(drill.sku), snapshot)
+            self.assertEqual(async_to_sync(aget_product_snapshot)(drill.sku), snapshot)
+
+    def test_product_change_is_invalidated_on_commit(self):
+        drill = create_product('TAL-11', price='45.90')
+        get_product_snapshot(drill.sku)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            drill.price = Decimal('9.99')
+            drill.save()
+            # Hasta el COMMIT los demás requests siguen viendo el precio confirmado.
+            self.assertEqual(get_product_snapshot(drill.sku)['price'], Decimal('45.90'))
+
+        self.assertEqual(get_product_snapshot(drill.sku)['price'], Decimal('9.99'))
+
+# =================================================================
+# Sesión de caja activa (pos.cache)
+# =================================================================
+
+@local_cache
+class ActiveSessionCacheTests(CashierMixin, TestCase):
+
+    def test_sales_do_not_invalidate_the_cached_session(self):
+        drill = create_product('SES-1', stock=10, price='45.90')
+        self.scan(drill)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.checkout()
+
+        with CaptureQueriesContext(connection) as captured:
+            self.scan(drill)
+        self.assertFalse([query for query in captured if 'pos_cashdrawersession' in query['sql']])
+        # El balance no viaja en la caché: se lee de la fila al mostrarlo.
+        self.assertContains(self.client.get(reverse('pos_main')), '$145.90')
+
+    def test_closing_the_session_drops_it_after_commit(self):
+        self.assertEqual(get_active_session(self.user), self.cash_session)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('close_session'), {'ending_balance': '100.00'})
+
+        self.assertIsNone(get_active_session(self.user))
+
+
+# =================================================================
+# Checkout (checkout_view)
+# =================================================================
+
+@local_cache
+class CheckoutTests(CashierMixin, TestCase):
+
+    def test_checkout_sells_the_cart(self):
+        hammer = create_product('MART-1', stock=5, price='10.00')
+        nails = create_product('CLAVO-1', stock=100, price='0.15')
+        sale = self.sell((hammer, 2), (nails, 10))
+
+        self.assertEqual(sale.total_amount, Decimal('21.50'))
+        self.assertEqual(dict(sale.items.values_list('product_id', 'quantity')), {hammer.pk: 2, nails.pk: 10})
+        self.assertEqual(available_stock(hammer.pk), 3)
+        self.assertEqual(available_stock(nails.pk), 90)
+        self.assertEqual(get_cart_lines(self.cash_session), [])
+
+    def test_short_stock_rolls_back_the_whole_sale(self):
+        hammer = create_product('MART-2', stock=5)
+        last = create_product('ULTIMO-2', stock=1)
+        self.scan(hammer, 2)
+        self.scan(last)
+        # Otra caja vende la última unidad entre el escaneo y el cobro.
+        Product.objects.filter(pk=last.pk).update(stock=0)
+
+        response = self.checkout()
+
+        self.assertContains(response, "Stock insuficiente para Producto ULTIMO-2")
+        self.assertFalse(Sale.objects.exists())
+        self.assertEqual(available_stock(hammer.pk), 5)
+        self.assertEqual(len(get_cart_lines(self.cash_session)), 2)
+        self.cash_session.refresh_from_db()
+        self.assertEqual(self.cash_session.num_transactions, 0)
+        self.assertFalse(DailySalesSummary.objects.exists())
+
+    def test_unknown_payment_method_writes_nothing(self):
+        hammer = create_product('MART-3', stock=5)
+        self.scan(hammer)
+
+        response = self.checkout('bitcoin')
+
+        self.assertContains(response, "Método de pago no válido")
+        self.assertFalse(Sale.objects.exists())
+        self.assertEqual(available_stock(hammer.pk), 5)
+        self.cash_session.refresh_from_db()
+        self.assertEqual(self.cash_session.num_transactions, 0)
+
+
+# =================================================================
+# Carrito (pos.cart)
+# =================================================================
+
+def snapshot_of(product):
+    return {'id': product.pk, 'sku': product.sku, 'name': product.name, 'price': product.price,
+            'stock': product.stock}
+
+
+@local_cache
+class CartTests(CashierMixin, TestCase):
+
+    def test_repeat_scans_merge_into_one_line(self):
+        drill = create_product('TAL-1', stock=10, price='45.90')
+        nails = create_product('CLAVO-3', stock=10, price='0.15')
+        self.scan(drill, 3)
+        self.scan(nails)
+
+        lines = get_cart_lines(self.cash_session)
+        self.assertEqual([(line.product_id, line.quantity) for line in lines], [(drill.pk, 3), (nails.pk, 1)])
+        self.assertEqual(get_cart_total(self.cash_session), Decimal('137.85'))
+
+    def test_scan_stops_at_available_stock(self):
+        drill = create_product('TAL-2', stock=2)
+        self.scan(drill, 2)
+
+        response = self.client.post(reverse('add_product'), {'sku': drill.sku})
+
+        self.assertContains(response, "Stock máximo alcanzado (2)")
+        self.assertEqual(get_cart_lines(self.cash_session)[0].quantity, 2)
+
+    def test_scan_cost_does_not_grow_with_the_cart(self):
+        products = [create_product(f'GRANDE-{i}', stock=10, price='1.25') for i in range(100)]
+        for product in products:
+            add_to_cart(self.cash_session, snapshot_of(product))
+
+        # La lectura de las líneas + el UPDATE de la escaneada, con 100 líneas en el carrito.
+        with self.assertNumQueries(2):
+            line, total_cents = add_to_cart(self.cash_session, snapshot_of(products[50]))
+
+        self.assertEqual(line.quantity, 2)
+        self.assertEqual(total_cents, 101 * 125)
+        self.assertEqual(get_cart_total(self.cash_session), Decimal('126.25'))
+
+    def test_async_scan_under_wsgi_loads_the_user_once(self):
+        drill = create_product('TAL-5', stock=10)
+        self.scan(drill)
+
+        with CaptureQueriesContext(connection) as captured:
+            self.scan(drill)
+
+        self.assertEqual(len([query for query in captured if 'FROM "auth_user"' in query['sql']]), 1)
+        self.assertEqual(get_cart_lines(self.cash_session)[0].quantity, 2)
+
+
+@local_cache
+@concurrent_writes
+class ConcurrentCartTests(CashierMixin, TransactionTestCase):
+
+    def test_simultaneous_scans_merge_into_one_line(self):
+        drill = create_product('TAL-3', stock=10, price='45.90')
+
+        results = run_concurrently(*[lambda: add_to_cart(self.cash_session, snapshot_of(drill))] * 4)
+
+        self.assertFalse([result for result in results if isinstance(result, Exception)], results)
+        lines = get_cart_lines(self.cash_session)
+        self.assertEqual([(line.product_id, line.quantity) for line in lines], [(drill.pk, 4)])
+        self.assertEqual(get_cart_total(self.cash_session), Decimal('183.60'))
+
+    def test_simultaneous_scans_stop_at_stock(self):
+        drill = create_product('TAL-4', stock=2, price='45.90')
+        add_to_cart(self.cash_session, snapshot_of(drill))
+
+        results = run_concurrently(*[lambda: add_to_cart(self.cash_session, snapshot_of(drill))] * 3)
+
+        self.assertEqual(sum(isinstance(result, StockLimitReached) for result in results), 2, results)
+        self.assertEqual(get_cart_lines(self.cash_session)[0].quantity, 2)
+
+
+# =================================================================
+# Devoluciones (process_return_view)
+# =================================================================
+
+@local_cache
+class ReturnTests(CashierMixin, TestCase):
+
+    def test_cannot_return_more_than_what_is_left(self):
+        drill = create_product('TAL-4', stock=10)
+        sale = self.sell((drill, 3))
+
+        self.assertEqual(self.return_items(sale, {drill.pk: 2}).status_code, 200)
+        response = self.return_items(sale, {drill.pk: 2})
+
+        self.assertContains(response, "Solo quedan 1 unidad(es)", status_code=400)
+        self.assertEqual(SaleReturnItem.objects.aggregate(units=Sum('quantity'))['units'], 2)
+        self.assertEqual(available_stock(drill.pk), 9)
+
+    def test_return_cost_does_not_grow_with_the_sale(self):
+        products = [create_product(f'RET-{i}', stock=10) for i in range(6)]
+        one_line = self.sell((products[0], 1))
+        six_lines = self.sell(*[(product, 1) for product in products])
+
+        queries = []
+        for sale in (one_line, six_lines):
+            with CaptureQueriesContext(connection) as captured:
+                self.assertEqual(self.return_items(sale, {product.pk: 1 for product in products}).status_code, 200)
+            queries.append(len(captured))
+
+        self.assertEqual(queries[0], queries[1])
+
+
+@local_cache
+@concurrent_writes
+class ConcurrentReturnTests(CashierMixin, TransactionTestCase):
+
+    def test_concurrent_returns_never_exceed_the_sale(self):
+        drill = create_product('TAL-5', stock=10)
+        sale = self.sell((drill, 2))
+        clients = []
+        for _ in range(4):
+            client = TestClient(raise_request_exception=False)
+            client.force_login(self.user)
+            clients.append(client)
+
+        responses = run_concurrently(*[
+            lambda client=client: self.return_items(sale, {drill.pk: 2}, client=client) for client in clients
+        ])
+
+        self.assertEqual([response.status_code for response in responses].count(200), 1, responses)
+        self.assertEqual(SaleReturnItem.objects.aggregate(units=Sum('quantity'))['units'], 2)
+        self.assertEqual(available_stock(drill.pk), 10)
+
+
+# =================================================================
+# Rollups y totales del turno (pos.rollups)
+# =================================================================
+
+@local_cache
+class RollupTests(CashierMixin, TestCase):
+
+    def _rollup_rows(self):
+        return (
+            sorted(DailySalesSummary.objects.values_list('date', 'payment_method', 'total_amount', 'num_transactions')),
+            sorted(DailyProductSales.objects.values_list('date', 'product_id', 'units', 'revenue')),
+        )
+
+    def test_incremental_rollups_match_a_rebuild(self):
+        drill = create_product('TAL-6', stock=20, price='45.90')
+        nails = create_product('CLAVO-6', stock=200, price='0.15')
+        cash_sale = self.sell((drill, 2), (nails, 30))
+        self.sell((nails, 12), payment_method='card')
+        self.return_items(cash_sale, {drill.pk: 1, nails.pk: 5})
+
+        incremental = self._rollup_rows()
+        today = timezone.localdate()
+        rebuild_range(today, today)
+
+        self.assertEqual(incremental, self._rollup_rows())
+
+    def test_command_leaves_today_alone_without_the_flag(self):
+        drill = create_product('TAL-12', stock=20, price='45.90')
+        self.sell((drill, 2))
+        incremental = self._rollup_rows()
+        DailySalesSummary.objects.update(total_amount=0)
+        today = timezone.localdate().isoformat()
+
+        with self.assertRaisesMessage(CommandError, "--include-today"):
+            call_command('rebuild_sales_rollups', start=today, end=today, stdout=StringIO())
+        self.assertEqual(DailySalesSummary.objects.get().total_amount, 0)
+
+        call_command('rebuild_sales_rollups', include_today=True, stdout=StringIO())
+        self.assertEqual(incremental, self._rollup_rows())
+
+    def test_session_totals_match_the_sales(self):
+        drill = create_product('TAL-7', stock=20, price='45.90')
+        cash_sale = self.sell((drill, 2))
+        self.sell((drill, 1), payment_method='card')
+        self.return_items(cash_sale, {drill.pk: 1})
+
+        self.cash_session.refresh_from_db()
+        expected = session_totals_from_sales([self.cash_session.pk])[self.cash_session.pk]
+        self.assertEqual({field: getattr(self.cash_session, field) for field in expected}, expected)
+        self.assertEqual(expected['cash_sales_total'], Decimal('91.80'))
+        self.assertEqual(expected['card_sales_total'], Decimal('45.90'))
+        self.assertEqual(expected['returns_total'], Decimal('45.90'))
+        self.assertEqual(expected['num_transactions'], 2)
+
+
+# =================================================================
+# Dashboard (pos.dashboard)
+# =================================================================
+
+@local_cache
+class DashboardTests(TestCase):
+
+    def test_top_products_only_counts_the_recent_window(self):
+        old_hit = create_product('VIEJO-1')
+        recent = create_product('NUEVO-1')
+        today = timezone.localdate()
+        DailyProductSales.objects.create(date=today - timedelta(days=TOP_PRODUCTS_DAYS), product=old_hit,
+                                         units=500, revenue=Decimal('1250.00'))
+        DailyProductSales.objects.create(date=today - timedelta(days=TOP_PRODUCTS_DAYS - 1), product=recent,
+                                         units=3, revenue=Decimal('7.50'))
+
+        top = WIDGETS['top_products'].compute()['top_products']
+
+        self.assertEqual(top, [{'product__name': recent.name, 'total_sold': 3}])
@@ -22,16 +22,27 @@ urlpatterns = [
 
     # Rutas de BI/Admin (Sprint 4)
     path('dashboard/', views.dashboard_view, name='dashboard'),
+    path('dashboard/widgets/<str:widget>/', views.dashboard_widget_view, name='dashboard_widget'),
+    path('metrics/', views.metrics_view, name='metrics'),
     path('reports/sales/', views.sales_report_view, name='sales_report'),
+    path('reports/jobs/<int:job_id>/', views.report_job_view, name='report_job'),
+    path('reports/jobs/<int:job_id>/progress/', views.report_job_progress_view, name='report_job_progress'),
+    path('reports/jobs/<int:job_id>/download/', views.report_job_download_view, name='report_job_download'),
     path('inventory/products/', product_list_view, name='product_list'),
+    path('inventory/products/import/', views.product_import_view, name='product_import'),
+    path('inventory/products/export/', views.product_export_view, name='product_export'),
+    path('inventory/products/reprice/', views.product_reprice_view, name='product_reprice'),
 
     # 2. Inventario por Proveedor (Requiere el ID del proveedor)
     path('inventory/suppliers/<int:supplier_id>/', supplier_inventory_view, name='supplier_inventory'),
+    path('inventory/valuation/', views.inventory_valuation_view, name='inventory_valuation'),
+    path('inventory/valuation/export/', views.inventory_valuation_export_view, name='inventory_valuation_export'),
 
     # 3. Resumen Mensual
     path('reports/monthly-summary/', monthly_summary_view, name='monthly_summary'),
     # NOTA: La ruta 'inicio/' y la segunda 'add-product/' se han eliminado por duplicación/redundancia.
     path('inventario/alerta-stock/', views.low_inventory_alert_view, name='low_inventory_alert'),
+    path('inventario/alerta-stock/cambios/', views.low_stock_changes_view, name='low_stock_changes'),
     path('productos/editar/<int:product_id>/', views.product_edit_view, name='product_edit'),
     path('clientes/', views.client_list_view, name='client_list'),
     path('clientes/crear/', views.client_create_view, name='client_create'),
@@ -1,29 +1,41 @@
 import datetime
 from glob import escape
-from datetime import datetime
+from datetime import datetime, timedelta
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.forms import DecimalField, models
 from django.shortcuts import render, get_object_or_404, redirect
 from django.views.decorators.http import require_POST, require_http_methods
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, FileResponse, Http404, StreamingHttpResponse
 from django.db import transaction
 from django.db.models import Sum, Count, Q, ExpressionWrapper, F
 from django.utils import timezone
 from decimal import Decimal
 from django.contrib.auth import logout
-from openpyxl import Workbook
 from django.db.models import F
 
-from .forms import ProductForm, StockUpdateForm, ClientForm
+from .forms import ProductForm, StockUpdateForm, ClientForm, CatalogImportForm, RepriceForm
 from .models import Product, Sale, SaleItem, CashDrawerSession, Supplier, Client, SaleReturnItem, SaleReturn
-from django.db.models.functions import ExtractYear, ExtractMonth
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
+from .models import ReportJob, LowStockChange
+from .stock import decrement_stock, increment_stock, set_stock, with_available_stock, InsufficientStock
+from .returns import returnable_quantities
+from .cache import aget_active_session, aget_product_snapshot
+from .rollups import record_sale, record_return, monthly_summary, summary_years
+from .reports import sales_in_range
+from .jobs import enqueue_report, report_path
+from .search import asearch_clients, filter_clients
+from .inventory import inventory_valuation, stream_valuation_csv, supplier_valuation
+from .catalog import DEFAULT_SORT, SORTS as CATALOG_SORTS, catalog_counts, catalog_page
+from .catalog_io import CatalogImportError, import_catalog, read_rows, stream_catalog_csv
+from .pricing import apply_repricing, repricing_preview
+from .pagination import KeysetPaginator
+from .metrics import render_prometheus
+from .dashboard import (
+    DASHBOARD_REFRESH_SECONDS, TOP_PRODUCTS_DAYS, WIDGETS as DASHBOARD_WIDGETS, render_widget, render_widgets,
+)
+from .cart import StockLimitReached, aadd_to_cart, aget_cart_total, clear_cart, get_cart_lines, from_cents
 @login_required
 def redirect_after_login(request):
-    active_session = CashDrawerSession.objects.filter(user=request.user, end_time__isnull=True).first()
+    active_session = request.cash_session
     if active_session:
         return redirect('pos_main')
     return redirect('open_session')
@@ -31,7 +43,7 @@ def redirect_after_login(request):
 
 @login_required
 def open_session_view(request):
-    active_session = CashDrawerSession.objects.filter(user=request.user, end_time__isnull=True).first()
+    active_session = request.cash_session
     if active_session:
         return redirect('pos_main')
 
@@ -41,6 +53,10 @@ def open_session_view(request):
         except:
             starting_balance = Decimal('0.00')
 
+        # Verificación directa contra la BD (no la caché) antes de abrir otra caja.
+        if CashDrawerSession.objects.filter(user=request.user, end_time__isnull=True).exists():
+            return redirect('pos_main')
+
         CashDrawerSession.objects.create(
             user=request.user,
             starting_balance=starting_balance
@@ -52,21 +68,23 @@ def open_session_view(request):
 
 @login_required
 def close_session_view(request):
-    active_session = CashDrawerSession.objects.filter(user=request.user, end_time__isnull=True).first()
+    active_session = request.cash_session
     if not active_session:
         return redirect('pos_main')
 
-    cash_sales = active_session.sales.filter(payment_method='cash').aggregate(total_sum=Sum('total_amount'))[
-                     'total_sum'] or Decimal('0.00')
-
-    card_sales = active_session.sales.filter(payment_method='card').aggregate(total_sum=Sum('total_amount'))[
-                     'total_sum'] or Decimal('0.00')
+    # Totales acumulados por cada venta/devolución (ver pos.rollups.record_sale).
+    # Se releen de la fila: la instancia de la sesión puede venir de la caché.
+    active_session.refresh_from_db(fields=CashDrawerSession.TOTAL_FIELDS)
+    cash_sales = active_session.cash_sales_total
+    card_sales = active_session.card_sales_total
     expected_balance = cash_sales
 
     context = {
         'session': active_session,
         'cash_sales': cash_sales,
         'card_sales': card_sales,
+        'returns_total': active_session.returns_total,
+        'num_transactions': active_session.num_transactions,
         'expected_balance': expected_balance,
     }
 
@@ -81,7 +99,9 @@ def close_session_view(request):
         active_session.end_time = timezone.now()
         active_session.ending_balance = ending_balance
         active_session.notes = notes
-        active_session.save()
+        active_session.save(update_fields=['end_time', 'ending_balance', 'notes'])
+        # Un carrito sin cobrar no pasa a la próxima sesión.
+        clear_cart(active_session)
 
         logout(request)
         return redirect('login')
@@ -89,61 +109,53 @@ def close_session_view(request):
     return render(request, 'pos/close_session.html', context)
 @login_required
 def pos_view(request):
-    cart_items = request.session.get('cart', {})
-    cart_total = sum(item['subtotal'] for item in cart_items.values())
-
-    active_session = CashDrawerSession.objects.filter(user=request.user, end_time__isnull=True).first()
+    active_session = request.cash_session
+    cart = get_cart_lines(active_session)
 
     context = {
-        'cart_items': cart_items.values(),
-        'cart_total': cart_total,
+        'cart_items': cart,
+        'cart_total': from_cents(sum(line.subtotal_cents for line in cart)),
         'active_session': active_session
     }
     return render(request, 'pos/pos_main.html', context)
 
 
+# Vistas async: las que cada caja llama en cada escaneo. Bajo ASGI esperan a la
+# base de datos sin ocupar un worker; bajo WSGI Django las ejecuta igual.
+
 @login_required
 @require_POST
-def add_product_view(request):
+async def add_product_view(request):
     sku = request.POST.get('sku', '').strip()
 
-    try:
-        product = Product.objects.get(sku=sku)
-    except Product.DoesNotExist:
+    # Snapshot cacheado (id, sku, name, price, stock) en lugar de leer la fila completa.
+    product = await aget_product_snapshot(sku)
+    if product is None:
         return HttpResponse(
             '<tr style="color: red;"><td colspan="5">Producto con ese código no existe.</td></tr>'
         )
 
-    if product.stock <= 0:
+    if product['stock'] <= 0:
         return HttpResponse(
             '<tr style="color: red;"><td colspan="5">Producto sin stock disponible.</td></tr>'
         )
 
-    cart = request.session.get('cart', {})
-    product_id = str(product.id)
-    quantity = cart.get(product_id, {}).get('quantity', 0) + 1
+    active_session = await aget_active_session(await request.auser())
+    if not active_session:
+        return HttpResponse('<tr style="color: red;"><td colspan="5">No hay sesión de caja activa.</td></tr>')
 
-    if quantity > product.stock:
+    # Carrito en tabla (por sesión de caja): una lectura de las líneas y la escritura
+    # de la línea escaneada, en centavos.
+    try:
+        line, total_cents = await aadd_to_cart(active_session, product)
+    except StockLimitReached as e:
         return HttpResponse(
-            f'<tr style="color: orange;"><td colspan="5">Stock máximo alcanzado ({product.stock}).</td></tr>'
+            f'<tr style="color: orange;"><td colspan="5">Stock máximo alcanzado ({e.stock}).</td></tr>'
         )
 
-    cart[product_id] = {
-        'id': product.id,
-        'sku': product.sku,
-        'name': product.name,
-        'price': float(product.price),
-        'quantity': quantity,
-        'subtotal': float(product.price * quantity),
-    }
-
-    request.session['cart'] = cart
-    request.session.modified = True
-
-    cart_total = sum(item['subtotal'] for item in cart.values())
     context = {
-        'item': cart[product_id],
-        'cart_total': cart_total
+        'item': line,
+        'cart_total': from_cents(total_cents)
     }
 
     return render(request, 'pos/cart_row_and_total.html', context)
@@ -153,8 +165,10 @@ def add_product_view(request):
 @require_POST
 @transaction.atomic
 def checkout_view(request):
-    cart = request.session.get('cart', {})
     payment_method = request.POST.get('payment_method', 'cash')
+    # Antes de escribir nada: record_sale solo sabe acumular los métodos de Sale.
+    if payment_method not in dict(Sale.PAYMENT_METHOD_CHOICES):
+        return HttpResponse('<p style="color:red;">Método de pago no válido.</p>')
 
     client_id = request.POST.get('client_id')
     client_instance = None
@@ -164,38 +178,34 @@ def checkout_view(request):
         except Client.DoesNotExist:
             pass
 
-    if not cart:
-        return HttpResponse('<p style="color:red;">No hay productos en el carrito.</p>')
-
-    active_session = CashDrawerSession.objects.filter(user=request.user, end_time__isnull=True).first()
+    active_session = request.cash_session
     if not active_session:
         return HttpResponse('<p style="color:red;">No hay sesión de caja activa.</p>')
 
-    try:
-        sale_items_to_create = []
-        cart_total = Decimal(0)
-
-        for product_data in cart.values():
-            product_id = product_data['id']
-            quantity_sold = product_data['quantity']
-
-            product = Product.objects.select_for_update().get(pk=product_id)
+    cart = get_cart_lines(active_session, lock=True)
+    if not cart:
+        return HttpResponse('<p style="color:red;">No hay productos en el carrito.</p>')
 
-            if quantity_sold > product.stock:
-                return HttpResponse(f'<p style="color:red;">Stock insuficiente para {escape(product.name)}.</p>')
+    try:
+        quantities = {line.product_id: line.quantity for line in cart}
 
-            product.stock -= quantity_sold
-            product.save()
+        # Un UPDATE condicional para todo el carrito (en modo 'row' tras un solo
+        # SELECT ... FOR UPDATE en orden de pk), en lugar de SELECT + save() por línea.
+        try:
+            products = decrement_stock(quantities)
+        except InsufficientStock as e:
+            return HttpResponse(f'<p style="color:red;">Stock insuficiente para {escape(e.product.name)}.</p>')
 
-            unit_price = Decimal(product_data['price'])
-            subtotal = Decimal(product_data['subtotal'])
-            cart_total += subtotal
+        # Montos exactos: los centavos enteros del carrito pasan directo a Decimal.
+        cart_total = from_cents(sum(line.subtotal_cents for line in cart))
 
+        sale_items_to_create = []
+        for line in cart:
             sale_items_to_create.append({
-                'product': product,
-                'quantity': quantity_sold,
-                'unit_price': unit_price,
-                'subtotal': subtotal
+                'product': products[line.product_id],
+                'quantity': line.quantity,
+                'unit_price': line.price,
+                'subtotal': line.subtotal
             })
 
         sale = Sale.objects.create(
@@ -206,7 +216,7 @@ def checkout_view(request):
             client=client_instance
         )
 
-        SaleItem.objects.bulk_create([
+        sale_items = SaleItem.objects.bulk_create([
             SaleItem(
                 sale=sale,
                 product=item['product'],
@@ -216,14 +226,21 @@ def checkout_view(request):
             ) for item in sale_items_to_create
         ])
 
+        # Rollups del dashboard en la misma transacción.
+        record_sale(sale, sale_items)
+
         if payment_method == 'cash':
-            active_session.starting_balance += cart_total
-            active_session.save()
+            # F() en lugar de save(): la instancia viene de la caché, que no guarda el
+            # balance (ver pos.cache.ACTIVE_SESSION_FIELDS), así que no hay que invalidarla.
+            CashDrawerSession.objects.filter(pk=active_session.pk).update(
+                starting_balance=F('starting_balance') + cart_total
+            )
 
-        del request.session['cart']
-        request.session.modified = True
+        clear_cart(active_session)
 
     except Exception as e:
+        # Sin esto el atomic confirmaría lo que se alcanzó a escribir antes del error.
+        transaction.set_rollback(True)
         return HttpResponse(f'<p style="color:red;">Error al finalizar la venta: {escape(str(e))}</p>')
 
     return HttpResponse(f"""
@@ -245,11 +262,9 @@ def checkout_view(request):
     """)
 
 @login_required
-def get_cart_total_view(request):
-    cart_items = request.session.get('cart', {})
-    cart_total = sum(item['subtotal'] for item in cart_items.values())
-
-    context = {'cart_total': cart_total}
+async def get_cart_total_view(request):
+    active_session = await aget_active_session(await request.auser())
+    context = {'cart_total': await aget_cart_total(active_session)}
     return render(request, 'pos/total_fragment.html', context)
 
 
@@ -262,10 +277,7 @@ def home_dispatch_view(request):
     if is_admin_staff(request.user):
         return redirect('dashboard')
     else:
-        active_session = CashDrawerSession.objects.filter(
-            user=request.user,
-            end_time__isnull=True
-        ).first()
+        active_session = request.cash_session
 
         if active_session:
             return redirect('pos_main')
@@ -279,39 +291,29 @@ def is_admin_staff(user):
 @user_passes_test(is_admin_staff)
 @login_required
 def dashboard_view(request):
-    today = timezone.now().date()
-
-    today_sales = Sale.objects.filter(sale_date__date=today)
-
-    today_metrics = today_sales.aggregate(
-        total_sales=Sum('total_amount'),
-        num_transactions=Count('id')
-    )
-
-    total_sales = today_metrics.get('total_sales') or Decimal('0.00')
-    num_transactions = today_metrics.get('num_transactions') or 0
-    ticket_average = (total_sales / num_transactions) if num_transactions else Decimal('0.00')
-
-    active_sessions = CashDrawerSession.objects.filter(end_time__isnull=True).count()
+    # Cada widget es un fragmento cacheado aparte (ver pos/dashboard.py); la página
+    # trae la primera versión y después HTMX pide cada uno por dashboard_widget_view.
+    context = {
+        'widgets': render_widgets(),
+        'refresh_seconds': DASHBOARD_REFRESH_SECONDS,
+        'top_products_days': TOP_PRODUCTS_DAYS,
+    }
+    return render(request, 'pos/dashboard.html', context)
 
-    top_products = SaleItem.objects.values('product__name') \
-                       .annotate(total_sold=Sum('quantity')) \
-                       .order_by('-total_sold')[:5]
 
-    low_stock_count = Product.objects.filter(
-        stock__lte=F('low_stock_threshold')
-    ).count()
+@user_passes_test(is_admin_staff)
+@login_required
+def dashboard_widget_view(request, widget):
+    if widget not in DASHBOARD_WIDGETS:
+        raise Http404("Widget desconocido.")
+    return HttpResponse(render_widget(widget))
 
-    context = {
-        'ventas_hoy': total_sales,
-        'transacciones_hoy': num_transactions,
-        'ticket_promedio': ticket_average,
-        'sesiones_activas': active_sessions,
-        'top_products': top_products,
-        'low_stock_count': low_stock_count,
-    }
 
-    return render(request, 'pos/dashboard.html', context)
+@user_passes_test(is_admin_staff)
+@login_required
+def metrics_view(request):
+    """Histogramas de pos.metrics (de este proceso) en el formato de texto de Prometheus."""
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 
 @user_passes_test(is_admin_staff)
@@ -332,16 +334,14 @@ def sales_report_view(request):
 
                 date_range_str = f"{start_date_str} a {end_date_str}"
 
-                sales = Sale.objects.filter(
-                    sale_date__date__gte=start_date,
-                    sale_date__date__lte=end_date_inclusive
-                ).select_related('cash_drawer_session__user').order_by('-sale_date')
+                sales = sales_in_range(start_date, end_date_inclusive)
 
-                if 'export_excel' in request.POST:
-                    return export_sales_excel(request, sales, date_range_str)
-
-                if 'export_pdf' in request.POST:
-                    return export_sales_pdf(request, sales, date_range_str)
+                # Las exportaciones se generan en segundo plano (manage.py run_report_worker);
+                # solicitudes idénticas reutilizan el mismo trabajo/archivo.
+                for button, report_format in REPORT_EXPORT_BUTTONS.items():
+                    if button in request.POST:
+                        job = enqueue_report(report_format, start_date, end_date_inclusive, request.user)
+                        return redirect('report_job', job_id=job.pk)
 
                 report_totals = sales.aggregate(
                     total_sales=Sum('total_amount'),
@@ -372,17 +372,39 @@ def sales_report_view(request):
 @user_passes_test(is_admin_staff)
 @login_required
 def product_list_view(request):
+    """
+    Catálogo paginado por keyset (?after= / ?before=): cada página es un rango
+    del índice del orden elegido, así que la página 800 cuesta lo mismo que la
+    primera. Las cantidades de los filtros salen de catalog_counts() (caché).
+    """
     filter_by = request.GET.get('filter', 'all')
+    query = request.GET.get('q', '').strip()
+    sort = request.GET.get('sort', DEFAULT_SORT)
+    category_id = request.GET.get('category', '')
+    supplier_id = request.GET.get('supplier', '')
+    category_id = int(category_id) if category_id.isdigit() else None
+    supplier_id = int(supplier_id) if supplier_id.isdigit() else None
+
+    page = catalog_page(
+        sort=sort, after=request.GET.get('after'), before=request.GET.get('before'),
+        query=query, category_id=category_id, supplier_id=supplier_id, low_stock=filter_by == 'low_stock',
+    )
 
-    products = Product.objects.select_related('category', 'supplier').all()
-
-    if filter_by == 'low_stock':
-        products = products.filter(stock__lte=5)
+    # Filtros actuales sin el cursor, para armar los enlaces Anterior/Siguiente.
+    params = request.GET.copy()
+    params.pop('after', None)
+    params.pop('before', None)
 
     context = {
-        'products': products,
+        'products': page.object_list,
+        'page': page,
+        'counts': catalog_counts(),
         'current_filter': filter_by,
-        'low_stock_count': Product.objects.filter(stock__lte=5).count()
+        'query': query,
+        'sort': sort if sort in CATALOG_SORTS else DEFAULT_SORT,
+        'category_id': category_id,
+        'supplier_id': supplier_id,
+        'filter_query': params.urlencode(),
     }
 
     return render(request, 'pos/product_list.html', context)
@@ -393,194 +415,203 @@ def product_list_view(request):
 def supplier_inventory_view(request, supplier_id):
     supplier = get_object_or_404(Supplier, pk=supplier_id)
 
-    products = Product.objects.filter(supplier=supplier).select_related('category')
+    products = with_available_stock(Product.objects.filter(supplier=supplier).select_related('category'))
 
-    total_stock_value = Decimal('0.00')
-
-    for product in products:
-        product_stock = Decimal(product.stock)
-        total_stock_value += product.cost * product_stock
+    # Totales en SQL; los productos sin costo cargado quedan fuera del valor (missing_cost).
+    valuation = supplier_valuation(supplier)
 
     context = {
         'supplier': supplier,
         'products': products,
-        'total_stock_value': total_stock_value
+        'total_stock_value': valuation['cost_value'],
+        'valuation': valuation,
     }
 
     return render(request, 'pos/supplier_inventory.html', context)
 
+
 @user_passes_test(is_admin_staff)
 @login_required
-def monthly_summary_view(request):
-    monthly_sales = Sale.objects.annotate(
-        year=ExtractYear('sale_date'),
-        month=ExtractMonth('sale_date')
-    ).values('year', 'month').annotate(
-        total_amount=Sum('total_amount'),
-        total_transactions=Count('id')
-    ).order_by('-year', '-month')
-
-    sales_with_average = []
-    for summary in monthly_sales:
-        num_transactions = summary['total_transactions']
-        total_amount = summary['total_amount']
-
-        if num_transactions and total_amount:
-            summary['ticket_promedio'] = total_amount / Decimal(num_transactions)
-        else:
-            summary['ticket_promedio'] = Decimal('0.00')
-
-        sales_with_average.append(summary)
-
-    context = {
-        'monthly_sales': sales_with_average
-    }
-
-    return render(request, 'pos/monthly_summary.html', context)
-
+def inventory_valuation_view(request):
+    # Todo el catálogo agrupado por proveedor y por categoría (cacheado, ver pos.inventory).
+    return render(request, 'pos/inventory_valuation.html', {'valuation': inventory_valuation()})
 
-def export_sales_pdf(request, sales_queryset, date_range):
 
-    response = HttpResponse(content_type='application/pdf')
-    file_name = f"reporte_ventas_{datetime.now().strftime('%Y%m%d')}.pdf"
+@user_passes_test(is_admin_staff)
+@login_required
+def inventory_valuation_export_view(request):
+    # Detalle por producto en CSV, generado por lotes mientras se descarga.
+    response = StreamingHttpResponse(stream_valuation_csv(), content_type='text/csv; charset=utf-8')
+    file_name = f"valorizacion_inventario_{timezone.localdate():%Y%m%d}.csv"
     response['Content-Disposition'] = f'attachment; filename="{file_name}"'
+    return response
 
-    doc = SimpleDocTemplate(response, pagesize=letter)
-    elements = []
-    styles = getSampleStyleSheet()
-
-    title_text = f"Reporte de Ventas: {date_range}"
-    elements.append(Paragraph(title_text, styles['Heading1']))
-    elements.append(Spacer(1, 18))
-
-    data = [
-        ['ID Venta', 'Fecha', 'Total ($)', 'Vendedor', 'Comprador']
-    ]
-
-    for sale in sales_queryset:
-        vendedor_nombre = (
-            sale.cash_drawer_session.user.username
-            if sale.cash_drawer_session and sale.cash_drawer_session.user
-            else 'N/A'
-        )
-
-        if sale.client:
-            comprador_nombre = str(sale.client)
-        else:
-            comprador_nombre = "Consumidor Final"
-
-        data.append([
-            sale.id,
-            sale.sale_date.strftime("%Y-%m-%d %H:%M"),
-            f"{sale.total_amount:.2f}",
-            vendedor_nombre,
-            comprador_nombre,
-        ])
-
-    table = Table(data, colWidths=[60, 140, 80, 100, 120])
+@user_passes_test(is_admin_staff)
+@login_required
+def product_import_view(request):
+    # Lista de precios de un proveedor o carga inicial: el archivo se lee por
+    # filas y se aplica por lotes (ver pos/catalog_io.py), nunca un formulario por SKU.
+    result = None
+    if request.method == 'POST':
+        form = CatalogImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                result = import_catalog(read_rows(upload.file, upload.name), dry_run=form.cleaned_data['dry_run'])
+            except CatalogImportError as e:
+                form.add_error('file', str(e))
+    else:
+        form = CatalogImportForm()
+    return render(request, 'pos/product_import.html', {'form': form, 'result': result})
 
-    style = TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4361ee')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
 
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('ALIGN', (2, 1), (2, -1), 'RIGHT'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-    ])
+@user_passes_test(is_admin_staff)
+@login_required
+def product_export_view(request):
+    # Mismo formato que acepta product_import_view, generado por lotes mientras se descarga.
+    response = StreamingHttpResponse(stream_catalog_csv(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="catalogo_{timezone.localdate():%Y%m%d}.csv"'
+    return response
 
-    row_count = len(data)
-    for i in range(1, row_count):
-        bg_color = colors.white if i % 2 == 0 else colors.HexColor('#f0f0f0')
-        style.add('BACKGROUND', (0, i), (-1, i), bg_color)
+@user_passes_test(is_admin_staff)
+@login_required
+def product_reprice_view(request):
+    # Primero "Vista previa" (cantidad y primeras filas); "Aplicar" reenvía el
+    # mismo formulario y actualiza todo con un UPDATE (ver pos/pricing.py).
+    total, rows, updated = None, None, None
+    if request.method == 'POST':
+        form = RepriceForm(request.POST)
+        if form.is_valid():
+            if 'apply' in request.POST:
+                updated = apply_repricing(**form.pricing_args())
+            else:
+                total, rows = repricing_preview(**form.pricing_args(), limit=form.cleaned_data['preview_rows'])
+    else:
+        form = RepriceForm()
+    return render(request, 'pos/product_reprice.html', {'form': form, 'total': total, 'rows': rows, 'updated': updated})
 
-    table.setStyle(style)
-    elements.append(table)
+@user_passes_test(is_admin_staff)
+@login_required
+def monthly_summary_view(request):
+    # Meses cerrados desde MonthlySalesSnapshot; solo el mes en curso se agrega en vivo.
+    try:
+        year = int(request.GET.get('year', ''))
+    except ValueError:
+        year = None
 
-    doc.build(elements)
+    context = {
+        'monthly_sales': monthly_summary(year),
+        'years': summary_years(),
+        'selected_year': year,
+    }
 
-    return response
+    return render(request, 'pos/monthly_summary.html', context)
 
 
-def export_sales_excel(request, sales_queryset, date_range):
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-    )
-    file_name = f"reporte_ventas_{datetime.now().strftime('%Y%m%d')}.xlsx"
-    response['Content-Disposition'] = f'attachment; filename="{file_name}"'
+REPORT_EXPORT_BUTTONS = {
+    'export_excel': 'excel',
+    'export_pdf': 'pdf',
+    'export_pdf_summary': 'pdf_summary',
+}
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Reporte de Ventas"
 
-    headers = ['ID Venta', 'Fecha y Hora', 'Total ($)', 'Método de Pago', 'Vendedor', 'Comprador']
-    ws.append(headers)
+@user_passes_test(is_admin_staff)
+@login_required
+def report_job_view(request, job_id):
+    job = get_object_or_404(ReportJob, pk=job_id)
+    return render(request, 'pos/report_job.html', {'job': job})
 
-    header_style = ws['A1':'F1']
-    from openpyxl.styles import Font, PatternFill
-    font = Font(bold=True, color="FFFFFF")
-    fill = PatternFill("solid", fgColor="4361ee")
 
-    for cell in header_style[0]:
-        cell.font = font
-        cell.fill = fill
+@user_passes_test(is_admin_staff)
+@login_required
+def report_job_progress_view(request, job_id):
+    # Fragmento HTMX: se vuelve a pedir cada pocos segundos hasta que el trabajo termina.
+    job = get_object_or_404(ReportJob, pk=job_id)
+    return render(request, 'pos/report_job_progress.html', {'job': job})
 
-    for sale in sales_queryset:
-        if sale.client:
-            comprador_nombre = str(sale.client)
-        else:
-            comprador_nombre = "Consumidor Final"
-
-        data_row = [
-            sale.id,
-            sale.sale_date.strftime("%Y-%m-%d %H:%M"),
-            sale.total_amount,
-            sale.get_payment_method_display(),
-            sale.cash_drawer_session.user.username if sale.cash_drawer_session and sale.cash_drawer_session.user else 'N/A',
-            comprador_nombre,
-        ]
-        ws.append(data_row)
-
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column_letter
-        for cell in col:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = (max_length + 2)
-        ws.column_dimensions[column].width = adjusted_width
 
-    wb.save(response)
-    return response
+@user_passes_test(is_admin_staff)
+@login_required
+def report_job_download_view(request, job_id):
+    job = get_object_or_404(ReportJob, pk=job_id, status=ReportJob.STATUS_DONE)
+    path = report_path(job)
+    if not path.exists():
+        raise Http404("El archivo del reporte ya no existe.")
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=job.file_name)
 
 
 @user_passes_test(is_admin_staff)
 @login_required
 def low_inventory_alert_view(request):
-    low_stock_products = Product.objects.filter(
-        stock__lte=F('low_stock_threshold')
-    ).order_by('stock')
+    # Solo las filas marcadas (índice de is_low_stock); el disponible se calcula
+    # para ellas y no para todo el catálogo.
+    low_stock_products = list(
+        with_available_stock(Product.objects.filter(is_low_stock=True)).order_by('available_stock', 'pk')
+    )
 
     context = {
         'products': low_stock_products,
-        'alert_count': low_stock_products.count(),
+        'alert_count': len(low_stock_products),
+        # La página consulta low_stock_changes_view desde esta versión.
+        'low_stock_version': LowStockChange.objects.order_by('-pk').values_list('pk', flat=True).first() or 0,
     }
 
     return render(request, 'pos/low_inventory_alert.html', context)
 
+
+LOW_STOCK_CHANGES_LIMIT = 200
+
+
+@user_passes_test(is_admin_staff)
+@login_required
+def low_stock_changes_view(request):
+    """
+    Cambios del conjunto de stock bajo posteriores a ?since=N (rango sobre la
+    clave primaria de LowStockChange). Si hay más de LOW_STOCK_CHANGES_LIMIT se
+    devuelve el primer tramo con more=true y la versión hasta donde se llegó.
+    """
+    try:
+        since = max(int(request.GET.get('since', 0)), 0)
+    except ValueError:
+        return JsonResponse({'error': "El parámetro since debe ser un número."}, status=400)
+
+    changes = list(
+        LowStockChange.objects.filter(pk__gt=since).select_related('product').order_by('pk')
+        [:LOW_STOCK_CHANGES_LIMIT + 1]
+    )
+    more = len(changes) > LOW_STOCK_CHANGES_LIMIT
+    changes = changes[:LOW_STOCK_CHANGES_LIMIT]
+
+    return JsonResponse({
+        'version': changes[-1].pk if changes else since,
+        'more': more,
+        'alert_count': Product.objects.filter(is_low_stock=True).count(),
+        'changes': [{
+            'version': change.pk,
+            'product_id': change.product_id,
+            'sku': change.product.sku,
+            'name': change.product.name,
+            'is_low_stock': change.is_low_stock,
+            'stock': change.stock,
+            'low_stock_threshold': change.product.low_stock_threshold,
+            'created_at': change.created_at.isoformat(),
+        } for change in changes],
+    })
+
 @user_passes_test(is_admin_staff)
 @login_required
 def product_edit_view(request, product_id):
-    product = get_object_or_404(Product, id=product_id)
+    product = get_object_or_404(with_available_stock(Product.objects), id=product_id)
+    # El formulario parte del disponible (foto + movimientos pendientes).
+    product.stock = product.available_stock
 
     if request.method == 'POST':
         form = StockUpdateForm(request.POST, instance=product)
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                form.save(commit=False).save(update_fields=['low_stock_threshold'])
+                # El nuevo total queda como ajuste en el libro de movimientos (o en la fila, modo 'row').
+                set_stock(product, form.cleaned_data['stock'])
             return redirect('low_inventory_alert')
     else:
         form = StockUpdateForm(instance=product)
@@ -588,10 +619,69 @@ def product_edit_view(request, product_id):
     return render(request, 'pos/product_form.html', {'form': form, 'product': product})
 
 
+CLIENT_PAGE_SIZE = 50
+# Mismo orden que Client.Meta.ordering y el índice client_name_order.
+CLIENT_ORDERING = ('last_name', 'first_name', 'pk')
+CLIENT_ACTIVITY_DAYS = (30, 90, 365)
+CLIENT_LIST_FIELDS = ('first_name', 'last_name', 'company_name', 'tax_id', 'phone', 'is_professional',
+                      'last_purchase_at')
+
+
+def _client_json(client):
+    # Formato de select2 que espera el selector de clientes del checkout.
+    return {
+        'id': client.id,
+        'text': str(client),
+        'tax_id': client.tax_id,
+        'is_professional': client.is_professional
+    }
+
+
 @login_required
 def client_list_view(request):
-    clients = Client.objects.all().order_by('last_name')
-    context = {'clients': clients}
+    """
+    Directorio paginado por keyset en el orden de Client.Meta.ordering, con
+    filtros de clientes profesionales, compras recientes (?active=30|90|365) y
+    búsqueda. Con ?format=json devuelve la página para el selector del checkout.
+    """
+    query = request.GET.get('q', '').strip()
+    professional = request.GET.get('professional') == '1'
+    active = request.GET.get('active', '')
+    active = int(active) if active.isdigit() and int(active) in CLIENT_ACTIVITY_DAYS else None
+
+    clients = Client.objects.only(*CLIENT_LIST_FIELDS)
+    if professional:
+        clients = clients.filter(is_professional=True)
+    if active:
+        clients = clients.filter(last_purchase_at__gte=timezone.now() - timedelta(days=active))
+    if query:
+        clients = filter_clients(clients, query)
+
+    page = KeysetPaginator(clients, CLIENT_ORDERING, CLIENT_PAGE_SIZE).page(
+        after=request.GET.get('after'), before=request.GET.get('before'),
+    )
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'results': [_client_json(client) for client in page],
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+            'pagination': {'more': page.has_next},
+        })
+
+    params = request.GET.copy()
+    params.pop('after', None)
+    params.pop('before', None)
+
+    context = {
+        'clients': page.object_list,
+        'page': page,
+        'query': query,
+        'professional': professional,
+        'active': active,
+        'activity_days': CLIENT_ACTIVITY_DAYS,
+        'filter_query': params.urlencode(),
+    }
     return render(request, 'pos/client_list.html', context)
 
 
@@ -639,25 +729,15 @@ def client_delete_view(request, client_id):
 
 
 @login_required
-def client_search_ajax(request):
+async def client_search_ajax(request):
     query = request.GET.get('q', '')
     clients_data = []
 
     if query:
-        clients = Client.objects.filter(
-            Q(first_name__icontains=query) |
-            Q(last_name__icontains=query) |
-            Q(company_name__icontains=query) |
-            Q(tax_id__icontains=query)
-        ).distinct()[:10]
+        clients = await asearch_clients(query)
 
         for client in clients:
-            clients_data.append({
-                'id': client.id,
-                'text': str(client),
-                'tax_id': client.tax_id,
-                'is_professional': client.is_professional
-            })
+            clients_data.append(_client_json(client))
 
     return JsonResponse({'results': clients_data})
 
@@ -685,15 +765,21 @@ def return_search_view(request):
 @require_http_methods(["GET", "POST"])
 @transaction.atomic
 def process_return_view(request, sale_id):
-    sale = get_object_or_404(
-        Sale.objects.prefetch_related('items__product'),
-        id=sale_id
-    )
+    sales = Sale.objects.prefetch_related('items__product')
+    if request.method == 'POST':
+        # Bloquea la venta: dos devoluciones simultáneas de la misma venta se
+        # atienden de a una y la segunda ya ve lo que devolvió la primera.
+        sales = sales.select_for_update()
+    sale = get_object_or_404(sales, id=sale_id)
+    sale_items = list(sale.items.all())
+    # Lo ya devuelto en devoluciones anteriores, en una sola consulta.
+    returnable = returnable_quantities(sale, sale_items)
+
     if request.method == 'POST':
         items_to_return = []
         total_refund = Decimal('0.00')
         motive = request.POST.get('motive', 'Devolución sin motivo especificado')
-        for item in sale.items.all():
+        for item in sale_items:
             return_qty_str = request.POST.get(f'qty_{item.id}')
             try:
                 return_qty = int(return_qty_str) if return_qty_str else 0
@@ -705,6 +791,11 @@ def process_return_view(request, sale_id):
                 return HttpResponse(
                     f'<p style="color:red;">No se puede devolver más de lo que se compró para {escape(item.product.name)}.</p>',
                     status=400)
+            if return_qty > returnable[item.id]:
+                return HttpResponse(
+                    f'<p style="color:red;">Solo quedan {returnable[item.id]} unidad(es) por devolver de '
+                    f'{escape(item.product.name)}.</p>',
+                    status=400)
             if return_qty > 0:
                 refund_amount = item.unit_price * return_qty
                 total_refund += refund_amount
@@ -725,18 +816,20 @@ def process_return_view(request, sale_id):
             total_refund_amount=total_refund
         )
 
-        # 2. Revertir stock y crear SaleReturnItems
-        for data in items_to_return:
-            item = data['item']
-            SaleReturnItem.objects.create(
+        # 2. Crear los SaleReturnItems en un INSERT y revertir el stock en un UPDATE relativo (F())
+        return_items = SaleReturnItem.objects.bulk_create([
+            SaleReturnItem(
                 return_request=sale_return,
-                product=item.product,
+                product=data['item'].product,
                 quantity=data['quantity'],
                 refund_amount=data['refund_amount']
-            )
-            product = Product.objects.get(pk=item.product.pk)
-            product.stock += data['quantity']
-            product.save()
+            ) for data in items_to_return
+        ])
+        quantities = {}
+        for data in items_to_return:
+            product_id = data['item'].product_id
+            quantities[product_id] = quantities.get(product_id, 0) + data['quantity']
+        increment_stock(quantities)
 
         # =================================================================
         # MODIFICACIÓN CLAVE: Usar la sesión de caja de la venta original
@@ -747,7 +840,7 @@ def process_return_view(request, sale_id):
         session_to_use = sale.cash_drawer_session
 
         # A. Crear una transacción de VENTA con monto NEGATIVO para compensar las métricas
-        Sale.objects.create(
+        refund_sale = Sale.objects.create(
             seller=request.user,
             total_amount=-total_refund,
             # Se usa la sesión de la VENTA ORIGINAL para asegurar que no sea NULL
@@ -755,24 +848,28 @@ def process_return_view(request, sale_id):
             payment_method='return',
             client=sale.client,
         )
+        record_return(refund_sale, return_items)
 
         # B. Actualizar el balance de caja (si el pago original fue en efectivo y tenemos una sesión)
         if sale.payment_method == 'cash' and session_to_use:
             # Si el pago original fue en efectivo, el dinero de la devolución se saca de la caja
             # Si la sesión usada es la original, esta podría estar cerrada.
             # Es más seguro usar la sesión activa del usuario para actualizar el balance de caja si aún está abierta.
-            active_session = CashDrawerSession.objects.filter(user=request.user, end_time__isnull=True).first()
+            active_session = request.cash_session
             if active_session:
-                active_session.starting_balance -= total_refund
-                active_session.save()
+                CashDrawerSession.objects.filter(pk=active_session.pk).update(
+                    starting_balance=F('starting_balance') - total_refund
+                )
         # =================================================================
 
         return render(request, 'pos/return_success.html', {
             'sale_return': sale_return,
             'items_returned': items_to_return
         })
+    for item in sale_items:
+        item.returnable = returnable[item.id]
     context = {
         'sale': sale,
-        'sale_items': sale.items.all(),
+        'sale_items': sale_items,
     }
     return render(request, 'pos/process_return.html', context)
\ No newline at end of file